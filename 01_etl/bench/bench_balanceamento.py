@@ -0,0 +1,174 @@
+"""
+Equivalência e tempo do balanceamento de painéis (04 e 06).
+
+Roda as funções originais (cópia literal do baseline: MultiIndex.from_product + reindex
++ sort + groupby.cumsum) e as atuais do 04/06 (motor em arrays de balanceamento.py)
+sobre o mesmo painel sintético, normaliza os tipos dos dois lados pelo esquema do
+painel, confere que as saídas são idênticas e imprime o tempo de cada uma.
+
+Uso (a partir de 01_etl/bench): python bench_balanceamento.py --municipios 5570
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+import esquema_painel  # noqa: E402
+
+SETORES = esquema_painel.SETORES_PAINEL[:-1]
+
+# --- Baseline (04_transform_rais.py / 06_transform_cnpj_2.py), sem alterações ---
+
+def balancear_painel_final(df):
+    """
+    Garante que cada município tenha os setores + Total em todos os anos.
+    """
+    print("⚖️  [1/3] Calculando agregados do setor 'Total'...")
+
+    # 1. Gerar o Total por Município/Ano
+    # Mantemos colunas extras de ID caso existam (ex: ano_tratamento)
+    cols_agregacao = ['id_municipio', 'ano']
+    if 'ano_tratamento' in df.columns:
+        cols_agregacao.append('ano_tratamento')
+
+    df_total = df.groupby(cols_agregacao, as_index=False)['quantidade_vinculos_ativos'].sum()
+    df_total['setor'] = 'Total'
+
+    # Unir com os setores originais
+    df = pd.concat([df, df_total], ignore_index=True)
+
+    print("⚙️  [2/3] Criando grid completo (Município x Setor x Ano)...")
+
+    todos_muns = df['id_municipio'].unique()
+    todos_sets = ['Agro', 'Industria', 'Servicos', 'Setor Publico', 'Total']
+    todos_anos = sorted(df['ano'].unique())
+
+    index_completo = pd.MultiIndex.from_product(
+        [todos_muns, todos_sets, todos_anos],
+        names=['id_municipio', 'setor', 'ano']
+    )
+
+    # 3. Reindexar (Preenche lacunas com zero)
+    df_balanceado = (df.set_index(['id_municipio', 'setor', 'ano'])
+                     .reindex(index_completo, fill_value=0)
+                     .reset_index())
+
+    # 4. Recuperar nomes dos municípios
+    nomes = df[['id_municipio', 'nome_municipio']].dropna().drop_duplicates()
+    df_balanceado = df_balanceado.drop(columns=['nome_municipio'], errors='ignore').merge(nomes, on='id_municipio', how='left')
+
+    print("🧪 [3/3] Calculando logs (Econometria)...")
+    # Log calculado sobre a soma (correto para o Total)
+    df_balanceado['log_estoque'] = np.log1p(df_balanceado['quantidade_vinculos_ativos'].astype(np.float32))
+
+    return df_balanceado
+
+def balancear_dados(df):
+    print("📊 [1/4] Criando setor Total (Soma dos fluxos)...")
+
+    # 1. Gerar o Total a partir dos fluxos de entrada/saída
+    # Agrupamos por município e ano, ignorando o setor original
+    df_total = df.groupby(['mun', 'ano'], as_index=False)[['entradas', 'saidas']].sum()
+    df_total['setor'] = 'Total'
+
+    # Empilha o Total com os setores originais
+    df = pd.concat([df, df_total], ignore_index=True)
+
+    print("⚖️ [2/4] Iniciando balanceamento do painel (2016-2024)...")
+
+    todos_muns = df['mun'].unique()
+    # Adicionado 'Total' na lista explicitamente
+    todos_setores = ['Agro', 'Industria', 'Servicos', 'Setor Publico', 'Total']
+    todos_anos = np.arange(2016, 2025)
+
+    # 2. Criar o MultiIndex (Produto Cartesiano)
+    index_completo = pd.MultiIndex.from_product(
+        [todos_muns, todos_setores, todos_anos],
+        names=['mun', 'setor', 'ano']
+    )
+
+    # 3. Reindexar preenchendo lacunas com 0
+    df_balanceado = (df.set_index(['mun', 'setor', 'ano'])
+                     .reindex(index_completo, fill_value=0)
+                     .reset_index())
+
+    # 4. Recalcular Estoque Acumulado
+    print("📈 [3/4] Recalculando estoques acumulados por setor e total...")
+    df_balanceado = df_balanceado.sort_values(['mun', 'setor', 'ano'])
+
+    # O estoque acumulado agora funciona perfeitamente para setores e para o total
+    df_balanceado['estoque_mei'] = (
+        df_balanceado.groupby(['mun', 'setor'])['entradas'].cumsum() -
+        df_balanceado.groupby(['mun', 'setor'])['saidas'].cumsum()
+    )
+
+    # 5. Logaritmo para DiD
+    print("🧪 [4/4] Aplicando log_estoque...")
+    df_balanceado['log_estoque'] = np.log1p(df_balanceado['estoque_mei'].clip(lower=0))
+
+    return df_balanceado
+
+# --- Versões atuais ---
+
+def carregar_etapa(arquivo):
+    """Importa um script numerado do src (o nome começa com dígito, então não dá para usar import)."""
+    spec = importlib.util.spec_from_file_location(arquivo[:-3], os.path.join(SRC, arquivo))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+def painel_sintetico(n_mun, col_mun, colunas, anos, seed=0, cobertura=0.8):
+    """Painel bruto como chega às etapas (setor em texto, contagens int64), com lacunas."""
+    rng = np.random.default_rng(seed)
+    muns = 1_100_000 + rng.choice(5_000_000, n_mun, replace=False)
+    grade = pd.MultiIndex.from_product([muns, SETORES, anos], names=[col_mun, 'setor', 'ano']).to_frame(index=False)
+    df = grade[rng.random(len(grade)) < cobertura].sample(frac=1, random_state=seed).reset_index(drop=True)
+    for c in colunas:
+        df[c] = rng.integers(0, 500, len(df))
+    return df
+
+def normalizar(df, col_mun):
+    """Mesmos tipos (esquema do painel) e mesma ordem de linhas dos dois lados antes de comparar."""
+    df = esquema_painel.aplicar_esquema(df.copy())
+    return df.sort_values([col_mun, 'setor', 'ano']).reset_index(drop=True)
+
+def cronometrar(func, df):
+    with contextlib.redirect_stdout(io.StringIO()):  # As funções das etapas imprimem o progresso
+        t0 = time.perf_counter()
+        out = func(df)
+        return out, time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--municipios", type=int, default=5570)
+    args = parser.parse_args()
+
+    # RAIS: anos presentes no dado; MEI: grade fixa 2016-2024 com fluxos desde 2000
+    rais = painel_sintetico(args.municipios, 'id_municipio', ['quantidade_vinculos_ativos'], range(2016, 2025))
+    rais['nome_municipio'] = 'Município ' + rais['id_municipio'].astype(str)
+    mei = painel_sintetico(args.municipios, 'mun', ['entradas', 'saidas'], range(2000, 2025), seed=1)
+
+    # As etapas atuais recebem o painel já no esquema compacto (04: aplicar_esquema; 06: ler_painel)
+    casos = [
+        ("04 RAIS", 'id_municipio', rais, balancear_painel_final,
+         carregar_etapa("04_transform_rais.py").balancear_painel_final),
+        ("06 MEI", 'mun', mei, balancear_dados,
+         carregar_etapa("06_transform_cnpj_2.py").balancear_dados),
+    ]
+    for nome, col_mun, df, legado, atual in casos:
+        esperado, t_legado = cronometrar(legado, df.copy())
+        obtido, t_novo = cronometrar(atual, esquema_painel.aplicar_esquema(df.copy()))
+        esperado, obtido = normalizar(esperado, col_mun), normalizar(obtido, col_mun)
+        pd.testing.assert_frame_equal(esperado, obtido[esperado.columns])
+        print(f"{nome:<8} {len(obtido):>10,} linhas  idêntico ✅  legado {t_legado:7.3f} s  arrays {t_novo:7.3f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Equivalência e tempo do buffer espacial (11) contra a matriz densa do R.
+
+Reproduz em NumPy o rdist.earth(coords, miles = FALSE) do 10_marching_mdm.R
+(matriz n x n de distâncias) e o filtro de controles a menos de BUFFER_KM de
+algum tratado; compara com a KD-tree de buffer_espacial.py para vários raios e
+esquemas de tratamento.
+
+Uso (a partir de 01_etl/bench): python bench_buffer_espacial.py --municipios 5570
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import buffer_espacial  # noqa: E402
+
+def rdist_earth(lon, lat, raio=buffer_espacial.RAIO_TERRA_KM):
+    """fields::rdist.earth: R * acos(min(1, cos-produto)) para todos os pares."""
+    lon, lat = np.radians(lon), np.radians(lat)
+    coslat, sinlat = np.cos(lat), np.sin(lat)
+    pp = (np.outer(coslat * np.cos(lon), coslat * np.cos(lon))
+          + np.outer(coslat * np.sin(lon), coslat * np.sin(lon))
+          + np.outer(sinlat, sinlat))
+    return raio * np.arccos(np.minimum(pp, 1))
+
+def legado(geo_mat, grupo, raio):
+    tratados = np.flatnonzero(grupo == 1)
+    controles = np.flatnonzero(grupo == 0)
+    perto = (geo_mat[np.ix_(tratados, controles)] < raio).any(axis=0)
+    return np.isin(np.arange(len(grupo)), controles[perto])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--municipios", type=int, default=5570)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    n = args.municipios
+    lon, lat = rng.uniform(-73, -35, n), rng.uniform(-33, 5, n)
+    grupos = {f"treat_{g}": np.where(rng.random(n) < 1 / g, 1.0, np.where(rng.random(n) < 1 / g, 0.0, np.nan))
+              for g in (3, 4, 5)}
+    raios = [10, 30, 50, 100]
+
+    t0 = time.perf_counter()
+    geo_mat = rdist_earth(lon, lat)
+    esperado = {(t, r): legado(geo_mat, g, r) for t, g in grupos.items() for r in raios}
+    t_legado = time.perf_counter() - t0
+    mb_legado = geo_mat.nbytes / 1024 ** 2
+
+    t0 = time.perf_counter()
+    dist = buffer_espacial.distancias_por_tratamento(lon, lat, grupos)
+    obtido = {(t, r): buffer_espacial.controles_no_buffer(dist[:, j], g, r)
+              for j, (t, g) in enumerate(grupos.items()) for r in raios}
+    t_arvore = time.perf_counter() - t0
+
+    # Pares exatamente na borda do raio podem cair de lados diferentes (acos vs asin da corda)
+    diferencas = sum(int((esperado[k] != obtido[k]).sum()) for k in esperado)
+    assert diferencas <= len(esperado), diferencas
+    print(f"{len(grupos)} esquemas x {len(raios)} raios, {n:,} municípios  "
+          f"{'idêntico ✅' if not diferencas else f'{diferencas} empates na borda'}  "
+          f"matriz densa {t_legado:7.3f} s ({mb_legado:,.0f} MB)  KD-tree {t_arvore:7.3f} s ({dist.nbytes / 1024 ** 2:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Benchmark ponta a ponta das etapas do ETL sobre dados sintéticos.
+
+Para cada escala (fração do Brasil), gera os dados brutos com sinteticos.py num
+diretório de trabalho e roda as etapas 05, 06, 04, 07 e 09 como o pipeline roda
+(processo próprio, cwd = <trabalho>/src), medindo tempo de parede e pico de RSS
+de cada uma. Os resultados vão para um JSON; --comparar mostra a razão em relação
+a uma execução anterior, para pegar regressões sem rede nem dado real.
+
+Uso (a partir de 01_etl/bench):
+    python bench_etl.py --escalas 0.01 0.05 --args-05 "--chunksize 500000"
+    python bench_etl.py --escalas 0.01 --comparar ../data/bench/bench_<anterior>.json
+"""
+import argparse
+import json
+import os
+import platform
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+
+import pyarrow.parquet as pq
+
+import sinteticos
+
+DIR_SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+DIR_RESULTADOS = "../data/bench"
+
+# Etapa -> arquivo de saída (relativo a <trabalho>/src) e pastas de cache a limpar antes (rodada fria)
+ETAPAS = {
+    "05": ("05_transform_cnpj", "../data/processed/painel_mei_rf_anual.parquet", ["../data/interim"]),
+    "06": ("06_transform_cnpj_2", "../data/processed/painel_mei_balanceado_2016_2024.parquet", []),
+    "04": ("04_transform_rais", "../data/processed/rais_painel_balanceado.parquet", []),
+    "07": ("07_transform_pix", "../data/processed/intensidade_pix_municipios.parquet", []),
+    "09": ("09_create_masterfile_mdm", "../data/processed/dataset_final_matching.parquet", []),
+}
+
+def _descendentes(pid):
+    """pid e todos os processos descendentes (Linux, via /proc)."""
+    pids, pendentes = [], [pid]
+    while pendentes:
+        atual = pendentes.pop()
+        pids.append(atual)
+        try:
+            for tarefa in os.listdir(f"/proc/{atual}/task"):
+                with open(f"/proc/{atual}/task/{tarefa}/children") as f:
+                    pendentes += [int(p) for p in f.read().split()]
+        except OSError:
+            pass
+    return pids
+
+def _vm_hwm_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linha in f:
+                if linha.startswith("VmHWM:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+def medir(comando, cwd, log, intervalo=0.05):
+    """
+    Roda o comando e devolve (código, segundos, pico de RSS em MB).
+    No Linux o pico é o maior VmHWM entre o processo e seus workers, amostrado a cada
+    `intervalo` s (o ru_maxrss do filho herdaria o RSS deste processo no fork). No macOS
+    vem do ru_maxrss dos filhos; no Windows (sem /proc nem resource) o pico fica 0.
+    """
+    inicio = time.perf_counter()
+    pico = 0.0
+    with open(log, "w", encoding="utf-8") as saida:
+        proc = subprocess.Popen(comando, cwd=cwd, stdout=saida, stderr=subprocess.STDOUT)
+        if os.path.exists("/proc"):
+            while proc.poll() is None:
+                pico = max([pico] + [_vm_hwm_mb(p) for p in _descendentes(proc.pid)])
+                time.sleep(intervalo)
+        else:
+            proc.wait()
+            try:
+                import resource  # Só Unix
+                pico = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024 ** 2  # bytes no macOS
+            except ImportError:
+                pass
+    return proc.returncode, time.perf_counter() - inicio, pico
+
+def linhas_parquet(caminho):
+    try:
+        return pq.read_metadata(caminho).num_rows
+    except (OSError, ValueError):
+        return None
+
+def bench_escala(escala, etapas, trabalho, seed=0, repeticoes=1, args_extra=None):
+    """Gera (ou reaproveita) os dados da escala e cronometra as etapas. Retorna o bloco do JSON."""
+    dir_data = os.path.join(trabalho, "data")
+    dir_src = os.path.join(trabalho, "src")
+    dir_logs = os.path.join(dir_data, "logs")
+    os.makedirs(dir_src, exist_ok=True)
+    os.makedirs(dir_logs, exist_ok=True)
+
+    inicio = time.perf_counter()
+    tamanhos = sinteticos.gerar_tudo(dir_data, escala, seed)
+    print(f"🧪 Escala {escala:g}: {tamanhos['municipios']:,} municípios, "
+          f"{tamanhos['estabelecimentos']:,} estabelecimentos ({time.perf_counter() - inicio:.1f} s para gerar)")
+
+    resultados = {}
+    for etapa in etapas:
+        script, saida, caches = ETAPAS[etapa]
+        comando = [sys.executable, os.path.join(DIR_SRC, f"{script}.py"), *(args_extra or {}).get(etapa, [])]
+        rodadas = []
+        for r in range(repeticoes):
+            for cache in caches:
+                shutil.rmtree(os.path.join(dir_src, cache), ignore_errors=True)
+            log = os.path.join(dir_logs, f"bench_{script}.log")
+            codigo, segundos, pico = medir(comando, dir_src, log)
+            rodadas.append({"segundos": round(segundos, 3), "pico_rss_mb": round(pico, 1), "codigo": codigo})
+            if codigo != 0:
+                print(f"  ❌ {etapa} falhou (código {codigo}); veja {log}")
+                break
+        ok = [x for x in rodadas if x["codigo"] == 0]
+        resultados[etapa] = {
+            "script": script,
+            "args": comando[2:],
+            "rodadas": rodadas,
+            "segundos": min(x["segundos"] for x in ok) if ok else None,
+            "pico_rss_mb": max(x["pico_rss_mb"] for x in ok) if ok else None,
+            "linhas_saida": linhas_parquet(os.path.join(dir_src, saida)) if ok else None,
+        }
+        if ok:
+            r = resultados[etapa]
+            print(f"  {etapa} {script:<26} {r['segundos']:8.2f} s  {r['pico_rss_mb']:8.1f} MB  "
+                  f"{r['linhas_saida'] or 0:>10,} linhas")
+    return {"escala": escala, "tamanhos": tamanhos, "etapas": resultados}
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DIR_SRC,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def comparar(atual, anterior):
+    """Imprime tempo e memória da execução atual relativos à anterior (mesma escala e etapa)."""
+    antes = {(b["escala"], e): r for b in anterior["escalas"] for e, r in b["etapas"].items()}
+    print("\n📈 Comparação com a execução anterior (atual / anterior)")
+    for bloco in atual["escalas"]:
+        for etapa, r in bloco["etapas"].items():
+            a = antes.get((bloco["escala"], etapa))
+            if not a or not a["segundos"] or not r["segundos"]:
+                continue
+            rss = f"{r['pico_rss_mb'] / a['pico_rss_mb']:6.2f}x" if a["pico_rss_mb"] and r["pico_rss_mb"] else "   n/d"
+            print(f"  escala {bloco['escala']:<6g} {etapa}  tempo {r['segundos'] / a['segundos']:6.2f}x  RSS {rss}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do ETL com dados sintéticos.")
+    parser.add_argument("--escalas", type=float, nargs="+", default=[0.01],
+                        help="Frações do tamanho nacional (0.01 = 1%%, 1.0 = Brasil).")
+    parser.add_argument("--etapas", nargs="+", default=list(ETAPAS), help=f"Etapas ({', '.join(ETAPAS)}).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeticoes", type=int, default=1, help="Rodadas por etapa (vale a mais rápida).")
+    parser.add_argument("--trabalho", default="../data/bench/trabalho",
+                        help="Diretório de trabalho; os dados de cada escala ficam em <trabalho>_<escala>.")
+    parser.add_argument("--saida", default=None, help="JSON de resultados (padrão: ../data/bench/bench_<data>.json).")
+    parser.add_argument("--comparar", default=None, help="JSON de uma execução anterior.")
+    for etapa in ETAPAS:
+        parser.add_argument(f"--args-{etapa}", default="", help=f"Argumentos extras para a etapa {etapa}.")
+    args = parser.parse_args()
+    desconhecidas = [e for e in args.etapas if e not in ETAPAS]
+    if desconhecidas:
+        parser.error(f"etapas desconhecidas: {', '.join(desconhecidas)} (opções: {', '.join(ETAPAS)})")
+    return args
+
+def main():
+    args = parse_args()
+    # Mesma ordem de dependência do pipeline, qualquer que seja a ordem pedida
+    etapas = [e for e in ETAPAS if e in args.etapas]
+    args_extra = {e: shlex.split(getattr(args, f"args_{e}")) for e in ETAPAS}
+
+    relatorio = {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _commit_atual(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "escalas": [],
+    }
+    for escala in args.escalas:
+        trabalho = f"{args.trabalho}_{escala:g}"
+        relatorio["escalas"].append(bench_escala(escala, etapas, trabalho, args.seed, args.repeticoes, args_extra))
+
+    saida = args.saida or os.path.join(DIR_RESULTADOS, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(relatorio, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Equivalência e tempo da intensidade do Pix por município (07).
+
+Compara o groupby.transform(lambda x: x.iloc[:6].mean()) original com as reduções
+por segmento de intensidade_pix.py, e confere as janelas movel/calendario contra
+uma referência em pandas, sobre um painel mensal sintético com lacunas e NaN.
+
+Uso (a partir de 01_etl/bench): python bench_intensidade_pix.py --municipios 5570
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import intensidade_pix  # noqa: E402
+
+METRICAS = ["QT_PagadorPF", "VL_PagadorPF", "QT_PagadorPJ"]
+
+def legado(df):
+    """calcular_intensidade_bruta antes das reduções por segmento (sem a parte de IDs)."""
+    df = df.sort_values(by=['Municipio_Ibge', 'AnoMes'])
+    df['intensidade_pix_bruta'] = (
+        df.groupby('Municipio_Ibge')['QT_PagadorPF']
+        .transform(lambda x: x.iloc[:6].mean())
+    )
+    return df[['Municipio_Ibge', 'intensidade_pix_bruta']].drop_duplicates()
+
+def referencia(df, metrica, janela, n, inicio, fim):
+    """Mesmas janelas em pandas puro (lenta, só para conferir)."""
+    df = df.sort_values(['Municipio_Ibge', 'AnoMes'])
+    if janela == "calendario":
+        sel = df[(df['AnoMes'] >= inicio) & (df['AnoMes'] <= fim)]
+    else:
+        sel = df[df['AnoMes'] <= fim].groupby('Municipio_Ibge').tail(n)
+    medias = sel.groupby('Municipio_Ibge')[metrica].mean()
+    return medias.reindex(np.sort(df['Municipio_Ibge'].unique())).to_numpy()
+
+def painel_sintetico(n_mun, seed=0):
+    rng = np.random.default_rng(seed)
+    meses = intensidade_pix_meses()
+    muns = np.sort(1_100_000 + rng.choice(5_000_000, n_mun, replace=False))
+    grade = pd.MultiIndex.from_product([muns, meses], names=['Municipio_Ibge', 'AnoMes']).to_frame(index=False)
+    df = grade[rng.random(len(grade)) < 0.9].sample(frac=1, random_state=seed).reset_index(drop=True)
+    for m in METRICAS:
+        df[m] = rng.integers(0, 100_000, len(df)).astype(float if m.startswith('VL') else np.int64)
+    df.loc[rng.random(len(df)) < 0.02, 'VL_PagadorPF'] = np.nan
+    return df
+
+def intensidade_pix_meses():
+    return [a * 100 + m for a in range(2020, 2025) for m in range(1, 13) if a * 100 + m >= 202011]
+
+def cronometrar(func, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = func(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--municipios", type=int, default=5570)
+    args = parser.parse_args()
+
+    df = painel_sintetico(args.municipios)
+    esperado, t_legado = cronometrar(legado, df.copy())
+    obtido, t_novo = cronometrar(intensidade_pix.calcular_intensidades, df, METRICAS)
+    np.testing.assert_array_equal(esperado['intensidade_pix_bruta'].to_numpy(), obtido['QT_PagadorPF'].to_numpy())
+    print(f"primeiros 6  {len(obtido):>6,} municípios  idêntico ✅  legado (1 métrica) {t_legado:7.3f} s  "
+          f"segmentos ({len(METRICAS)} métricas) {t_novo:7.3f} s")
+
+    for janela, n, inicio, fim in [("movel", 6, None, 202206), ("calendario", 0, 202101, 202112)]:
+        obtido = intensidade_pix.calcular_intensidades(df, METRICAS, janela, n, inicio, fim)
+        for m in METRICAS:
+            np.testing.assert_allclose(obtido[m].to_numpy(), referencia(df, m, janela, n, inicio, fim), rtol=1e-12)
+        print(f"{janela:<12} confere com a referência em pandas ✅")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Micro-benchmark do mapeamento CNAE -> setor por chunk.
+
+Compara a cadeia antiga de operações de string do 05_transform_cnpj.py com o
+lookup vetorizado de setores.py: tempo por chunk e pico de alocação (tracemalloc).
+
+Uso (a partir de 01_etl/bench): python bench_setores.py --linhas 2000000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import setores  # noqa: E402
+
+def setor_legado(chunk):
+    """Implementação original (str[:2], astype(int), isin, between)."""
+    div = chunk['cnae'].str[:2].fillna('00')
+    setor = pd.Series('Servicos', index=chunk.index)
+    setor.loc[div.isin(['01', '02', '03'])] = 'Agro'
+    setor.loc[div.astype(int).between(5, 33)] = 'Industria'
+    setor.loc[div == '84'] = 'Setor Publico'
+    return setor
+
+def setor_lookup(chunk):
+    return setores.classificar_cnae(chunk['cnae_num'].to_numpy())
+
+def gerar_chunk(linhas, seed=0):
+    rng = np.random.default_rng(seed)
+    cnae = rng.integers(100000, 9999999, size=linhas)
+    return pd.DataFrame({
+        'cnae': pd.Series(cnae).astype(str).str.zfill(7),
+        'cnae_num': cnae.astype(np.float64),
+    })
+
+def medir(func, chunk, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        func(chunk)
+        tempos.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    func(chunk)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(tempos), pico
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, default=2_000_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    chunk = gerar_chunk(args.linhas)
+
+    # Sanidade: os dois caminhos devem concordar
+    legado = setor_legado(chunk).to_numpy()
+    novo = np.asarray(setores.SETORES, dtype=object)[setor_lookup(chunk)]
+    assert (legado == novo).all(), "Lookup diverge da implementação original"
+
+    print(f"Chunk de {args.linhas:,} linhas")
+    for nome, func in [("legado (strings)", setor_legado), ("lookup (setores.py)", setor_lookup)]:
+        tempo, pico = medir(func, chunk, args.repeticoes)
+        print(f"  {nome:<22} {tempo * 1000:9.1f} ms   pico alocado {pico / 1024 ** 2:8.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Equivalência e tempo da atribuição de grupos de tratamento (07).
+
+Roda a atribuição original (rank(method='first') + pd.qcut por esquema) e a versão
+em lote de tratamento.py para dezenas de esquemas (tercis a decis, várias métricas
+de intensidade, com empates e NaN), confere que os grupos são idênticos e mostra
+o tempo de cada uma. Os esquemas ponderados pela população são conferidos pelo peso
+de cada quantil.
+
+Uso (a partir de 01_etl/bench): python bench_tratamento.py --municipios 5570
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import tratamento  # noqa: E402
+
+def legado(df, coluna, n_groups):
+    """atribuir_grupos_tratamento antes da versão em lote."""
+    ranks = df[coluna].rank(method='first')
+    bins = pd.qcut(ranks, n_groups, labels=False) + 1
+    return np.select([bins == 1, bins == n_groups], [0, 1], default=np.nan)
+
+def dados_sinteticos(n_mun, n_metricas, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"populacao": rng.lognormal(9.5, 1.2, n_mun).astype(np.int64)})
+    for k in range(n_metricas):
+        x = rng.lognormal(0, 1, n_mun)
+        x[rng.random(n_mun) < 0.05] = 1.0  # Empates (como o clip em 1.0 da intensidade relativa)
+        x[rng.random(n_mun) < 0.02] = np.nan
+        df[f"intensidade_{k}"] = x
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--municipios", type=int, default=5570)
+    parser.add_argument("--metricas", type=int, default=4)
+    args = parser.parse_args()
+
+    df = dados_sinteticos(args.municipios, args.metricas)
+    esquemas = {f"treat_{c}_{g}": (c, g) for c in df.columns if c.startswith("intensidade") for g in range(3, 11)}
+
+    t0 = time.perf_counter()
+    esperado = np.column_stack([legado(df, c, g) for c, g in esquemas.values()])
+    t_legado = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    matriz, nomes = tratamento.atribuir_tratamentos(df, esquemas)
+    t_lote = time.perf_counter() - t0
+    np.testing.assert_array_equal(tratamento.como_float(matriz), esperado)
+    print(f"{len(nomes)} esquemas x {len(df):,} municípios  idêntico ✅  legado {t_legado:7.3f} s  "
+          f"lote {t_lote:7.3f} s  matriz int8 {matriz.nbytes / 1024:,.0f} KB (float64: {esperado.nbytes / 1024:,.0f} KB)")
+
+    # Ponderado: cada quantil extremo fica com ~1/g da população (no máximo um município a mais)
+    g = 5
+    matriz, _ = tratamento.atribuir_tratamentos(df, {"treat_pond": ("intensidade_0", g, "populacao")})
+    pop = df["populacao"].where(df["intensidade_0"].notna(), 0)
+    alvo = pop.sum() / g
+    for grupo in (tratamento.CONTROLE, tratamento.TRATADO):
+        soma = pop[matriz[:, 0] == grupo].sum()
+        assert abs(soma - alvo) <= pop.max(), (grupo, soma, alvo)
+    print(f"ponderado por população (g={g}): controle e tratado com ~1/{g} da população ✅")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Geradores determinísticos de dados brutos sintéticos para os benchmarks do ETL.
+
+Produz, num diretório de trabalho com a mesma árvore `data/` do projeto:
+  - CNPJ/RFB: Simples (7 colunas) e 10 arquivos de Estabelecimentos (30 colunas),
+    CSV com ';' e todos os campos entre aspas, como os arquivos da Receita;
+  - RAIS agregada por município x setor (um Parquet por ano, saída do 01);
+  - Pix mensal por município (um Parquet por mês, saída do 02);
+  - população, covariáveis e homicídios (entradas do 07 e do 09);
+  - de-para de municípios RFB -> IBGE (saída do 14, entrada do 15);
+  - opcionalmente, um .duckdb com as tabelas da Base dos Dados lidas pelo 03, 08 e 14
+    (para rodar as extrações com --duckdb, sem rede).
+
+O tamanho é uma fração `escala` do Brasil (1.0 = ~5.570 municípios, ~63 mi de
+estabelecimentos). Mesma escala + mesma semente = mesmos arquivos, byte a byte.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+
+# Tamanhos aproximados do país (escala 1.0)
+NACIONAL = {
+    "municipios": 5570,
+    "estabelecimentos": 63_000_000,
+}
+FRACAO_SIMPLES = 0.7  # Parcela dos CNPJs que aparece no arquivo do Simples
+FRACAO_MEI = 0.5      # Parcela dos optantes do Simples que também optou pelo MEI
+UFS = [11, 12, 13, 14, 15, 16, 17, 21, 22, 23, 24, 25, 26, 27, 28, 29,
+       31, 32, 33, 35, 41, 42, 43, 50, 51, 52, 53]
+ANOS_RAIS = range(2016, 2025)
+SETORES_RAIS = ["Agro", "Industria", "Servicos", "Setor Publico", "Outros"]
+LOTE = 1_000_000
+
+ARQUIVO_SIMPLES = "CNPJ/Simples/F.K03200$W.SIMPLES.CSV.D50913"
+ARQUIVO_ESTAB = "CNPJ/Estabelecimentos{i}/K3241.K03200Y{i}.D50913.ESTABELE"
+N_ARQUIVOS_ESTAB = 10
+MANIFESTO = "sinteticos.json"
+
+def tamanhos(escala):
+    """Número de municípios e de estabelecimentos para a escala pedida."""
+    return {
+        "municipios": max(10, round(NACIONAL["municipios"] * escala)),
+        "estabelecimentos": max(1000, round(NACIONAL["estabelecimentos"] * escala)),
+    }
+
+def _rng(seed, *chave):
+    # Um gerador por arquivo: regerar só um arquivo não muda os outros
+    return np.random.default_rng([seed, *chave])
+
+def _texto(valores, largura):
+    """Inteiros -> strings com zeros à esquerda (ex.: cnpj_basico com 8 dígitos)."""
+    return pc.utf8_lpad(pc.cast(pa.array(valores), pa.string()), largura, "0")
+
+def _escrever_csv_rfb(tabela, arquivo, novo):
+    """Anexa um lote no formato da RFB: ';', sem cabeçalho, tudo entre aspas."""
+    opcoes = pcsv.WriteOptions(include_header=False, delimiter=";", quoting_style="all_valid")
+    with open(arquivo, "wb" if novo else "ab") as f:
+        pcsv.write_csv(tabela, f, opcoes)
+
+def municipios_ibge(n, seed=0):
+    """Códigos IBGE de 7 dígitos, únicos, com prefixo de UF válido."""
+    rng = _rng(seed, 1)
+    ufs = rng.choice(UFS, n)
+    sufixos = rng.choice(100_000, n, replace=False)
+    return np.sort(ufs * 100_000 + sufixos).astype(np.int64)
+
+def municipios_rfb(n, seed=0):
+    """Códigos de município da RFB (tabela TOM, 4 dígitos)."""
+    return np.sort(_rng(seed, 2).choice(np.arange(1, 10_000), n, replace=False))
+
+def _datas(rng, n, ano_min, ano_max):
+    return (rng.integers(ano_min, ano_max + 1, n) * 10_000
+            + rng.integers(1, 13, n) * 100 + rng.integers(1, 29, n))
+
+def gerar_simples(destino, n_cnpj, seed=0):
+    """Arquivo do Simples: cnpj_basico, opção/datas do Simples e opção/datas do MEI."""
+    arquivo = os.path.join(destino, ARQUIVO_SIMPLES)
+    os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+    rng = _rng(seed, 3)
+    cnpjs = np.flatnonzero(rng.random(n_cnpj) < FRACAO_SIMPLES) + 1
+    for inicio in range(0, max(len(cnpjs), 1), LOTE):
+        lote = cnpjs[inicio:inicio + LOTE]
+        n = len(lote)
+        mei = rng.random(n) < FRACAO_MEI
+        ini_mei = _datas(rng, n, 2009, 2024)
+        # 30% dos MEIs saíram em algum ano posterior ao de entrada
+        sai = mei & (rng.random(n) < 0.3)
+        fim_mei = np.where(sai, np.minimum(ini_mei + rng.integers(1, 8, n) * 10_000, 20241231), 0)
+        tabela = pa.table({
+            "cnpj_basico": _texto(lote, 8),
+            "opcao_simples": pa.array(np.where(rng.random(n) < 0.8, "S", "N")),
+            "data_opcao_simples": _texto(_datas(rng, n, 2007, 2024), 8),
+            "data_exclusao_simples": _texto(np.zeros(n, np.int64), 8),
+            "opcao_mei": pa.array(np.where(mei, "S", "N")),
+            "data_opcao_mei": _texto(np.where(mei, ini_mei, 0), 8),
+            "data_exclusao_mei": _texto(fim_mei, 8),
+        })
+        _escrever_csv_rfb(tabela, arquivo, novo=inicio == 0)
+    return arquivo
+
+def gerar_estabelecimentos(destino, n_cnpj, n_mun, seed=0):
+    """10 arquivos de Estabelecimentos (30 colunas); CNAE na coluna 11 e município na 20."""
+    rng = _rng(seed, 4)
+    muns = municipios_rfb(n_mun, seed)
+    # Municípios com pesos desiguais (poucos grandes, muitos pequenos), como no dado real
+    pesos = rng.pareto(1.2, n_mun) + 1
+    pesos /= pesos.sum()
+    ordem = rng.permutation(n_cnpj) + 1
+    arquivos = []
+    for i in range(N_ARQUIVOS_ESTAB):
+        arquivo = os.path.join(destino, ARQUIVO_ESTAB.format(i=i))
+        os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+        cnpjs = ordem[i::N_ARQUIVOS_ESTAB]
+        rng_arq = _rng(seed, 5, i)
+        for inicio in range(0, max(len(cnpjs), 1), LOTE):
+            lote = cnpjs[inicio:inicio + LOTE]
+            n = len(lote)
+            vazio = pa.array([""] * n)
+            colunas = {f"c{c}": vazio for c in range(30)}
+            colunas["c0"] = _texto(lote, 8)
+            colunas["c1"] = pa.array(["0001"] * n)
+            colunas["c2"] = _texto(rng_arq.integers(0, 100, n), 2)
+            colunas["c3"] = pa.array(["1"] * n)
+            colunas["c5"] = pa.array(np.where(rng_arq.random(n) < 0.6, "02", "08"))
+            colunas["c10"] = _texto(_datas(rng_arq, n, 1990, 2024), 8)
+            colunas["c11"] = _texto(rng_arq.integers(1, 100, n) * 100_000 + rng_arq.integers(0, 100_000, n), 7)
+            colunas["c20"] = _texto(rng_arq.choice(muns, n, p=pesos), 4)
+            _escrever_csv_rfb(pa.table(colunas), arquivo, novo=inicio == 0)
+        arquivos.append(arquivo)
+    return arquivos
+
+def gerar_rais(destino, ibge, seed=0):
+    """RAIS agregada (ano, id_municipio, nome, setor, vínculos), um Parquet por ano."""
+    rng = _rng(seed, 6)
+    pasta = os.path.join(destino, "raw", "rais_agregada_municipio_setor")
+    os.makedirs(pasta, exist_ok=True)
+    grade = pd.MultiIndex.from_product([ibge, SETORES_RAIS], names=["id_municipio", "setor"]).to_frame(index=False)
+    for ano in ANOS_RAIS:
+        df = grade[rng.random(len(grade)) < 0.85].copy()
+        df.insert(0, "ano", ano)
+        df["nome_municipio"] = "Municipio " + df["id_municipio"].astype(str)
+        df["id_municipio"] = df["id_municipio"].astype(str)
+        df["quantidade_vinculos_ativos"] = rng.lognormal(6, 1.5, len(df)).round()
+        df = df[df["setor"] != "Outros"]  # Como o 01 grava
+        df[["ano", "id_municipio", "nome_municipio", "setor", "quantidade_vinculos_ativos"]].to_parquet(
+            os.path.join(pasta, f"rais_{ano}.parquet"), index=False)
+    return pasta
+
+def meses_pix(inicio="202011", fim="202412"):
+    meses = pd.period_range(pd.Period(f"{inicio[:4]}-{inicio[4:]}", "M"), pd.Period(f"{fim[:4]}-{fim[4:]}", "M"), freq="M")
+    return [int(m.strftime("%Y%m")) for m in meses]
+
+def gerar_pix(destino, ibge, seed=0):
+    """Transações Pix por município (layout do OData do BCB), um Parquet por mês."""
+    rng = _rng(seed, 7)
+    pasta = os.path.join(destino, "raw", "dados_pix")
+    os.makedirs(pasta, exist_ok=True)
+    n = len(ibge)
+    base = rng.lognormal(8, 1.5, n)  # Nível por município; cresce ao longo dos meses
+    for k, mes in enumerate(meses_pix()):
+        # Alguns municípios só aparecem depois (adoção tardia)
+        presente = rng.random(n) < min(1.0, 0.7 + 0.05 * k)
+        ids = ibge[presente]
+        m = len(ids)
+        qt = lambda escala: (base[presente] * escala * (1 + 0.08 * k) * rng.lognormal(0, 0.2, m)).astype(np.int64)  # noqa: E731
+        pd.DataFrame({
+            "AnoMes": mes,
+            "Municipio_Ibge": ids,
+            "Municipio": ["Municipio " + str(i) for i in ids],
+            "Estado": ["UF" + str(i // 100_000) for i in ids],
+            "Sigla_Regiao": "NE",
+            "VL_PagadorPF": qt(120.0).astype(float),
+            "QT_PagadorPF": qt(1.0),
+            "VL_RecebedorPF": qt(110.0).astype(float),
+            "QT_RecebedorPF": qt(0.9),
+            "VL_PagadorPJ": qt(300.0).astype(float),
+            "QT_PagadorPJ": qt(0.1),
+            "VL_RecebedorPJ": qt(250.0).astype(float),
+            "QT_RecebedorPJ": qt(0.3),
+            "QT_PES_PagadorPF": qt(0.05),
+            "QT_PES_RecebedorPF": qt(0.05),
+            "QT_PES_PagadorPJ": qt(0.005),
+            "QT_PES_RecebedorPJ": qt(0.01),
+        }).to_parquet(os.path.join(pasta, f"pix_{mes}.parquet"), index=False)
+    return pasta
+
+def gerar_municipais(destino, ibge, seed=0):
+    """População (03), covariáveis (08) e homicídios do Ipeadata (entrada manual do 09)."""
+    rng = _rng(seed, 8)
+    pasta = os.path.join(destino, "processed")
+    os.makedirs(pasta, exist_ok=True)
+    n = len(ibge)
+    populacao = rng.lognormal(9.5, 1.2, n).astype(np.int64) + 800
+    pd.DataFrame({
+        "ano": np.repeat([2019, 2020, 2021], n),
+        "id_municipio": np.tile(ibge.astype(str), 3),
+        "populacao": np.concatenate([populacao, (populacao * 1.01).astype(np.int64), (populacao * 1.02).astype(np.int64)]),
+    }).to_parquet(os.path.join(pasta, "populacao_agregada.parquet"), index=False)
+
+    pd.DataFrame({
+        "id_municipio": ibge.astype(str),
+        "nome": ["Municipio " + str(i) for i in ibge],
+        "sigla_uf": ["UF" + str(i // 100_000) for i in ibge],
+        "longitude": rng.uniform(-73, -35, n),
+        "latitude": rng.uniform(-33, 5, n),
+        "populacao": populacao,
+        "densidade_tel": rng.uniform(10, 150, n),
+        "idhm_e": rng.uniform(0.3, 0.85, n),
+        "pib_per_capita": rng.lognormal(9.8, 0.6, n),
+    }).to_parquet(os.path.join(pasta, "dataset_municipios_2019.parquet"), index=False)
+
+    with open(os.path.join(pasta, "homicidios_ipeadata.csv"), "w", encoding="utf-8") as f:
+        f.write("Taxa de homicídios\nSigla,Código,Município,2019\n")
+        for i, taxa in zip(ibge, rng.gamma(2, 12, n)):
+            f.write(f"UF{i // 100_000},{i},Municipio {i},{taxa:.2f}\n")
+    return pasta
+
+def de_para_municipios(ibge, seed=0):
+    """Código RFB (o mesmo de gerar_estabelecimentos) -> IBGE, pareados em ordem."""
+    return pd.DataFrame({
+        "id_municipio_rf": municipios_rfb(len(ibge), seed).astype(np.int32),
+        "id_municipio": ibge.astype(np.int32),
+    })
+
+def gerar_de_para(destino, ibge, seed=0):
+    """Saída do 14_extract_municipios_rfb (raw/municipios_rfb_ibge.parquet)."""
+    pasta = os.path.join(destino, "raw")
+    os.makedirs(pasta, exist_ok=True)
+    de_para_municipios(ibge, seed).to_parquet(os.path.join(pasta, "municipios_rfb_ibge.parquet"), index=False)
+    return pasta
+
+def gerar_base_dos_dados_duckdb(caminho, ibge, seed=0):
+    """Tabelas da Base dos Dados usadas pelo 03, 08 e 14, nos nomes locais do clientes_sql."""
+    import duckdb
+
+    rng = _rng(seed, 9)
+    n = len(ibge)
+    ids = ibge.astype(str)
+    uf = np.array([str(i // 100_000) for i in ibge])
+    anos = np.arange(2016, 2025)
+    populacao = rng.lognormal(9.5, 1.2, n).astype(np.int64) + 800
+    tabelas = {
+        "br_bd_diretorios_brasil.uf": pd.DataFrame({"sigla": np.unique(uf), "nome": ["UF " + u for u in np.unique(uf)]}),
+        "br_bd_diretorios_brasil.municipio": pd.DataFrame({
+            "id_municipio": ids, "nome": ["Municipio " + i for i in ids], "sigla_uf": uf,
+            # Como na Base dos Dados: texto de 4 dígitos com zeros à esquerda
+            "id_municipio_rf": [f"{c:04d}" for c in de_para_municipios(ibge, seed)["id_municipio_rf"]],
+            "lon": rng.uniform(-73, -35, n), "lat": rng.uniform(-33, 5, n),
+        }),
+        "br_ibge_populacao.municipio": pd.DataFrame({
+            "ano": np.repeat(anos, n), "sigla_uf": np.tile(uf, len(anos)), "id_municipio": np.tile(ids, len(anos)),
+            "populacao": np.concatenate([(populacao * 1.01 ** (a - 2016)).astype(np.int64) for a in anos]),
+        }),
+        "br_ibge_pib.municipio": pd.DataFrame({
+            "ano": np.repeat(anos, n), "id_municipio": np.tile(ids, len(anos)),
+            "pib": np.tile(populacao * rng.lognormal(9.8, 0.6, n), len(anos)),
+        }),
+        "br_anatel_telefonia_movel.densidade_municipio": pd.DataFrame({
+            "ano": 2019, "mes": 12, "id_municipio": ids, "densidade": rng.uniform(10, 150, n),
+        }),
+        "mundo_onu_adh.municipio": pd.DataFrame({"ano": 2010, "id_municipio": ids, "idhm_e": rng.uniform(0.3, 0.85, n)}),
+    }
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    conexao = duckdb.connect(caminho)
+    for tabela, df in tabelas.items():
+        nome = "basedosdados__" + tabela.replace(".", "__")
+        conexao.register("df", df)
+        if tabela == "br_bd_diretorios_brasil.municipio":
+            # Geografia do BigQuery -> STRUCT(x, y) (ver clientes_sql.traduzir_para_duckdb)
+            conexao.execute(f"CREATE TABLE {nome} AS SELECT id_municipio, nome, sigla_uf, id_municipio_rf, "
+                            "struct_pack(x := lon, y := lat) AS centroide FROM df")
+        else:
+            conexao.execute(f"CREATE TABLE {nome} AS SELECT * FROM df")
+        conexao.unregister("df")
+    conexao.close()
+    return caminho
+
+def gerar_tudo(destino, escala, seed=0, forcar=False):
+    """
+    Gera o conjunto completo em `destino` (a pasta `data/` de um diretório de trabalho).
+    Reaproveita os arquivos se o manifesto indicar a mesma escala e semente.
+    Retorna o manifesto (tamanhos gerados).
+    """
+    manifesto = os.path.join(destino, MANIFESTO)
+    esperado = {"escala": escala, "seed": seed, **tamanhos(escala)}
+    if not forcar and os.path.exists(manifesto):
+        with open(manifesto, encoding="utf-8") as f:
+            if json.load(f) == esperado:
+                return esperado
+
+    n = tamanhos(escala)
+    raw = os.path.join(destino, "raw")
+    ibge = municipios_ibge(n["municipios"], seed)
+    gerar_simples(raw, n["estabelecimentos"], seed)
+    gerar_estabelecimentos(raw, n["estabelecimentos"], n["municipios"], seed)
+    gerar_rais(destino, ibge, seed)
+    gerar_pix(destino, ibge, seed)
+    gerar_municipais(destino, ibge, seed)
+    gerar_de_para(destino, ibge, seed)
+
+    with open(manifesto, "w", encoding="utf-8") as f:
+        json.dump(esperado, f, indent=2)
+    return esperado
@@ -1,22 +1,24 @@
-import basedosdados as bd
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import argparse
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
-def main():
-    load_dotenv()
-    billing_id = os.getenv("BILLING_ID")
-    output_path = '../data/raw/rais_agregada_municipio_setor.parquet'
-    
-    # Anos de interesse
-    anos = range(2016, 2025) 
-    dfs = []
-
-    for ano in anos:
-        print(f"🔄 Baixando e agregando RAIS {ano} por Setor...")
-        
-        # SQL com a lógica de setorização embutida
-        query = f"""
+import clientes_sql
+import instrumentacao
+import setores
+
+# Um Parquet por ano, gravado assim que o ano chega
+OUTPUT_DIR = '../data/raw/rais_agregada_municipio_setor'
+
+# Anos de interesse
+ANOS = range(2016, 2025)
+
+def montar_query(ano):
+    # SQL com a lógica de setorização gerada a partir de setores.py
+    return f"""
         WITH rais_setorizada AS (
             SELECT
                 t1.ano,
@@ -33,42 +35,97 @@ def main():
             ano,
             id_municipio,
             nome_municipio,
-            CASE 
-                WHEN div BETWEEN 1 AND 3 THEN 'Agro'
-                WHEN div BETWEEN 5 AND 33 THEN 'Industria'
-                WHEN div = 84 THEN 'Setor Publico'
-                WHEN div BETWEEN 35 AND 99 THEN 'Servicos'
-                ELSE 'Outros'
-            END AS setor,
+            {setores.sql_case('div')} AS setor,
             SUM(quantidade_vinculos_ativos) AS quantidade_vinculos_ativos
         FROM rais_setorizada
         GROUP BY 1, 2, 3, 4
         """
-        
-        try:
-            df_temp = bd.read_sql(query=query, billing_project_id=billing_id)
-            if not df_temp.empty:
-                # Removemos 'Outros' aqui para manter o painel limpo para o DID
-                df_temp = df_temp[df_temp['setor'] != 'Outros']
-                dfs.append(df_temp)
-                print(f"✅ {ano} processado.")
-        except Exception as e:
-            print(f"⚠️ Erro em {ano}: {e}")
-
-    # Empilhamento final
-    if dfs:
-        df_completo = pd.concat(dfs, ignore_index=True)
-        
-        # Tipagem para garantir economia de memória no Parquet
-        df_completo['ano'] = df_completo['ano'].astype(int)
-        df_completo['quantidade_vinculos_ativos'] = df_completo['quantidade_vinculos_ativos'].fillna(0).astype(float)
-        
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        df_completo.to_parquet(output_path, index=False, compression='snappy')
-        print(f"\n📊 Sucesso! Total extraído: {len(df_completo):,} linhas.")
-        print(f"📂 Salvo em: {output_path}")
+
+def caminho_particao(ano, output_dir=OUTPUT_DIR):
+    return os.path.join(output_dir, f'rais_{ano}.parquet')
+
+def particao_valida(path):
+    """Partição em cache só conta se o Parquet abre e tem linhas (arquivo truncado é refeito)."""
+    try:
+        return pq.read_metadata(path).num_rows > 0
+    except (OSError, pa.ArrowException):
+        return False
+
+def extrair_ano(ano, executar_query, output_dir=OUTPUT_DIR):
+    """Baixa um ano, limpa e grava a partição. Retorna o número de linhas gravadas."""
+    with instrumentacao.cronometro("query", ano=ano) as m:
+        df_temp = executar_query(montar_query(ano))
+        m["linhas"] = len(df_temp)
+    if df_temp.empty:
+        raise ValueError(f"Query da RAIS {ano} retornou vazio")
+
+    # Removemos 'Outros' aqui para manter o painel limpo para o DID
+    df_temp = df_temp[df_temp['setor'] != 'Outros'].copy()
+
+    # Tipagem para garantir economia de memória no Parquet
+    df_temp['ano'] = df_temp['ano'].astype(int)
+    df_temp['quantidade_vinculos_ativos'] = df_temp['quantidade_vinculos_ativos'].fillna(0).astype(float)
+
+    # Escrita atômica: um ano interrompido nunca parece válido na próxima execução
+    path = caminho_particao(ano, output_dir)
+    tmp = os.path.join(output_dir, f'.rais_{ano}.parquet.tmp')  # oculto: o leitor do diretório ignora
+    with instrumentacao.cronometro("gravacao", ano=ano, linhas=len(df_temp)):
+        df_temp.to_parquet(tmp, index=False, compression='snappy')
+        os.replace(tmp, path)
+    instrumentacao.contar("linhas", len(df_temp))
+    return len(df_temp)
+
+def extrair_rais(executar_query, anos=ANOS, output_dir=OUTPUT_DIR, workers=4, forcar=False):
+    """
+    Dispara as queries dos anos em paralelo, pulando anos com partição válida.
+    Retorna (linhas por ano baixado, anos pulados, erros por ano).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    pendentes = [a for a in anos if forcar or not particao_valida(caminho_particao(a, output_dir))]
+    pulados = [a for a in anos if a not in pendentes]
+
+    linhas, erros = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futuros = {pool.submit(extrair_ano, a, executar_query, output_dir): a for a in pendentes}
+        for futuro in as_completed(futuros):
+            ano = futuros[futuro]
+            try:
+                linhas[ano] = futuro.result()
+                print(f"✅ {ano} processado ({linhas[ano]:,} linhas).")
+            except Exception as e:
+                erros[ano] = str(e)
+                print(f"⚠️ Erro em {ano}: {e}")
+    return linhas, pulados, erros
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extração da RAIS agregada por município e setor (um Parquet por ano).")
+    parser.add_argument("--anos", type=int, nargs=2, metavar=("INICIO", "FIM"), default=(ANOS.start, ANOS.stop - 1))
+    parser.add_argument("--workers", type=int, default=4, help="Queries simultâneas.")
+    parser.add_argument("--forcar", action="store_true", help="Baixa de novo anos já em cache.")
+    parser.add_argument("--duckdb", default=None,
+                        help="Roda as queries num arquivo .duckdb local em vez do BigQuery (fixtures/testes).")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    instrumentacao.iniciar("01_extract_rais")
+    load_dotenv()
+    if args.duckdb:
+        executar_query = clientes_sql.cliente_duckdb(args.duckdb)
     else:
-        print("❌ Nenhum dado foi baixado.")
+        executar_query = clientes_sql.cliente_basedosdados(os.getenv("BILLING_ID"))
+
+    anos = range(args.anos[0], args.anos[1] + 1)
+    print(f"🔄 Baixando e agregando RAIS {anos.start}-{anos.stop - 1} por Setor ({args.workers} em paralelo)...")
+    linhas, pulados, erros = extrair_rais(executar_query, anos, OUTPUT_DIR, args.workers, args.forcar)
+
+    if pulados:
+        print(f"♻️  Anos em cache: {', '.join(map(str, pulados))}")
+    print(f"\n📊 Extraídas {sum(linhas.values()):,} linhas em {len(linhas)} ano(s).")
+    print(f"📂 Partições em: {OUTPUT_DIR}")
+    if erros:
+        print(f"❌ Falharam (rode de novo para tentar só estes): {', '.join(map(str, sorted(erros)))}")
+        raise SystemExit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,30 +1,148 @@
-import requests
-import pandas as pd
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
 from pathlib import Path
 
-def fetch_pix_data(data_base: str):
-    """Obtém dados da API do BCB para um mês específico (YYYYMM)."""
-    url = f"https://olinda.bcb.gov.br/olinda/servico/Pix_DadosAbertos/versao/v1/odata/TransacoesPixPorMunicipio(DataBase=@DataBase)?@DataBase='{data_base}'&$format=json"
-    try:
-        response = requests.get(url)
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+from urllib3.util.retry import Retry
+
+import instrumentacao
+
+BASE_URL = "https://olinda.bcb.gov.br/olinda/servico/Pix_DadosAbertos/versao/v1/odata"
+ENDPOINT = "TransacoesPixPorMunicipio(DataBase=@DataBase)"
+OUTPUT_DIR = '../data/raw/dados_pix'
+FIRST_MONTH = '202011'  # Lançamento do Pix
+PAGE_SIZE = 10_000
+ORDER_KEY = 'Municipio_Ibge'  # Uma linha por município e mês: ordem estável para o $skip e chave única
+
+class InconsistentPagination(ValueError):
+    """Páginas do mesmo mês com registros repetidos (a ordem mudou entre requisições)."""
+
+def make_session(concurrency=4, retries=5, backoff=1.0):
+    """Sessão HTTP com pool de conexões e retry com backoff exponencial (1s, 2s, 4s...)."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def month_range(start=FIRST_MONTH, end=None):
+    """Lista de DataBase (YYYYMM) de start até end (padrão: mês atual)."""
+    end = end or date.today().strftime('%Y%m')
+    year, month = int(start[:4]), int(start[4:])
+    months = []
+    while f"{year}{month:02d}" <= end:
+        months.append(f"{year}{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+def fetch_pix_data(data_base: str, session=None, base_url=BASE_URL, page_size=PAGE_SIZE, timeout=60):
+    """
+    Obtém todos os registros de um mês (YYYYMM), paginando com $top/$skip sobre $orderby
+    (sem ordem explícita o servidor pode devolver páginas que se sobrepõem ou pulam linhas).
+    """
+    session = session or make_session(concurrency=1)
+    records = []
+    skip = 0
+    while True:
+        url = (f"{base_url}/{ENDPOINT}?@DataBase='{data_base}'&$format=json"
+               f"&$orderby={ORDER_KEY}&$top={page_size}&$skip={skip}")
+        response = session.get(url, timeout=timeout)
         response.raise_for_status()
-        return response.json().get('value', [])
-    except requests.exceptions.RequestException as e:
-        print(f"Erro na requisição: {e}")
-        return []
+        page = response.json().get('value', [])
+        records.extend(page)
+        if len(page) < page_size:
+            break
+        skip += page_size
+    # Checado antes da gravação atômica: um mês inconsistente não chega ao disco
+    keys = [r.get(ORDER_KEY) for r in records]
+    repeated = len(keys) - len(set(keys))
+    if repeated:
+        raise InconsistentPagination(f"{repeated} registros com {ORDER_KEY} repetido em {len(records)} "
+                                     f"(páginas de {page_size}); baixe o mês de novo.")
+    return records
+
+def month_path(output_dir, data_base):
+    return Path(output_dir) / f"pix_{data_base}.parquet"
 
 def save_to_parquet(data, output_path):
-    """Converte para DataFrame e salva em Parquet."""
+    """Converte para DataFrame e salva em Parquet (escrita atômica: nada de arquivo pela metade)."""
     if not data:
         return
     df = pd.DataFrame(data)
     out = Path(output_path)
     out.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(out, index=False)
-    print(f"Salvo: {out} ({len(df)} registros)")
+    tmp = out.parent / f".{out.name}.tmp"  # oculto: pd.read_parquet(diretório) ignora
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, out)
+
+def download_month(data_base, session, output_dir=OUTPUT_DIR, base_url=BASE_URL, page_size=PAGE_SIZE):
+    """Baixa e grava um mês. Retorna o número de registros (0 = mês sem dados)."""
+    with instrumentacao.cronometro("mes", data_base=data_base) as m:
+        data = fetch_pix_data(data_base, session, base_url, page_size)
+        save_to_parquet(data, month_path(output_dir, data_base))
+        m["linhas"] = len(data)
+    instrumentacao.contar("linhas", len(data))
+    return len(data)
+
+def download_history(start=FIRST_MONTH, end=None, output_dir=OUTPUT_DIR, base_url=BASE_URL,
+                     concurrency=4, page_size=PAGE_SIZE, retries=5, force=False):
+    """
+    Baixa todos os meses em paralelo (no máximo `concurrency` requisições simultâneas),
+    pulando meses já gravados. Retorna (baixados, pulados, falhas).
+    """
+    months = month_range(start, end)
+    pending = [m for m in months if force or not month_path(output_dir, m).exists()]
+    skipped = len(months) - len(pending)
+
+    session = make_session(concurrency, retries)
+    downloaded, failures = {}, {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(download_month, m, session, output_dir, base_url, page_size): m for m in pending}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="📥 Pix por mês"):
+            month = futures[future]
+            try:
+                downloaded[month] = future.result()
+            except (requests.exceptions.RequestException, InconsistentPagination) as e:
+                failures[month] = str(e)
+    return downloaded, skipped, failures
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Download do histórico de transações Pix por município (BCB).")
+    parser.add_argument("--inicio", default=FIRST_MONTH, help="Primeiro mês (YYYYMM).")
+    parser.add_argument("--fim", default=None, help="Último mês (YYYYMM). Padrão: mês atual.")
+    parser.add_argument("--concorrencia", type=int, default=4, help="Requisições simultâneas.")
+    parser.add_argument("--top", type=int, default=PAGE_SIZE, help="Registros por página ($top).")
+    parser.add_argument("--tentativas", type=int, default=5, help="Retries por requisição.")
+    parser.add_argument("--url-base", default=BASE_URL, help="URL base do OData (ex.: servidor stub local).")
+    parser.add_argument("--saida", default=OUTPUT_DIR, help="Diretório com um Parquet por mês.")
+    parser.add_argument("--forcar", action="store_true", help="Baixa de novo meses já gravados.")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    # Exemplo de uso
-    mes = '202011'
-    raw_data = fetch_pix_data(mes)
-    save_to_parquet(raw_data, '../data/raw/dados_pix.parquet')
\ No newline at end of file
+    args = parse_args()
+    instrumentacao.iniciar("02_extract_pix")
+    downloaded, skipped, failures = download_history(
+        args.inicio, args.fim, args.saida, args.url_base,
+        args.concorrencia, args.top, args.tentativas, args.forcar
+    )
+    empty = [m for m, n in downloaded.items() if n == 0]
+    print(f"Salvo: {args.saida} ({sum(downloaded.values())} registros em {len(downloaded) - len(empty)} meses; "
+          f"{skipped} meses já existiam)")
+    if empty:
+        print(f"Meses sem dados na API: {', '.join(sorted(empty))}")
+    for month, error in sorted(failures.items()):
+        print(f"Erro na requisição ({month}): {error}")
+    if failures:
+        raise SystemExit(1)
@@ -1,11 +1,19 @@
-import basedosdados as bd
 import pandas as pd
+import argparse
 import os
 from dotenv import load_dotenv
 
+import cache_sql
+import instrumentacao
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extração da população municipal (Base dos Dados).")
+    return cache_sql.adicionar_argumentos(parser).parse_args()
+
 def main():
+    args = parse_args()
+    instrumentacao.iniciar("03_extract_populacao")
     load_dotenv()
-    billing_id = os.getenv("BILLING_ID")
     query_path = '../queries/populacao.sql'
     output_path = '../data/processed/populacao_agregada.parquet'
 
@@ -20,8 +28,11 @@ def main():
     print("🔄 Executando query de população na Base dos Dados...")
 
     try:
+        executar_query = cache_sql.cliente(args, os.getenv("BILLING_ID"))
         # Download direto da base agregada (sem loop, se a query já tratar os anos)
-        df = bd.read_sql(query=query, billing_project_id=billing_id)
+        with instrumentacao.cronometro("query") as m:
+            df = executar_query(query)
+            m["linhas"] = len(df)
         
         if not df.empty:
             # Garantir diretório e salvar
@@ -31,6 +42,9 @@ def main():
         else:
             print("⚠️ Query retornou um DataFrame vazio.")
 
+    except cache_sql.CacheAusente as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
     except Exception as e:
         print(f"⚠️ Erro na execução: {e}")
 
@@ -3,8 +3,12 @@ import numpy as np
 import os
 import gc
 
+import balanceamento
+import esquema_painel
+import instrumentacao
+
 # --- CONFIGURAÇÃO DE CAMINHOS ---
-INPUT_FILE = '../data/raw/rais_agregada_municipio_setor.parquet'
+INPUT_FILE = '../data/raw/rais_agregada_municipio_setor'  # Um Parquet por ano (01_extract_rais.py)
 OUTPUT_DIR = '../data/processed'
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, 'rais_painel_balanceado.parquet')
 
@@ -12,47 +16,25 @@ def balancear_painel_final(df):
     """
     Garante que cada município tenha os setores + Total em todos os anos.
     """
-    print("⚖️  [1/3] Calculando agregados do setor 'Total'...")
-    
-    # 1. Gerar o Total por Município/Ano
-    # Mantemos colunas extras de ID caso existam (ex: ano_tratamento)
-    cols_agregacao = ['id_municipio', 'ano']
-    if 'ano_tratamento' in df.columns:
-        cols_agregacao.append('ano_tratamento')
-
-    df_total = df.groupby(cols_agregacao, as_index=False)['quantidade_vinculos_ativos'].sum()
-    df_total['setor'] = 'Total'
-
-    # Unir com os setores originais
-    df = pd.concat([df, df_total], ignore_index=True)
-
-    print("⚙️  [2/3] Criando grid completo (Município x Setor x Ano)...")
+    print("⚙️  [1/2] Montando grid completo (Município x Setor x Ano) + setor 'Total'...")
     
-    todos_muns = df['id_municipio'].unique()
-    todos_sets = ['Agro', 'Industria', 'Servicos', 'Setor Publico', 'Total']
-    todos_anos = sorted(df['ano'].unique())
-    
-    index_completo = pd.MultiIndex.from_product(
-        [todos_muns, todos_sets, todos_anos], 
-        names=['id_municipio', 'setor', 'ano']
+    # Cubo denso: lacunas ficam em zero e o Total é a soma dos setores;
+    # log calculado sobre a soma (correto para o Total)
+    df_balanceado = balanceamento.balancear(
+        df, 'id_municipio', ['quantidade_vinculos_ativos'], log_de='quantidade_vinculos_ativos'
     )
     
-    # 3. Reindexar (Preenche lacunas com zero)
-    df_balanceado = (df.set_index(['id_municipio', 'setor', 'ano'])
-                     .reindex(index_completo, fill_value=0)
-                     .reset_index())
-    
-    # 4. Recuperar nomes dos municípios
-    nomes = df[['id_municipio', 'nome_municipio']].dropna().drop_duplicates()
-    df_balanceado = df_balanceado.drop(columns=['nome_municipio'], errors='ignore').merge(nomes, on='id_municipio', how='left')
-    
-    print("🧪 [3/3] Calculando logs (Econometria)...")
-    # Log calculado sobre a soma (correto para o Total)
-    df_balanceado['log_estoque'] = np.log1p(df_balanceado['quantidade_vinculos_ativos'].astype(np.float32))
+    print("🏷️  [2/2] Recuperando nomes dos municípios...")
+    # Atributos fixos do município (ex: ano_tratamento) voltam pelo mesmo merge
+    cols_atributos = [c for c in ['nome_municipio', 'ano_tratamento'] if c in df.columns]
+    if cols_atributos:
+        atributos = df[['id_municipio'] + cols_atributos].dropna().drop_duplicates('id_municipio')
+        df_balanceado = df_balanceado.merge(atributos, on='id_municipio', how='left')
     
     return df_balanceado
 
 def main():
+    instrumentacao.iniciar("04_transform_rais")
     print("--- INICIANDO TRANSFORMAÇÃO RAIS ---")
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     
@@ -60,16 +42,22 @@ def main():
         print(f"❌ Erro: Arquivo {INPUT_FILE} não encontrado.")
         return
 
-    df_raw = pd.read_parquet(INPUT_FILE)
-    
-    # Filtro preventivo
-    df_raw = df_raw.dropna(subset=['id_municipio'])
-    df_raw = df_raw[~df_raw['setor'].isin(['Outros', 'Total'])] # Evita duplicar se o Total já existir
+    with instrumentacao.cronometro("leitura") as m:
+        df_raw = pd.read_parquet(INPUT_FILE)
+        
+        # Filtro preventivo
+        df_raw = df_raw.dropna(subset=['id_municipio'])
+        df_raw = df_raw[~df_raw['setor'].isin(['Outros', 'Total'])] # Evita duplicar se o Total já existir
+        df_raw = esquema_painel.aplicar_esquema(df_raw.copy())
+        m["linhas"] = len(df_raw)
     
-    df_final = balancear_painel_final(df_raw)
+    with instrumentacao.cronometro("balanceamento") as m:
+        df_final = balancear_painel_final(df_raw)
+        m["linhas"] = len(df_final)
     
     print(f"💾 Salvando painel balanceado ({len(df_final):,} linhas)...")
-    df_final.to_parquet(OUTPUT_FILE, index=False, compression='snappy')
+    with instrumentacao.cronometro("gravacao", linhas=len(df_final)):
+        esquema_painel.salvar_painel(df_final, OUTPUT_FILE)
     
     del df_raw, df_final
     gc.collect()
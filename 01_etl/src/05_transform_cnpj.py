@@ -1,10 +1,22 @@
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
+import argparse
 import gc
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+import agregacao_streaming
+import esquema_painel
+import fluxo_mensal
+import incremental_mei
+import indice_mei
+import instrumentacao
+import rfb_parquet
+import setores
+
 # --- CONFIGURAÇÃO DE CAMINHOS ---
 BASE_PATH = "../data/raw/CNPJ"
 # Lista os 10 arquivos de estabelecimentos conforme o layout da RFB [cite: 3, 16]
@@ -12,103 +24,366 @@ ARQUIVOS_ESTAB = [os.path.join(BASE_PATH, f"Estabelecimentos{i}/K3241.K03200Y{i}
 CAMINHO_SIMPLES = os.path.join(BASE_PATH, "Simples/F.K03200$W.SIMPLES.CSV.D50913")
 OUTPUT_DIR = "../data/processed"
 SAIDA_FINAL = os.path.join(OUTPUT_DIR, 'painel_mei_rf_anual.parquet')
+SAIDA_MENSAL = os.path.join(OUTPUT_DIR, 'painel_mei_rf_mensal.parquet')
 
-def main():
-    print("--- INICIANDO ETL MEI OTIMIZADO E CORRIGIDO ---")
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    
-    # 1. Carregar Simples: Contém os indicadores de opção pelo MEI e as datas [cite: 20]
-    print("🚀 Carregando base do Simples...")
+CHUNKSIZE = 2_000_000
+
+# Índice MEI compartilhado com os workers (memory-map aberto no initializer)
+_INDICE_MEI = None
+
+def separar_datas(df_simples):
+    """Datas YYYYMMDD -> ano e mês por aritmética inteira (sem parse de datetime). Sem data vira 0."""
+    for lado in ('ini', 'fim'):
+        data = pd.to_numeric(df_simples[f'data_{lado}'], errors='coerce').fillna(0).to_numpy(np.int64)
+        df_simples[f'ano_{lado}'] = data // 10000
+        df_simples[f'mes_{lado}'] = data // 100 % 100
+    return df_simples
+
+def carregar_simples(fonte="csv"):
+    """Carrega a base do Simples e mantém apenas optantes MEI com anos de início/fim."""
+    if fonte == "parquet":
+        # Filtro MEI empurrado para o scan: só as linhas 'S' saem do Parquet
+        df_simples = rfb_parquet.abrir_dataset("simples", CAMINHO_SIMPLES).to_table(
+            columns=["cnpj_basico", "data_ini", "data_fim"],
+            filter=rfb_parquet.ds.field("opcao_mei") == "S",
+        ).to_pandas()
+        return separar_datas(df_simples).drop(columns=["data_ini", "data_fim"])
+
+    # Contém os indicadores de opção pelo MEI e as datas [cite: 20]
     df_simples = pd.read_csv(
-        CAMINHO_SIMPLES, 
-        sep=";", 
-        encoding="latin-1", 
-        header=None, 
-        usecols=[0, 4, 5, 6], 
+        CAMINHO_SIMPLES,
+        sep=";",
+        encoding="latin-1",
+        header=None,
+        usecols=[0, 4, 5, 6],
         names=["cnpj_basico", "opcao_mei", "data_ini", "data_fim"],
         dtype={"cnpj_basico": "int32", "opcao_mei": "str", "data_ini": "str", "data_fim": "str"}
     )
-    
+
     # Filtra apenas quem é ou já foi optante pelo MEI [cite: 20]
     df_simples = df_simples[df_simples["opcao_mei"] == "S"].copy()
-    
-    # Converte datas para Ano via vetorização (YYYYMMDD -> YYYY) 
-    df_simples['ano_ini'] = pd.to_numeric(df_simples['data_ini'], errors='coerce').fillna(0) // 10000
-    df_simples['ano_fim'] = pd.to_numeric(df_simples['data_fim'], errors='coerce').fillna(0) // 10000
-    
+
+    df_simples = separar_datas(df_simples)
+
     # Limpeza: Mantemos apenas anos razoáveis para evitar o "ano zero"
     df_simples = df_simples.drop(columns=["opcao_mei", "data_ini", "data_fim"])
     gc.collect()
+    return df_simples
+
+def preparar_indice_mei(reconstruir=False, fonte="csv"):
+    """Garante o índice MEI em disco, relendo o Simples só quando o arquivo de origem mudou."""
+    if not reconstruir and indice_mei.indice_valido(CAMINHO_SIMPLES):
+        print("♻️  Índice MEI em cache, pulando leitura do Simples.")
+        return
+    print("🚀 Carregando base do Simples e construindo índice MEI...")
+    with instrumentacao.cronometro("leitura_simples", fonte=fonte) as m:
+        df_simples = carregar_simples(fonte)
+        m["linhas"] = len(df_simples)
+    with instrumentacao.cronometro("indice_mei"):
+        indice_mei.salvar_indice(indice_mei.construir_indice(df_simples), CAMINHO_SIMPLES)
+    del df_simples
+    gc.collect()
+
+def ler_estabelecimentos(path, chunksize=CHUNKSIZE, fonte="csv"):
+    """Itera chunks (cnpj_basico, cnae, mun) de um arquivo de Estabelecimentos, do CSV ou do cache Parquet."""
+    if fonte == "parquet":
+        for chunk in rfb_parquet.ler_lotes("estabelecimentos", path, ["cnpj_basico", "cnae", "mun"], tamanho_lote=chunksize):
+            chunk['mun'] = chunk['mun'].astype("float64")
+            yield chunk
+        return
+
+    # Chunksize grande para velocidade, mas monitorando a RAM [cite: 38, 39]
+    yield from pd.read_csv(
+        path,
+        sep=";",
+        encoding="latin-1",
+        header=None,
+        usecols=[0, 11, 20],
+        names=["cnpj_basico", "cnae", "mun"],
+        dtype={"cnpj_basico": "int32", "cnae": "float64", "mun": "float64"},
+        chunksize=chunksize
+    )
+
+def agregar_chunk(chunk, indice, fases, coletar_estado=False):
+    """Fluxos (mun, setor, ano) de um chunk; devolve (fluxo, estado do chunk ou None, linhas MEI)."""
+    with fases("cruzamento_simples"):
+        # Cruzamento interno: só processamos quem está na lista de MEIs [cite: 5, 11]
+        pos, achou = indice_mei.consultar(indice, chunk['cnpj_basico'].to_numpy())
+        chunk = chunk[achou].copy()
+        chunk['ano_ini'] = indice['ano_ini'][pos[achou]]
+        chunk['ano_fim'] = indice['ano_fim'][pos[achou]]
+
+    with fases("setorizacao"):
+        # Mapeamento Setorial (Divisão CNAE - 2 primeiros dígitos) por tabela de lookup [cite: 17, 36]
+        chunk['setor'] = setores.classificar_cnae(chunk['cnae'].to_numpy())
+    estado = None
+    if coletar_estado:
+        with fases("estado"):
+            estado = incremental_mei.estado_do_chunk(chunk)
+
+    with fases("groupby"):
+        # Agregação de Entradas: Apenas anos válidos (> 1900)
+        ent = chunk[chunk['ano_ini'] > 1900].groupby(['mun', 'setor', 'ano_ini']).size().reset_index(name='entradas')
+        ent.columns = ['mun', 'setor', 'ano', 'entradas']
+
+        # Agregação de Saídas: CRUCIAL - Ignora NaTs/Zeros para evitar estoque negativo
+        sai = chunk[chunk['ano_fim'] > 1900].groupby(['mun', 'setor', 'ano_fim']).size().reset_index(name='saidas')
+        sai.columns = ['mun', 'setor', 'ano', 'saidas']
+
+        # Merge de Fluxo
+        fluxo = pd.merge(ent, sai, on=['mun', 'setor', 'ano'], how='outer').fillna(0)
+    return fluxo, estado, len(chunk)
+
+def processar_arquivo(path, indice, chunksize=CHUNKSIZE, mostrar_progresso=True, fonte="csv", coletar_estado=False,
+                      motor="pandas", orcamento_mb=256, janela_mensal=None):
+    """
+    Agrega um arquivo de Estabelecimentos em fluxos (mun, setor, ano) -> entradas/saidas.
+    Retorna (agregado, estado): agregado é None se o arquivo não existir ou não tiver MEIs;
+    estado (linhas por estabelecimento MEI para o modo incremental) só vem com coletar_estado.
+    Com janela_mensal = (AAAAMM inicial, AAAAMM final), o agregado é o cubo mensal compactado.
+    """
+    if not os.path.exists(path):
+        return None, None
+
+    if janela_mensal is not None:
+        # Mesmos chunks do painel anual; o cubo mensal substitui o groupby
+        with instrumentacao.cronometro("arquivo", arquivo=os.path.basename(path), motor="mensal") as m:
+            cubo = fluxo_mensal.CuboMensal(*janela_mensal)
+            for chunk in tqdm(ler_estabelecimentos(path, chunksize, fonte), desc=f"📅 {os.path.basename(path)}",
+                              disable=not mostrar_progresso):
+                fluxo_mensal.agregar_chunk(cubo, chunk, indice)
+            m["municipios"] = len(cubo.codigos)
+        return cubo.compactar(), None
 
-    painel_final_lista = []
-
-    # 2. Loop Estabelecimentos: Contém CNAE e Código de Município [cite: 3, 17]
-    for path in ARQUIVOS_ESTAB:
-        if not os.path.exists(path):
-            continue
-        
-        painel_arquivo = []
-        # Chunksize grande para velocidade, mas monitorando a RAM [cite: 38, 39]
-        reader = pd.read_csv(
-            path, 
-            sep=";", 
-            encoding="latin-1", 
-            header=None,
-            usecols=[0, 11, 20], 
-            names=["cnpj_basico", "cnae", "mun"],
-            dtype={"cnpj_basico": "int32", "cnae": "str", "mun": "float64"},
-            chunksize=2_000_000
-        )
-        
-        for chunk in tqdm(reader, desc=f"📂 {os.path.basename(path)}"):
-            # Cruzamento interno: só processamos quem está na lista de MEIs [cite: 5, 11]
-            chunk = chunk.merge(df_simples, on="cnpj_basico", how="inner")
-            
-            # Mapeamento Setorial (Divisão CNAE - 2 primeiros dígitos) [cite: 17, 36]
-            div = chunk['cnae'].str[:2].fillna('00')
-            chunk['setor'] = 'Servicos'
-            chunk.loc[div.isin(['01', '02', '03']), 'setor'] = 'Agro'
-            chunk.loc[div.astype(int).between(5, 33), 'setor'] = 'Industria'
-            chunk.loc[div == '84', 'setor'] = 'Setor Publico'
-            
-            # Agregação de Entradas: Apenas anos válidos (> 1900)
-            ent = chunk[chunk['ano_ini'] > 1900].groupby(['mun', 'setor', 'ano_ini']).size().reset_index(name='entradas')
-            ent.columns = ['mun', 'setor', 'ano', 'entradas']
-            
-            # Agregação de Saídas: CRUCIAL - Ignora NaTs/Zeros para evitar estoque negativo
-            sai = chunk[chunk['ano_fim'] > 1900].groupby(['mun', 'setor', 'ano_fim']).size().reset_index(name='saidas')
-            sai.columns = ['mun', 'setor', 'ano', 'saidas']
-            
-            # Merge de Fluxo
-            fluxo = pd.merge(ent, sai, on=['mun', 'setor', 'ano'], how='outer').fillna(0)
-            painel_arquivo.append(fluxo)
-            
-            del chunk, ent, sai, fluxo
+    if motor == "streaming":
+        # Agregado único em memória limitada (orcamento_mb), com spill em disco se necessário
+        with instrumentacao.cronometro("arquivo", arquivo=os.path.basename(path), motor=motor) as m:
+            df_arq = agregacao_streaming.agregar_arquivo(path, indice, fonte, orcamento_mb, chunksize)
+            m["linhas_saida"] = len(df_arq)
+        return (df_arq if len(df_arq) else None), None
+
+    painel_arquivo = []
+    estado_arquivo = []
+    fases = instrumentacao.Fases()
+    linhas = linhas_mei = 0
+    inicio = time.perf_counter()
+    reader = fases.iterar("leitura", ler_estabelecimentos(path, chunksize, fonte))
+
+    for chunk in tqdm(reader, desc=f"📂 {os.path.basename(path)}", disable=not mostrar_progresso):
+        linhas += len(chunk)
+        # Com ETL_PERFIL=cprofile|tracemalloc, só o primeiro chunk do processo é perfilado
+        with instrumentacao.perfilar_uma_vez("chunk"):
+            fluxo, estado_chunk, n_mei = agregar_chunk(chunk, indice, fases, coletar_estado)
+        linhas_mei += n_mei
+        painel_arquivo.append(fluxo)
+        if estado_chunk is not None:
+            estado_arquivo.append(estado_chunk)
+
+        with fases("gc"):
+            del chunk, fluxo, estado_chunk
             gc.collect()
-            
-        if painel_arquivo:
+
+    estado = pd.concat(estado_arquivo, ignore_index=True) if estado_arquivo else None
+    df_arq = None
+    if painel_arquivo:
+        with fases("consolidacao"):
             # Consolida o arquivo atual antes de ir para o próximo (previne fragmentação)
             df_arq = pd.concat(painel_arquivo).groupby(['mun', 'setor', 'ano']).sum().reset_index()
-            painel_final_lista.append(df_arq)
             del painel_arquivo
             gc.collect()
 
-    # 3. Consolidação e Cálculo de Estoque
-    print("\n📊 Gerando painel final e calculando estoques...")
+    instrumentacao.contar("linhas_estabelecimentos", linhas)
+    instrumentacao.contar("linhas_mei", linhas_mei)
+    instrumentacao.registrar("arquivo", arquivo=os.path.basename(path), motor=motor, linhas=linhas,
+                             linhas_mei=linhas_mei, segundos=round(time.perf_counter() - inicio, 4),
+                             fases=fases.resumo())
+    return df_arq, estado
+
+def _inicializar_worker(dir_indice, mem_worker_mb):
+    """Abre o índice MEI via memory-map e aplica o teto de memória do processo."""
+    global _INDICE_MEI
+    _INDICE_MEI = indice_mei.carregar_indice(dir_indice)
+    if mem_worker_mb:
+        # Teto de espaço de endereçamento: o worker falha com MemoryError em vez de levar a máquina ao swap
+        import resource  # Só Unix (o parse_args recusa --mem-worker-mb onde não existe)
+        limite = int(mem_worker_mb) * 1024 ** 2
+        resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+
+def _processar_arquivo_worker(path, chunksize, fonte, coletar_estado, motor, orcamento_mb, janela_mensal):
+    resultado = processar_arquivo(path, _INDICE_MEI, chunksize, mostrar_progresso=False,
+                                  fonte=fonte, coletar_estado=coletar_estado, motor=motor, orcamento_mb=orcamento_mb,
+                                  janela_mensal=janela_mensal)
+    # Contadores do worker voltam com o resultado (o 'fim' da etapa sai só no pai)
+    return resultado, instrumentacao.retirar_contadores()
+
+def agregar_arquivos(arquivos, dir_indice=indice_mei.DIR_INDICE, workers=1, mem_worker_mb=None,
+                     chunksize=CHUNKSIZE, fonte="csv", coletar_estado=False, motor="pandas", orcamento_mb=256,
+                     janela_mensal=None):
+    """
+    Agrega os arquivos de Estabelecimentos. Com workers > 1, cada arquivo vai para
+    um processo próprio e o processo pai só empilha os agregados parciais.
+    Retorna (agregados, estados) por arquivo.
+    """
+    arquivos = [p for p in arquivos if os.path.exists(p)]
+
+    if workers <= 1:
+        indice = indice_mei.carregar_indice(dir_indice)
+        resultados = [processar_arquivo(p, indice, chunksize, fonte=fonte, coletar_estado=coletar_estado,
+                                        motor=motor, orcamento_mb=orcamento_mb, janela_mensal=janela_mensal)
+                      for p in arquivos]
+    else:
+        resultados = []
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(arquivos)) or 1,
+            initializer=_inicializar_worker,
+            initargs=(dir_indice, mem_worker_mb),
+        ) as pool:
+            futuros = {pool.submit(_processar_arquivo_worker, p, chunksize, fonte, coletar_estado, motor, orcamento_mb,
+                                   janela_mensal): p
+                       for p in arquivos}
+            for futuro in tqdm(as_completed(futuros), total=len(futuros), desc="📂 Arquivos"):
+                resultado, contadores = futuro.result()
+                instrumentacao.somar_contadores(contadores)
+                resultados.append(resultado)
+
+    parciais = [agregado for agregado, _ in resultados if agregado is not None]
+    estados = [estado for _, estado in resultados if estado is not None]
+    return parciais, estados
+
+def calcular_estoque(painel_final_lista):
+    """Consolida os agregados parciais e calcula o estoque acumulado."""
     df_final = pd.concat(painel_final_lista).groupby(['mun', 'setor', 'ano']).sum().reset_index()
-    
+    # Códigos do setor -> categoria do esquema (os 4 primeiros códigos coincidem)
+    df_final['setor'] = pd.Categorical.from_codes(df_final['setor'].to_numpy(), dtype=esquema_painel.SETOR_DTYPE)
+
     # Ordenação necessária para o cálculo acumulado (Time-series)
     df_final = df_final.sort_values(['mun', 'setor', 'ano'])
-    
+
     # Estoque = Soma acumulada de quem entrou (-) soma acumulada de quem saiu
-    df_final['estoque_mei'] = (
-        df_final.groupby(['mun', 'setor'])['entradas'].cumsum() - 
-        df_final.groupby(['mun', 'setor'])['saidas'].cumsum()
+    acumulado = df_final.groupby(['mun', 'setor'], observed=True)[['entradas', 'saidas']].cumsum()
+    df_final['estoque_mei'] = acumulado['entradas'] - acumulado['saidas']
+    return df_final
+
+def somar_cubos(compactos, janela_mensal):
+    """Soma as células com fluxo de cada arquivo num único cubo denso."""
+    total = fluxo_mensal.CuboMensal(*janela_mensal)
+    for compacto in compactos:
+        total.somar_compacto(compacto)
+    return total
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="ETL dos fluxos de MEI a partir do CNPJ da RFB.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processos paralelos (um arquivo de Estabelecimentos por worker). 1 = serial.")
+    parser.add_argument("--mem-worker-mb", type=int, default=None,
+                        help="Teto de memória (MB) de cada worker. Reduza --chunksize se houver MemoryError.")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE,
+                        help="Linhas por chunk na leitura dos Estabelecimentos.")
+    parser.add_argument("--reconstruir-indice", action="store_true",
+                        help="Ignora o índice MEI salvo e relê o Simples.")
+    parser.add_argument("--fonte", choices=["csv", "parquet"], default="csv",
+                        help="parquet = lê do cache colunar da RFB (convertido na primeira execução).")
+    parser.add_argument("--apenas-converter", action="store_true",
+                        help="Só atualiza o cache Parquet da RFB e encerra.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Aplica ao painel existente só as diferenças do novo snapshot em relação ao estado salvo.")
+    parser.add_argument("--salvar-estado", action="store_true",
+                        help="Grava o estado por estabelecimento para o próximo --incremental (mais memória e I/O).")
+    parser.add_argument("--motor", choices=["pandas", "streaming"], default="pandas",
+                        help="streaming = record batches do Arrow num agregado único de memória limitada.")
+    parser.add_argument("--orcamento-mb", type=int, default=256,
+                        help="Memória máxima do agregado no motor streaming antes de despejar em disco.")
+    parser.add_argument("--frequencia", choices=["anual", "mensal"], default="anual",
+                        help=f"mensal = painel denso município x setor x mês em {SAIDA_MENSAL}.")
+    parser.add_argument("--inicio", type=int, default=fluxo_mensal.INICIO, help="Primeiro mês (AAAAMM) do painel mensal.")
+    parser.add_argument("--fim", type=int, default=fluxo_mensal.FIM, help="Último mês (AAAAMM) do painel mensal.")
+    args = parser.parse_args()
+    if args.mem_worker_mb:
+        try:
+            import resource
+        except ImportError:
+            parser.error("--mem-worker-mb depende do módulo resource (Linux/macOS); indisponível nesta plataforma.")
+    return args
+
+def main():
+    args = parse_args()
+    instrumentacao.iniciar("05_transform_cnpj")
+    print("--- INICIANDO ETL MEI OTIMIZADO E CORRIGIDO ---")
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # 0. Cache colunar da RFB: só reconverte arquivos que mudaram (tamanho/mtime/hash)
+    if args.fonte == "parquet" or args.apenas_converter:
+        rfb_parquet.converter_tudo(CAMINHO_SIMPLES, ARQUIVOS_ESTAB)
+        if args.apenas_converter:
+            print(f"✅ Cache Parquet da RFB atualizado em: {rfb_parquet.DIR_CACHE}")
+            return
+
+    # 1. Índice MEI (Simples) construído uma vez e reaproveitado via memory-map
+    preparar_indice_mei(args.reconstruir_indice, args.fonte)
+
+    if args.incremental and not (os.path.exists(incremental_mei.ARQUIVO_ESTADO) and os.path.exists(SAIDA_FINAL)):
+        print(f"❌ Modo incremental requer {incremental_mei.ARQUIVO_ESTADO} e {SAIDA_FINAL} de uma execução completa "
+              "com --salvar-estado.")
+        return
+    if (args.incremental or args.salvar_estado) and args.motor == "streaming":
+        print("❌ O estado por estabelecimento (--incremental/--salvar-estado) exige --motor pandas.")
+        return
+    if (args.incremental or args.salvar_estado) and args.frequencia == "mensal":
+        print("❌ O modo incremental só atualiza o painel anual.")
+        return
+    mensal = args.frequencia == "mensal"
+    janela_mensal = (args.inicio, args.fim) if mensal else None
+    coletar_estado = args.incremental or args.salvar_estado
+
+    # 2. Estabelecimentos: Contém CNAE e Código de Município [cite: 3, 17]
+    print(f"⚙️  Processando Estabelecimentos com {args.workers} worker(s)...")
+    painel_final_lista, estados = agregar_arquivos(
+        ARQUIVOS_ESTAB,
+        workers=args.workers, mem_worker_mb=args.mem_worker_mb,
+        chunksize=args.chunksize, fonte=args.fonte, coletar_estado=coletar_estado,
+        motor=args.motor, orcamento_mb=args.orcamento_mb, janela_mensal=janela_mensal
     )
+    if mensal:
+        # 3. Cubo mensal: estoque = soma acumulada no eixo do tempo
+        print(f"\n📅 Gerando painel mensal {args.inicio}-{args.fim}...")
+        with instrumentacao.cronometro("estoque_mensal") as m:
+            df_mensal = somar_cubos(painel_final_lista, janela_mensal).para_painel()
+            m["linhas"] = len(df_mensal)
+        with instrumentacao.cronometro("gravacao", linhas=len(df_mensal)):
+            esquema_painel.salvar_painel(df_mensal, SAIDA_MENSAL)
+        print(f"✅ Painel mensal concluído: {SAIDA_MENSAL}")
+        return
+    estado_novo = pd.concat(estados, ignore_index=True) if coletar_estado and estados else None
+
+    if args.incremental:
+        if estado_novo is None:
+            # Snapshot sem nenhum MEI é arquivo faltando/errado, não o fim de todos os MEIs:
+            # comparar com o estado anterior zeraria o painel
+            print(f"❌ Nenhum estabelecimento MEI lido em {BASE_PATH}; painel e estado anteriores mantidos.")
+            raise SystemExit(1)
+        # 3. Só as diferenças do snapshot entram no painel existente
+        print("\n🔁 Comparando com o estado anterior...")
+        delta = incremental_mei.diferenca(incremental_mei.carregar_estado(), estado_novo)
+        fluxos = incremental_mei.fluxos_do_delta(delta)
+        df_final, n_series = incremental_mei.aplicar_fluxos(esquema_painel.ler_painel(SAIDA_FINAL), fluxos)
+        print(f"📊 {len(delta):,} estabelecimentos alterados; estoque recalculado em {n_series:,} séries (mun, setor).")
+    else:
+        # 3. Consolidação e Cálculo de Estoque
+        print("\n📊 Gerando painel final e calculando estoques...")
+        with instrumentacao.cronometro("estoque") as m:
+            df_final = calcular_estoque(painel_final_lista)
+            m["linhas"] = len(df_final)
 
     # Exportação em Parquet para performance no modelo econométrico
-    df_final.to_parquet(SAIDA_FINAL, index=False)
+    with instrumentacao.cronometro("gravacao", linhas=len(df_final)):
+        esquema_painel.salvar_painel(df_final, SAIDA_FINAL)
+    if estado_novo is not None:
+        incremental_mei.salvar_estado(estado_novo)
+    elif os.path.exists(incremental_mei.ARQUIVO_ESTADO):
+        # O painel foi refeito sem estado: o antigo não corresponde mais a ele (--incremental contaria em dobro)
+        os.remove(incremental_mei.ARQUIVO_ESTADO)
+        print(f"🗑️ Estado anterior removido ({incremental_mei.ARQUIVO_ESTADO}); use --salvar-estado para manter o incremental.")
     print(f"✅ Painel concluído com sucesso: {SAIDA_FINAL}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,21 +1,40 @@
 import pandas as pd
 import numpy as np
+import argparse
 import os
 
-def calcular_intensidade_bruta(path_pix):
-    df = pd.read_parquet(path_pix)
-    # Garante ordem cronológica para pegar os 6 meses iniciais corretamente
-    df = df.sort_values(by=['Municipio_Ibge', 'AnoMes'])
-    
-    # Média dos 6 primeiros meses por município
-    df['intensidade_pix_bruta'] = (
-        df.groupby('Municipio_Ibge')['QT_PagadorPF']
-        .transform(lambda x: x.iloc[:6].mean())
-    )
-    
-    # Criar Cross-Section e limpar ID
-    df_cs = df[['Municipio_Ibge', 'Municipio', 'Estado', 'intensidade_pix_bruta']].drop_duplicates().copy()
-    df_cs['id_municipio'] = pd.to_numeric(df_cs['Municipio_Ibge'], errors='coerce').fillna(0).astype(int).astype(str).str.zfill(7)
+import esquema_painel
+import instrumentacao
+import intensidade_pix
+import tratamento
+
+# Coluna de tratamento -> (intensidade, número de quantis)
+ESQUEMAS_TRATAMENTO = {
+    'treat_tercil': ('intensidade_relativa', 3),
+    'treat_quartil': ('intensidade_relativa', 4),
+    'treat_quintil': ('intensidade_relativa', 5),
+}
+
+def calcular_intensidade_bruta(path_pix, metricas=(intensidade_pix.METRICA_PADRAO,), janela="primeiros",
+                               n_meses=6, inicio=None, fim=None):
+    """
+    Cross-section de intensidade: média da 1ª métrica na janela (por padrão, os 6 primeiros
+    meses de QT_PagadorPF) em 'intensidade_pix_bruta'; as demais viram 'intensidade_<métrica>'.
+    """
+    metricas = list(dict.fromkeys(metricas))
+    colunas = ['Municipio_Ibge', 'AnoMes', 'Municipio', 'Estado']
+    df = pd.read_parquet(path_pix, columns=colunas + [m for m in metricas if m not in colunas])
+
+    # Todas as métricas numa passada só, direto no nível do município
+    df_int = intensidade_pix.calcular_intensidades(df, metricas, janela, n_meses, inicio, fim)
+    df_int = df_int.rename(columns={metricas[0]: 'intensidade_pix_bruta',
+                                    **{m: f'intensidade_{m}' for m in metricas[1:]}})
+
+    # Criar Cross-Section (nomes na ordem cronológica, como antes) e limpar ID
+    ordem = np.lexsort((pd.to_numeric(df['AnoMes']).to_numpy(), df['Municipio_Ibge'].to_numpy()))
+    df_cs = df.iloc[ordem][['Municipio_Ibge', 'Municipio', 'Estado']].drop_duplicates()
+    df_cs = df_cs.merge(df_int, on='Municipio_Ibge', how='left')
+    df_cs['id_municipio'] = esquema_painel.normalizar_id(df_cs['Municipio_Ibge'])
     
     return df_cs
 
@@ -23,30 +42,39 @@ def carregar_populacao_2020(path_pop):
     df_pop = pd.read_parquet(path_pop)
     # Filtro de ano e limpeza de tipos
     df_pop = df_pop[pd.to_numeric(df_pop['ano'], errors='coerce') == 2020].copy()
-    df_pop['id_municipio'] = pd.to_numeric(df_pop['id_municipio'], errors='coerce').fillna(0).astype(int).astype(str).str.zfill(7)
+    df_pop['id_municipio'] = esquema_painel.normalizar_id(df_pop['id_municipio'])
     df_pop['populacao'] = pd.to_numeric(df_pop['populacao'], errors='coerce')
     
     return df_pop[['id_municipio', 'populacao']]
 
-def atribuir_grupos_tratamento(df, coluna, n_groups):
-    # rank(method='first') desempata valores iguais (como o 1.0) para garantir grupos de tamanhos iguais
-    ranks = df[coluna].rank(method='first')
-    bins = pd.qcut(ranks, n_groups, labels=False) + 1
-    
-    # 0 = Controle (1º Quantil), 1 = Tratamento (Último Quantil), NaN = Meio
-    return np.select([bins == 1, bins == n_groups], [0, 1], default=np.nan)
+def parse_args():
+    parser = argparse.ArgumentParser(description="Intensidade de uso do Pix por município e grupos de tratamento.")
+    parser.add_argument("--janela", choices=intensidade_pix.JANELAS, default="primeiros",
+                        help="primeiros = N primeiros meses do município; movel = N últimos até --fim; "
+                             "calendario = meses entre --inicio e --fim.")
+    parser.add_argument("--meses", type=int, default=6, help="N da janela primeiros/movel.")
+    parser.add_argument("--inicio", type=int, default=None, help="Primeiro AnoMes da janela calendario.")
+    parser.add_argument("--fim", type=int, default=None, help="Último AnoMes das janelas movel/calendario.")
+    parser.add_argument("--metricas", nargs="+", default=[intensidade_pix.METRICA_PADRAO],
+                        help="A 1ª define a intensidade do tratamento; as demais saem como intensidade_<métrica>.")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     # Caminhos
-    raw_pix = '../data/raw/dados_pix.parquet'
-    raw_pop = '../data/raw/populacao_agregada.parquet'
+    raw_pix = '../data/raw/dados_pix'  # Um Parquet por mês (02_extract_pix.py)
+    raw_pop = '../data/processed/populacao_agregada.parquet'  # Saída do 03_extract_populacao.py
     processed_path = '../data/processed/intensidade_pix_municipios.parquet'
 
+    instrumentacao.iniciar("07_transform_pix")
     print("🚀 Iniciando processamento...")
 
     # 1. Processar Intensidade e População
-    df_pix = calcular_intensidade_bruta(raw_pix)
-    df_pop = carregar_populacao_2020(raw_pop)
+    with instrumentacao.cronometro("intensidade") as m:
+        df_pix = calcular_intensidade_bruta(raw_pix, args.metricas, args.janela, args.meses, args.inicio, args.fim)
+        m["municipios"] = len(df_pix)
+    with instrumentacao.cronometro("populacao"):
+        df_pop = carregar_populacao_2020(raw_pop)
 
     # 2. Merge e Normalização
     df_final = df_pix.merge(df_pop, on='id_municipio', how='inner')
@@ -54,13 +82,15 @@ def main():
 
     # 3. Criar Quantis de Tratamento
     print("📊 Gerando grupos de tratamento (Tercis, Quartis e Quintis)...")
-    df_final['treat_tercil'] = atribuir_grupos_tratamento(df_final, 'intensidade_relativa', 3)
-    df_final['treat_quartil'] = atribuir_grupos_tratamento(df_final, 'intensidade_relativa', 4)
-    df_final['treat_quintil'] = atribuir_grupos_tratamento(df_final, 'intensidade_relativa', 5)
+    with instrumentacao.cronometro("tratamentos"):
+        # Uma ordenação da intensidade serve aos três esquemas
+        matriz, nomes = tratamento.atribuir_tratamentos(df_final, ESQUEMAS_TRATAMENTO)
+        df_final[nomes] = tratamento.como_float(matriz)
 
     # 4. Salvar
     os.makedirs(os.path.dirname(processed_path), exist_ok=True)
-    df_final.to_parquet(processed_path, index=False)
+    with instrumentacao.cronometro("gravacao", linhas=len(df_final)):
+        esquema_painel.salvar_painel(df_final, processed_path)
 
     print(f"✅ Processo concluído!\n📂 Salvo em: {processed_path}")
     print(f"📈 Municípios processados: {len(df_final)}")
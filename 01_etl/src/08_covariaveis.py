@@ -1,11 +1,19 @@
-import basedosdados as bd
 import pandas as pd
+import argparse
 import os
 from dotenv import load_dotenv
 
+import cache_sql
+import instrumentacao
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Covariáveis municipais de 2019 (PIB, população, telefonia, IDHM, geocódigo).")
+    return cache_sql.adicionar_argumentos(parser).parse_args()
+
 def main():
+    args = parse_args()
+    instrumentacao.iniciar("08_covariaveis")
     load_dotenv()
-    billing_id = os.getenv("BILLING_ID")
     output_path = '../data/processed/dataset_municipios_2019.parquet'
     
     print("🔄 Iniciando coleta consolidada (PIB, Pop, Tel, IDHM e Geocode)...")
@@ -57,7 +65,10 @@ def main():
     """
 
     try:
-        df = bd.read_sql(query=query, billing_project_id=billing_id)
+        executar_query = cache_sql.cliente(args, os.getenv("BILLING_ID"))
+        with instrumentacao.cronometro("query") as m:
+            df = executar_query(query)
+            m["linhas"] = len(df)
         
         if not df.empty:
             # Tipagem para performance
@@ -75,6 +86,9 @@ def main():
         else:
             print("❌ A consulta não retornou dados.")
 
+    except cache_sql.CacheAusente as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
     except Exception as e:
         print(f"⚠️ Erro: {e}")
 
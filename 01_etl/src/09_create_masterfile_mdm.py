@@ -2,21 +2,25 @@ import pandas as pd
 import numpy as np
 import os
 
+import esquema_painel
+import instrumentacao
+
 def limpar_id(series):
     """
-    Padroniza o ID do município: remove decimais (.0), 
-    converte para inteiro e preenche com zeros à esquerda (7 dígitos).
+    Padroniza o ID do município: remove decimais (.0) e converte para int32
+    (sem zfill; mesmo tipo usado em todos os painéis).
     """
-    return pd.to_numeric(series, errors='coerce').fillna(0).astype(int).astype(str).str.zfill(7)
+    return esquema_painel.normalizar_id(series)
 
+@instrumentacao.cronometrado("leitura")
 def carregar_e_preparar_dados():
     """Carrega as bases brutas e processadas aplicando a limpeza de IDs."""
     # 1. Base do Pix (Cross-Section)
-    df_pix = pd.read_parquet('../data/processed/intensidade_pix_municipios.parquet')
+    df_pix = esquema_painel.ler_painel('../data/processed/intensidade_pix_municipios.parquet')
     df_pix['id_municipio'] = limpar_id(df_pix['id_municipio'])
 
     # 2. Covariáveis (Socioeconômicas e Geo)
-    df_covar = pd.read_parquet('../data/raw/covariaveis_municipais.parquet')
+    df_covar = pd.read_parquet('../data/processed/dataset_municipios_2019.parquet')  # Saída do 08_covariaveis.py
     df_covar['id_municipio'] = limpar_id(df_covar['id_municipio'])
 
     # 3. Homicídios (Ipeadata)
@@ -26,6 +30,7 @@ def carregar_e_preparar_dados():
     
     return df_pix, df_covar, df_homic
 
+@instrumentacao.cronometrado("merges")
 def realizar_merges(df_pix, df_covar, df_homic):
     """Executa a união das bases e cria a coluna de macrorregião."""
     # Pix + Covariáveis
@@ -45,10 +50,11 @@ def realizar_merges(df_pix, df_covar, df_homic):
 
     # CRIAR COLUNA DE MACRORREGIÃO (Dígito 1 do ID IBGE)
     # 1: Norte, 2: Nordeste, 3: Sudeste, 4: Sul, 5: Centro-Oeste
-    df_final['cod_regiao'] = df_final['id_municipio'].str[0]
+    df_final['cod_regiao'] = esquema_painel.codigo_regiao(df_final['id_municipio'])
     
     return df_final
 
+@instrumentacao.cronometrado("gravacao")
 def tratar_e_salvar(df_final, output_path):
     """Trata valores ausentes e salva o arquivo final em parquet."""
     cols_num = [
@@ -61,16 +67,18 @@ def tratar_e_salvar(df_final, output_path):
             df_final[col] = pd.to_numeric(df_final[col], errors='coerce').fillna(0)
 
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    df_final.to_parquet(output_path, index=False)
+    esquema_painel.salvar_painel(df_final, output_path)
     
     print(f"✅ Merge concluído com sucesso!")
     print(f"📊 Coluna 'cod_regiao' criada para Exact Match.")
     print(f"📌 Arquivo salvo em: {output_path}")
 
 def main():
+    instrumentacao.iniciar("09_create_masterfile_mdm")
     output_path = '../data/processed/dataset_final_matching.parquet'
     df_pix, df_covar, df_homic = carregar_e_preparar_dados()
     df_final = realizar_merges(df_pix, df_covar, df_homic)
+    instrumentacao.contar("municipios", len(df_final))
     tratar_e_salvar(df_final, output_path)
 
 if __name__ == "__main__":
@@ -0,0 +1,60 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+
+import buffer_espacial
+import esquema_painel
+import instrumentacao
+
+# --- CONFIGURAÇÃO ---
+INPUT_FILE = '../data/processed/dataset_final_matching.parquet'  # Saída do 09_create_masterfile_mdm.py
+OUTPUT_FILE = '../data/processed/buffer_espacial.parquet'
+TRATAMENTOS = ['treat_tercil', 'treat_quartil', 'treat_quintil']
+RAIOS_KM = [30]
+
+def calcular_buffers(df, tratamentos, raios_km):
+    """
+    Uma linha por município: distância (km) ao tratado mais próximo de cada esquema
+    e, para cada raio, a flag do controle que cai no buffer (sai antes do matching).
+    """
+    grupos = {t: df[t].to_numpy() for t in tratamentos}
+    distancias = buffer_espacial.distancias_por_tratamento(df['longitude'], df['latitude'], grupos)
+
+    saida = {'id_municipio': df['id_municipio'].to_numpy()}
+    for j, t in enumerate(tratamentos):
+        saida[f'dist_tratado_{t}'] = distancias[:, j].astype(np.float32)
+        for raio in raios_km:
+            # 1 = controle a menos de `raio` km de algum tratado (mesmo critério do 10_marching_mdm.R)
+            no_buffer = buffer_espacial.controles_no_buffer(distancias[:, j], grupos[t], raio)
+            saida[f'buffer_{t}_{raio:g}km'] = no_buffer.astype(np.int8)
+    return pd.DataFrame(saida)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Controles próximos de tratados (buffer espacial) por esquema e raio.")
+    parser.add_argument("--tratamentos", nargs="+", default=TRATAMENTOS, help="Colunas treat_* do masterfile.")
+    parser.add_argument("--raios", type=float, nargs="+", default=RAIOS_KM, help="Raios do buffer em km.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    instrumentacao.iniciar("11_buffer_espacial")
+    if not os.path.exists(INPUT_FILE):
+        print(f"❌ Erro: Arquivo {INPUT_FILE} não encontrado.")
+        return
+
+    df = esquema_painel.ler_painel(INPUT_FILE, columns=['id_municipio', 'longitude', 'latitude'] + args.tratamentos)
+
+    print(f"🌎 Buffer espacial: {len(args.tratamentos)} esquema(s) x {len(args.raios)} raio(s)...")
+    with instrumentacao.cronometro("buffer", municipios=len(df)):
+        df_buffer = calcular_buffers(df, args.tratamentos, args.raios)
+
+    esquema_painel.salvar_painel(df_buffer, OUTPUT_FILE)
+    for t in args.tratamentos:
+        for raio in args.raios:
+            n = int(df_buffer[f'buffer_{t}_{raio:g}km'].sum())
+            print(f"📍 {t} @ {raio:g} km: {n:,} controles no buffer")
+    print(f"📂 Salvo em: {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
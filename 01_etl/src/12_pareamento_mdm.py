@@ -0,0 +1,74 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+
+import buffer_espacial
+import esquema_painel
+import instrumentacao
+import pareamento
+
+# --- CONFIGURAÇÃO ---
+INPUT_FILE = '../data/processed/dataset_final_matching.parquet'  # Saída do 09_create_masterfile_mdm.py
+BUFFER_FILE = '../data/processed/buffer_espacial.parquet'  # Saída do 11_buffer_espacial.py
+OUTPUT_FILE = '../data/processed/dataset_final_com_flags.parquet'
+TRATAMENTOS = ['treat_tercil', 'treat_quartil', 'treat_quintil']
+BUFFER_KM = 30
+CALIPER = 0.25
+
+def controles_no_buffer(df, col_tratamento, raio_km):
+    """Flags do 11 quando existem para o esquema/raio; senão, calcula o buffer na hora."""
+    coluna = f'buffer_{col_tratamento}_{raio_km:g}km'
+    if os.path.exists(BUFFER_FILE):
+        df_buffer = pd.read_parquet(BUFFER_FILE)
+        if coluna in df_buffer.columns:
+            flags = df[['id_municipio']].merge(df_buffer[['id_municipio', coluna]], on='id_municipio', how='left')
+            return flags[coluna].fillna(0).to_numpy() == 1
+    grupo = df[col_tratamento].to_numpy()
+    distancia = buffer_espacial.distancias_por_tratamento(df['longitude'], df['latitude'], {col_tratamento: grupo})
+    return buffer_espacial.controles_no_buffer(distancia[:, 0], grupo, raio_km)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pareamento de Mahalanobis com exact match por região e buffer espacial.")
+    parser.add_argument("--tratamentos", nargs="+", default=TRATAMENTOS, help="Colunas treat_* a parear.")
+    parser.add_argument("--raio", type=float, default=BUFFER_KM, help="Buffer espacial em km (0 = sem buffer).")
+    parser.add_argument("--caliper", type=float, default=CALIPER,
+                        help="Em desvios-padrão do logit do escore de propensão (negativo = sem caliper).")
+    parser.add_argument("--metodo", choices=pareamento.METODOS, default="guloso",
+                        help="guloso = ordem dos dados (padrão do MatchIt); mais_proximo; otimo = por bloco.")
+    parser.add_argument("--covariaveis", nargs="+", default=pareamento.COVARIAVEIS)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    instrumentacao.iniciar("12_pareamento_mdm")
+    if not os.path.exists(INPUT_FILE):
+        print(f"❌ Erro: Arquivo {INPUT_FILE} não encontrado.")
+        return
+
+    df = pareamento.adicionar_logs(esquema_painel.ler_painel(INPUT_FILE))
+    caliper = args.caliper if args.caliper >= 0 else None
+
+    for col in args.tratamentos:
+        sufixo = col.removeprefix('treat_')
+        with instrumentacao.cronometro("pareamento", tratamento=col, raio_km=args.raio, caliper=caliper) as m:
+            excluir = controles_no_buffer(df, col, args.raio) if args.raio > 0 else None
+            try:
+                df[f'keep_match_{sufixo}'] = pareamento.parear_df(
+                    df, col, args.covariaveis, caliper=caliper, metodo=args.metodo, excluir=excluir
+                )
+            except ValueError as e:
+                print(f"❌ {col}: {e}")
+                raise SystemExit(1)
+            pareados = df[f'keep_match_{sufixo}'] == 1
+            m["pareados"] = int(pareados.sum())
+        print(f"🔗 {col}: {int((pareados & (df[col] == 1)).sum()):,} pares "
+              f"({int(excluir.sum()) if excluir is not None else 0:,} controles no buffer de {args.raio:g} km)")
+        bal = pareamento.balanco(df, col, args.covariaveis, keep=pareados)
+        print(bal.to_string(index=False, float_format=lambda v: f"{v:10.3f}"))
+
+    esquema_painel.salvar_painel(df, OUTPUT_FILE)
+    print(f"📂 Salvo em: {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
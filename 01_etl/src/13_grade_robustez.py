@@ -0,0 +1,134 @@
+import pandas as pd
+import numpy as np
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import buffer_espacial
+import esquema_painel
+import instrumentacao
+import pareamento
+
+# --- CONFIGURAÇÃO ---
+INPUT_FILE = '../data/processed/dataset_final_matching.parquet'  # Saída do 09_create_masterfile_mdm.py
+OUTPUT_FILE = '../data/processed/grade_robustez.parquet'
+TRATAMENTOS = ['treat_tercil', 'treat_quartil', 'treat_quintil']
+RAIOS_KM = [0, 30, 50, 100]
+CALIPERS = [0.1, 0.25, 0.5]
+
+# Estado compartilhado com os workers (enviado uma vez por processo no initializer)
+_DF = None
+_DISTANCIAS = None
+
+def _inicializar_worker(df, distancias):
+    global _DF, _DISTANCIAS
+    _DF, _DISTANCIAS = df, distancias
+
+def avaliar_configuracao(tratamento, raio_km, caliper, conjunto, covariaveis, metodo):
+    """Pareia uma configuração da grade e devolve as linhas (uma por covariável) da tabela de resultados."""
+    df, grupo = _DF, _DF[tratamento].to_numpy()
+    excluir = buffer_espacial.controles_no_buffer(_DISTANCIAS[tratamento], grupo, raio_km) if raio_km > 0 else None
+    try:
+        keep = pareamento.parear_df(df, tratamento, covariaveis, caliper=caliper if caliper >= 0 else None,
+                                    metodo=metodo, excluir=excluir) == 1
+    except ValueError as e:
+        raise ValueError(f"{tratamento}, raio {raio_km:g} km, conjunto {conjunto}: {e}") from None
+    elegivel = pareamento.amostra_pareamento(df, tratamento, covariaveis, excluir)
+
+    antes = pareamento.balanco(df, tratamento, covariaveis, keep=elegivel)
+    depois = pareamento.balanco(df, tratamento, covariaveis, keep=keep)
+    comum = {
+        'tratamento': tratamento,
+        'raio_km': raio_km,
+        'caliper': caliper,
+        'conjunto': conjunto,
+        'metodo': metodo,
+        'n_tratados': int((elegivel & (grupo == 1)).sum()),
+        'n_controles': int((elegivel & (grupo == 0)).sum()),
+        'n_controles_buffer': int(excluir.sum()) if excluir is not None else 0,
+        'n_pares': int((keep & (grupo == 1)).sum()),
+    }
+    return [
+        {**comum, 'covariavel': a['covariavel'],
+         'dif_padronizada_antes': a['dif_padronizada'],
+         'media_tratados': d['media_tratados'], 'media_controles': d['media_controles'],
+         'dif_padronizada_depois': d['dif_padronizada']}
+        for a, d in zip(antes.to_dict('records'), depois.to_dict('records'))
+    ]
+
+def rodar_grade(df, tratamentos, raios_km, calipers, conjuntos, metodo="guloso", workers=1):
+    """
+    Roda todas as combinações tratamento x raio x caliper x conjunto de covariáveis.
+    Distâncias ao tratado mais próximo (uma KD-tree por esquema) e logs das covariáveis
+    são calculados uma vez e compartilhados por todas as configurações.
+    """
+    df = pareamento.adicionar_logs(df)
+    grupos = {t: df[t].to_numpy() for t in tratamentos}
+    matriz = buffer_espacial.distancias_por_tratamento(df['longitude'], df['latitude'], grupos)
+    distancias = {t: matriz[:, j] for j, t in enumerate(tratamentos)}
+
+    grade = [(t, r, c, nome, covs, metodo)
+             for t, r, c, (nome, covs) in itertools.product(tratamentos, raios_km, calipers, conjuntos.items())]
+    if workers <= 1:
+        _inicializar_worker(df, distancias)
+        resultados = [avaliar_configuracao(*cfg) for cfg in grade]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker,
+                                 initargs=(df, distancias)) as pool:
+            resultados = list(pool.map(avaliar_configuracao, *zip(*grade), chunksize=max(1, len(grade) // (4 * workers))))
+    return pd.DataFrame([linha for linhas in resultados for linha in linhas])
+
+def ler_conjuntos(especificacoes):
+    """['base=idhm_e,densidade_tel', ...] -> {'base': ['idhm_e', 'densidade_tel'], ...}"""
+    conjuntos = {}
+    for esp in especificacoes:
+        nome, _, covs = esp.partition('=')
+        if not covs:
+            raise ValueError(f"conjunto inválido: {esp!r} (use nome=cov1,cov2)")
+        conjuntos[nome] = covs.split(',')
+    return conjuntos
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Grade de robustez do pareamento (tratamento x buffer x caliper x covariáveis).")
+    parser.add_argument("--tratamentos", nargs="+", default=TRATAMENTOS)
+    parser.add_argument("--raios", type=float, nargs="+", default=RAIOS_KM, help="Raios do buffer em km (0 = sem buffer).")
+    parser.add_argument("--calipers", type=float, nargs="+", default=CALIPERS,
+                        help="Em desvios-padrão do logit do escore de propensão (negativo = sem caliper).")
+    parser.add_argument("--conjuntos", nargs="+", default=[f"base={','.join(pareamento.COVARIAVEIS)}"],
+                        help="Conjuntos de covariáveis no formato nome=cov1,cov2,...")
+    parser.add_argument("--metodo", choices=pareamento.METODOS, default="guloso")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos paralelos.")
+    args = parser.parse_args()
+    try:
+        args.conjuntos = ler_conjuntos(args.conjuntos)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+def main():
+    args = parse_args()
+    instrumentacao.iniciar("13_grade_robustez")
+    if not os.path.exists(INPUT_FILE):
+        print(f"❌ Erro: Arquivo {INPUT_FILE} não encontrado.")
+        return
+
+    df = esquema_painel.ler_painel(INPUT_FILE)
+    n_cfg = len(args.tratamentos) * len(args.raios) * len(args.calipers) * len(args.conjuntos)
+    print(f"🧮 Grade de robustez: {n_cfg} configurações em {args.workers} worker(s)...")
+    with instrumentacao.cronometro("grade", configuracoes=n_cfg, workers=args.workers):
+        resultados = rodar_grade(df, args.tratamentos, args.raios, args.calipers, args.conjuntos,
+                                 args.metodo, args.workers)
+
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    resultados.to_parquet(OUTPUT_FILE, index=False)
+
+    # Resumo: tamanho da amostra pareada e pior desbalanceamento por configuração
+    chaves = ['tratamento', 'raio_km', 'caliper', 'conjunto']
+    resumo = resultados.assign(abs_smd=resultados['dif_padronizada_depois'].abs()).groupby(chaves, sort=False).agg(
+        n_pares=('n_pares', 'first'), max_abs_smd=('abs_smd', 'max'))
+    print(resumo.to_string(float_format=lambda v: f"{v:8.3f}"))
+    print(f"📂 Salvo em: {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
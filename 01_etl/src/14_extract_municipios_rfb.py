@@ -0,0 +1,57 @@
+import pandas as pd
+import argparse
+import os
+from dotenv import load_dotenv
+
+import cache_sql
+import esquema_painel
+import instrumentacao
+
+# --- CONFIGURAÇÃO ---
+OUTPUT_FILE = '../data/raw/municipios_rfb_ibge.parquet'  # Lido pelo 15_build_masterfile_did.py
+
+# O CNPJ da RFB usa o código de município da tabela TOM (4 dígitos); os demais painéis, o IBGE (7)
+QUERY = """
+SELECT
+    id_municipio,
+    id_municipio_rf
+FROM `basedosdados.br_bd_diretorios_brasil.municipio`
+WHERE id_municipio_rf IS NOT NULL
+"""
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="De-para de municípios RFB (TOM) -> IBGE (diretório da Base dos Dados).")
+    return cache_sql.adicionar_argumentos(parser).parse_args()
+
+def main():
+    args = parse_args()
+    instrumentacao.iniciar("14_extract_municipios_rfb")
+    load_dotenv()
+
+    print("🔄 Baixando o de-para de municípios RFB -> IBGE...")
+    try:
+        executar_query = cache_sql.cliente(args, os.getenv("BILLING_ID"))
+        with instrumentacao.cronometro("query") as m:
+            df = executar_query(QUERY)
+            m["linhas"] = len(df)
+    except cache_sql.CacheAusente as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+    # Códigos como int32, na mesma forma das chaves do 15 (zeros à esquerda somem)
+    df = pd.DataFrame({
+        'id_municipio_rf': esquema_painel.normalizar_id(df['id_municipio_rf']),
+        'id_municipio': esquema_painel.normalizar_id(df['id_municipio']),
+    })
+    df = df[(df['id_municipio_rf'] > 0) & (df['id_municipio'] > 0)]
+    repetidos = int(df['id_municipio_rf'].duplicated().sum())
+    if df.empty or repetidos:
+        print(f"❌ De-para inválido: {len(df)} linhas, {repetidos} códigos RFB repetidos.")
+        raise SystemExit(1)
+
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    df.sort_values('id_municipio_rf').to_parquet(OUTPUT_FILE, index=False)
+    print(f"✅ {len(df):,} municípios com código RFB salvos em: {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import argparse
+import os
+import shutil
+from urllib.parse import quote
+
+import esquema_painel
+import instrumentacao
+import juncao
+
+# --- CONFIGURAÇÃO ---
+MEI_FILE = '../data/processed/painel_mei_balanceado_2016_2024.parquet'      # Saída do 06_transform_cnpj_2.py
+RAIS_FILE = '../data/processed/rais_painel_balanceado.parquet'              # Saída do 04_transform_rais.py
+FLAGS_FILE = '../data/processed/dataset_final_com_flags.parquet'            # Saída do 12 (ou do 10_marching_mdm.R)
+MATCHING_FILE = '../data/processed/dataset_final_matching.parquet'          # Saída do 09, se ainda não houver flags
+DE_PARA_FILE = '../data/raw/municipios_rfb_ibge.parquet'  # Saída do 14_extract_municipios_rfb.py
+OUTPUT_DIR = '../data/processed/painel_did'
+
+# Colunas do cross-section que só repetem a chave
+REDUNDANTES = ['Municipio_Ibge']
+
+def ler_mei(path, de_para=None):
+    """Painel MEI com a chave do município em IBGE (via de-para quando o `mun` vem no código da RFB)."""
+    df = esquema_painel.ler_painel(path)
+    mun = juncao.chave_municipio(df['mun'])
+    if de_para is not None:
+        mun = juncao.traduzir_codigos(mun, juncao.chave_municipio(de_para['id_municipio_rf']),
+                                      juncao.chave_municipio(de_para['id_municipio']))
+        sem_par = int(np.count_nonzero(mun == 0))
+        if sem_par:
+            print(f"⚠️ {sem_par:,} linhas do MEI sem correspondência RFB -> IBGE (descartadas na junção).")
+    df['id_municipio'] = mun
+    return df.drop(columns='mun').rename(columns={'log_estoque': 'log_estoque_mei'})
+
+def ler_rais(path):
+    df = esquema_painel.ler_painel(path)
+    df['id_municipio'] = juncao.chave_municipio(df['id_municipio'])
+    return df.drop(columns=['nome_municipio'], errors='ignore').rename(columns={'log_estoque': 'log_vinculos'})
+
+def ordenar_painel(df):
+    """Chave (id_municipio, setor, ano) empacotada; reordena o painel só se ele não vier ordenado."""
+    chaves = juncao.chave_painel(df['id_municipio'].to_numpy(), df['setor'].cat.codes.to_numpy(), df['ano'].to_numpy())
+    ordem = juncao.ordem_das_chaves(chaves)
+    if ordem is None:
+        return df.reset_index(drop=True), chaves
+    return df.iloc[ordem].reset_index(drop=True), chaves[ordem]
+
+def montar_painel_did(df_mei, df_rais, df_cross):
+    """
+    MEI (base) x RAIS por (município, setor, ano) e x cross-section do matching por município.
+    Inner join nos dois: ficam as séries presentes nas três fontes. Retorna um pyarrow.Table.
+    """
+    if list(df_mei['setor'].cat.categories) != list(df_rais['setor'].cat.categories):
+        raise ValueError("MEI e RAIS com categorias de setor diferentes")
+    df_mei, chaves_mei = ordenar_painel(df_mei)
+    df_rais, chaves_rais = ordenar_painel(df_rais)
+    i_mei, i_rais = juncao.juntar_ordenado(chaves_mei, chaves_rais)
+
+    df_cross = df_cross.drop(columns=REDUNDANTES, errors='ignore')
+    ids_cross = juncao.chave_municipio(df_cross['id_municipio'])
+    ordem = juncao.ordem_das_chaves(ids_cross)
+    if ordem is not None:
+        df_cross, ids_cross = df_cross.iloc[ordem].reset_index(drop=True), ids_cross[ordem]
+    # ids do MEI continuam ordenados depois do filtro (são os bits altos da chave)
+    ids = df_mei['id_municipio'].to_numpy()[i_mei]
+    sel, i_cross = juncao.juntar_ordenado(ids, ids_cross)
+    i_mei, i_rais = i_mei[sel], i_rais[sel]
+
+    colunas = {c: df_mei[c].to_numpy()[i_mei] for c in df_mei.columns if c != 'setor'}
+    colunas['setor'] = pd.Categorical.from_codes(df_mei['setor'].cat.codes.to_numpy()[i_mei],
+                                                 dtype=df_mei['setor'].dtype)
+    for c in df_rais.columns:
+        if c not in ('id_municipio', 'setor', 'ano'):
+            colunas[c] = df_rais[c].to_numpy()[i_rais]
+    for c in df_cross.columns:
+        if c != 'id_municipio':
+            colunas[c] = df_cross[c].to_numpy()[i_cross]
+    primeiras = ['id_municipio', 'setor', 'ano']
+    df = pd.DataFrame(colunas)[primeiras + [c for c in colunas if c not in primeiras]]
+    return pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+
+def salvar_por_setor(tabela, destino):
+    """
+    Dataset Parquet particionado por setor (setor=<nome>/parte-0.parquet, estilo Hive).
+    Dentro de cada setor as linhas vão ordenadas por (ano, id_municipio) e cada ano vira
+    um row group, então as estatísticas min/max de ano permitem pular anos na leitura.
+    """
+    tmp = destino + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    setor = tabela.column('setor').combine_chunks()
+    resto = tabela.drop_columns(['setor'])
+    ano = tabela.column('ano').to_numpy()
+    linhas = {}
+    for codigo, nome in enumerate(setor.dictionary.to_pylist()):
+        idx = np.flatnonzero(setor.indices.to_numpy(zero_copy_only=False) == codigo)
+        if not len(idx):
+            continue
+        idx = idx[np.argsort(ano[idx], kind='stable')]  # base já está em (município, ano)
+        parte = resto.take(idx)
+        anos_parte = ano[idx]
+        pasta = os.path.join(tmp, f"setor={quote(nome)}")
+        os.makedirs(pasta)
+        with pq.ParquetWriter(os.path.join(pasta, 'parte-0.parquet'), parte.schema,
+                              compression='snappy', write_statistics=True) as writer:
+            bordas = np.flatnonzero(np.diff(anos_parte)) + 1
+            for ini, fim in zip(np.r_[0, bordas], np.r_[bordas, len(idx)]):
+                writer.write_table(parte.slice(ini, fim - ini))
+        linhas[nome] = len(idx)
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(tmp, destino)
+    return linhas
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Masterfile do DiD: painel MEI x RAIS x matching, particionado por setor.")
+    parser.add_argument("--de-para", default=DE_PARA_FILE,
+                        help="Parquet com id_municipio_rf -> id_municipio (obrigatório se o MEI vier no código da RFB).")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    instrumentacao.iniciar("15_build_masterfile_did")
+    arquivo_cross = FLAGS_FILE if os.path.exists(FLAGS_FILE) else MATCHING_FILE
+    for path in (MEI_FILE, RAIS_FILE, arquivo_cross):
+        if not os.path.exists(path):
+            print(f"❌ Erro: Arquivo {path} não encontrado.")
+            return
+
+    de_para = pd.read_parquet(args.de_para) if args.de_para and os.path.exists(args.de_para) else None
+    print("🔄 Carregando painéis (MEI, RAIS) e cross-section do matching...")
+    with instrumentacao.cronometro("leitura"):
+        df_mei = ler_mei(MEI_FILE, de_para)
+        df_rais = ler_rais(RAIS_FILE)
+        df_cross = pd.read_parquet(arquivo_cross)
+    if de_para is None and len(df_mei) and df_mei['id_municipio'].max() < 1_000_000:
+        # Sem o de-para a junção com a RAIS/matching (IBGE) ficaria vazia
+        print(f"❌ Erro: MEI está no código de município da RFB e não há de-para em {args.de_para} "
+              "(rode o 14_extract_municipios_rfb.py).")
+        raise SystemExit(1)
+
+    print("🔗 Juntando por chaves inteiras ordenadas...")
+    with instrumentacao.cronometro("juncao", linhas_mei=len(df_mei), linhas_rais=len(df_rais)) as m:
+        tabela = montar_painel_did(df_mei, df_rais, df_cross)
+        m["linhas"] = tabela.num_rows
+    if tabela.num_rows == 0:
+        print("❌ Erro: Nenhuma linha do MEI casou com RAIS e matching; confira os códigos de município.")
+        raise SystemExit(1)
+    print(f"   {tabela.num_rows:,} linhas ({len(df_mei) - tabela.num_rows:,} do MEI sem par na RAIS/matching)")
+
+    with instrumentacao.cronometro("escrita", linhas=tabela.num_rows):
+        linhas = salvar_por_setor(tabela, OUTPUT_DIR)
+    for nome, n in linhas.items():
+        print(f"📦 setor={nome}: {n:,} linhas")
+    print(f"📂 Salvo em: {OUTPUT_DIR}")
+
+if __name__ == "__main__":
+    main()
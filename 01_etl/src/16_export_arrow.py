@@ -0,0 +1,112 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import argparse
+import json
+import os
+import shutil
+
+import esquema_painel
+import instrumentacao
+
+# --- CONFIGURAÇÃO ---
+# Nome do .arrow -> origem (painéis balanceados, masterfile do DiD e cross-sections do matching)
+EXPORTACOES = {
+    'dataset_final_matching': '../data/processed/dataset_final_matching.parquet',   # Saída do 09 (lida pelo 10_marching_mdm.R)
+    'dataset_final_com_flags': '../data/processed/dataset_final_com_flags.parquet', # Saída do 12 (opcional)
+    'painel_did': '../data/processed/painel_did',                                   # Saída do 15 (particionado por setor)
+    'painel_mei_balanceado': '../data/processed/painel_mei_balanceado_2016_2024.parquet',
+    'rais_painel_balanceado': '../data/processed/rais_painel_balanceado.parquet',
+}
+OPCIONAIS = {'dataset_final_com_flags'}
+OUTPUT_DIR = '../data/processed/arrow'
+MANIFESTO = 'manifesto.json'
+LINHAS_POR_LOTE = 1_000_000
+
+def setor_como_dicionario(tabela):
+    """
+    Coluna `setor` -> dictionary<int8, string> com as categorias do esquema_painel (mesmos
+    códigos em todos os arquivos e no pandas). Setores fora do esquema: dicionário próprio.
+    """
+    if 'setor' not in tabela.column_names:
+        return tabela
+    i = tabela.column_names.index('setor')
+    valores = pc.cast(tabela.column('setor'), pa.string())
+    dicionario = pa.array(esquema_painel.SETORES_PAINEL, pa.string())
+    codigos = pc.index_in(valores, value_set=dicionario)
+    if codigos.null_count > valores.null_count:
+        setor = valores.combine_chunks().dictionary_encode()
+    else:
+        setor = pa.chunked_array([pa.DictionaryArray.from_arrays(pc.cast(c, pa.int8()), dicionario)
+                                  for c in codigos.chunks], pa.dictionary(pa.int8(), pa.string()))
+    return tabela.set_column(i, 'setor', setor)
+
+def ler_origem(nome, path):
+    """Tabela Arrow de uma origem, com as chaves na frente e sem metadados do pandas."""
+    if nome.startswith(('painel_mei', 'rais_painel')):
+        tabela = pa.Table.from_pandas(esquema_painel.ler_painel(path), preserve_index=False)
+    else:
+        tabela = pq.read_table(path)  # Diretório particionado: setor volta como coluna
+    primeiras = [c for c in ('id_municipio', 'mun', 'setor', 'ano') if c in tabela.column_names]
+    tabela = tabela.select(primeiras + [c for c in tabela.column_names if c not in primeiras])
+    return setor_como_dicionario(tabela).replace_schema_metadata(None)
+
+def gravar_feather(tabela, path):
+    """Arrow IPC (Feather v2) sem compressão: o R/pyarrow mapeia o arquivo em memória sem copiar."""
+    # O painel particionado chega em um pedaço por (setor, ano): junta antes de fatiar os lotes
+    feather.write_feather(tabela.combine_chunks(), path, compression='uncompressed', chunksize=LINHAS_POR_LOTE)
+    with pa.memory_map(path) as f:
+        lotes = pa.ipc.open_file(f).num_record_batches
+    return {
+        'arquivo': os.path.basename(path),
+        'linhas': tabela.num_rows,
+        'bytes': os.path.getsize(path),
+        'lotes': lotes,
+        'colunas': [{'nome': campo.name, 'tipo': str(campo.type), 'nulos': tabela.column(campo.name).null_count}
+                    for campo in tabela.schema],
+    }
+
+def exportar(exportacoes, destino):
+    """Grava todos os .arrow e o manifesto num diretório temporário e troca o destino de uma vez."""
+    tmp = destino + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    manifesto = {'formato': 'arrow-ipc (feather v2)', 'compressao': 'nenhuma', 'arquivos': {}}
+    for nome, path in exportacoes.items():
+        with instrumentacao.cronometro(nome) as m:
+            tabela = ler_origem(nome, path)
+            info = gravar_feather(tabela, os.path.join(tmp, f"{nome}.arrow"))
+            m['linhas'] = info['linhas']
+        manifesto['arquivos'][nome] = {'origem': path, **info}
+        print(f"✅ {nome}: {info['linhas']:,} linhas, {len(info['colunas'])} colunas ({info['bytes'] / 1024 ** 2:.1f} MB)")
+    with open(os.path.join(tmp, MANIFESTO), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False)
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(tmp, destino)
+    return manifesto
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Exporta os painéis finais em Arrow IPC (Feather v2) sem compressão para o R.")
+    parser.add_argument("--destino", default=OUTPUT_DIR)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    instrumentacao.iniciar("16_export_arrow")
+    exportacoes = {}
+    for nome, path in EXPORTACOES.items():
+        if os.path.exists(path):
+            exportacoes[nome] = path
+        elif nome in OPCIONAIS:
+            print(f"⚠️ {path} não encontrado; {nome}.arrow não será gerado.")
+        else:
+            print(f"❌ Erro: Arquivo {path} não encontrado.")
+            return
+
+    print(f"🔄 Exportando {len(exportacoes)} tabelas para Arrow IPC em {args.destino}...")
+    exportar(exportacoes, args.destino)
+    print(f"📂 Salvo em: {args.destino} (esquemas e linhas em {MANIFESTO})")
+
+if __name__ == "__main__":
+    main()
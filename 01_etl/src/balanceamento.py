@@ -0,0 +1,78 @@
+"""
+Balanceamento de painéis Município x Setor x Ano com arrays densos.
+
+Cada chave vira uma coordenada inteira (np.unique / searchsorted / códigos do
+categórico), os valores são espalhados num cubo NumPy com np.bincount e o setor
+'Total', o estoque acumulado e o log1p saem de reduções ao longo dos eixos.
+Sem MultiIndex, reindex, ordenação ou groupby.
+"""
+import numpy as np
+import pandas as pd
+
+import esquema_painel
+
+N_SETORES = len(esquema_painel.SETORES_PAINEL)
+TOTAL = esquema_painel.SETORES_PAINEL.index('Total')
+
+def coordenadas(df, col_mun, anos=None):
+    """
+    Mapeia (município, setor, ano) de cada linha para índices densos.
+    Retorna (muns, anos, i_mun, i_setor, i_ano, validas); linhas com ano fora de `anos` ficam inválidas.
+    """
+    muns, i_mun = np.unique(df[col_mun].to_numpy(), return_inverse=True)
+
+    ano = df['ano'].to_numpy()
+    anos = np.unique(ano) if anos is None else np.asarray(anos)
+    i_ano = np.searchsorted(anos, ano)
+    i_ano_seguro = np.minimum(i_ano, len(anos) - 1)
+    validas = (i_ano < len(anos)) & (anos[i_ano_seguro] == ano)
+
+    setor = df['setor']
+    if not isinstance(setor.dtype, pd.CategoricalDtype) or list(setor.cat.categories) != esquema_painel.SETORES_PAINEL:
+        setor = setor.astype(esquema_painel.SETOR_DTYPE)
+    i_setor = setor.cat.codes.to_numpy()
+    validas &= i_setor >= 0
+
+    return muns, anos, i_mun, i_setor, i_ano_seguro, validas
+
+def montar_cubo(valores, i_mun, i_setor, i_ano, validas, forma):
+    """Espalha (e soma) os valores no cubo (mun, setor, ano) e preenche o setor Total."""
+    n_mun, n_set, n_ano = forma
+    plano = (i_mun[validas] * n_set + i_setor[validas]) * n_ano + i_ano[validas]
+    cubo = np.bincount(plano, weights=np.asarray(valores, dtype=np.float64)[validas],
+                       minlength=n_mun * n_set * n_ano).reshape(forma)
+    # Total = soma dos setores (eixo 1), ignorando um Total que já viesse no input
+    cubo[:, TOTAL, :] = np.delete(cubo, TOTAL, axis=1).sum(axis=1)
+    return cubo
+
+def balancear(df, col_mun, colunas, anos=None, estoque=None, log_de=None):
+    """
+    Painel balanceado com todos os municípios x setores (+ Total) x anos, lacunas em zero.
+
+    colunas: colunas de valor a somar por célula.
+    anos: grade de anos; por padrão os anos presentes no df (linhas fora da grade são descartadas).
+    estoque: (nome, entrada, saida) -> nome = cumsum(entrada) - cumsum(saida) ao longo dos anos.
+    log_de: coluna (ou o estoque) para log_estoque = log1p(max(x, 0)).
+    """
+    muns, anos, i_mun, i_setor, i_ano, validas = coordenadas(df, col_mun, anos)
+    forma = (len(muns), N_SETORES, len(anos))
+    cubos = {c: montar_cubo(df[c].to_numpy(), i_mun, i_setor, i_ano, validas, forma) for c in colunas}
+
+    if estoque is not None:
+        nome, entrada, saida = estoque
+        cubos[nome] = (np.cumsum(cubos[entrada].astype(np.int64), axis=2)
+                       - np.cumsum(cubos[saida].astype(np.int64), axis=2))
+
+    if log_de is not None:
+        cubos['log_estoque'] = np.log1p(np.clip(cubos[log_de], 0, None))
+
+    n_mun, n_set, n_ano = forma
+    saida_df = pd.DataFrame({
+        col_mun: np.repeat(muns, n_set * n_ano),
+        'setor': pd.Categorical.from_codes(np.tile(np.repeat(np.arange(n_set), n_ano), n_mun),
+                                           dtype=esquema_painel.SETOR_DTYPE),
+        'ano': np.tile(anos, n_mun * n_set),
+    })
+    for nome, cubo in cubos.items():
+        saida_df[nome] = cubo.reshape(-1)
+    return esquema_painel.aplicar_esquema(saida_df)
@@ -0,0 +1,53 @@
+"""
+Buffer espacial: distância de cada município ao tratado mais próximo.
+
+Os centroides viram vetores unitários em 3-D; a distância em linha reta (corda)
+entre dois pontos da esfera é função monótona da distância de grande círculo,
+então uma KD-tree (scipy cKDTree) com os tratados responde "qual o tratado mais
+próximo" em O(log n) por consulta. Com essa distância, qualquer raio de buffer
+é só uma comparação: vários raios e vários esquemas de tratamento saem da mesma
+passada, sem a matriz densa n x n do rdist.earth.
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+RAIO_TERRA_KM = 6378.388  # Mesmo raio do fields::rdist.earth(miles = FALSE)
+
+def vetores_unitarios(longitude, latitude):
+    """(lon, lat) em graus -> pontos (x, y, z) na esfera unitária."""
+    lon = np.radians(np.asarray(longitude, dtype=np.float64))
+    lat = np.radians(np.asarray(latitude, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+def corda_para_km(corda):
+    """Distância euclidiana na esfera unitária -> distância de grande círculo em km."""
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.clip(corda / 2, 0, 1))
+
+def distancia_ao_tratado(pontos, tratados):
+    """
+    Distância (km) de cada ponto ao tratado mais próximo (inf se não houver tratado).
+    `tratados` é uma máscara booleana sobre os pontos; pontos com coordenada ausente ficam em inf.
+    """
+    validos = np.isfinite(pontos).all(axis=1)
+    distancia = np.full(len(pontos), np.inf)
+    alvo = tratados & validos
+    if not alvo.any():
+        return distancia
+    arvore = cKDTree(pontos[alvo])
+    corda, _ = arvore.query(pontos[validos], k=1)
+    distancia[validos] = corda_para_km(corda)
+    return distancia
+
+def distancias_por_tratamento(longitude, latitude, grupos):
+    """
+    Para cada esquema de tratamento ({nome: array com 1 = tratado}), a distância de cada
+    município ao tratado mais próximo. Retorna matriz float (n x esquemas) na ordem de `grupos`.
+    """
+    pontos = vetores_unitarios(longitude, latitude)
+    return np.column_stack([distancia_ao_tratado(pontos, np.asarray(g) == 1) for g in grupos.values()]) \
+        if grupos else np.empty((len(pontos), 0))
+
+def controles_no_buffer(distancia_km, grupo, raio_km):
+    """Controles (grupo == 0) a menos de raio_km de algum tratado (critério `<` do script em R)."""
+    return (np.asarray(grupo) == 0) & (distancia_km < raio_km)
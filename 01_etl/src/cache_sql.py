@@ -0,0 +1,195 @@
+"""
+Cache local (endereçado por conteúdo) dos resultados de SQL da Base dos Dados.
+
+A chave é o hash do SQL normalizado (sem comentários, espaços colapsados fora dos
+literais) + parâmetros + backend: reindentar a query não invalida o cache, mudar um
+filtro sim. Cada resultado vira um Parquet tipado `<chave>.parquet` com um `<chave>.json`
+ao lado (criação, último acesso, tamanho, linhas). Metadados por entrada, e não um
+índice único, porque 03 e 08 rodam em paralelo no pipeline.
+
+- TTL: entradas mais velhas que ttl_horas são consultadas de novo (None = não expira).
+- Invalidação manual: invalidar(...) para uma query, limpar() para tudo.
+- LRU: depois de cada gravação, remove as entradas de acesso mais antigo até o total
+  caber em max_mb.
+- Offline: só serve do cache (entradas vencidas também, com aviso); se faltar, CacheAusente.
+
+Uso: executar = cache_sql.com_cache(clientes_sql.cliente_duckdb(...), "duckdb:...")
+     df = executar(query, ano=2019)  # parâmetros substituem $ano no SQL
+"""
+import hashlib
+import json
+import os
+import re
+import string
+import time
+
+import pandas as pd
+
+import clientes_sql
+
+DIR_CACHE = "../data/interim/cache_sql"
+MAX_MB = 2048
+# Incrementar se o formato gravado mudar (invalida todas as chaves)
+VERSAO = 1
+
+# Literais e identificadores entre crases passam intactos; comentários somem; espaços colapsam
+_TOKENS = re.compile(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`)|((?:\s|--[^\n]*|/\*.*?\*/)+)""", re.S)
+
+class CacheAusente(LookupError):
+    """Modo offline e a query não está no cache."""
+
+def normalizar_sql(query):
+    """SQL canônico para a chave: sem comentários, espaços simples fora de literais, sem ';' final."""
+    sql = _TOKENS.sub(lambda m: m.group(1) or " ", query)
+    return sql.strip().rstrip(";").strip()
+
+def chave(query, backend, **params):
+    conteudo = json.dumps({"v": VERSAO, "sql": normalizar_sql(query), "params": params, "backend": backend},
+                          sort_keys=True, default=str)
+    return hashlib.blake2b(conteudo.encode(), digest_size=16).hexdigest()
+
+def renderizar(query, **params):
+    """Substitui $nome pelos parâmetros (string.Template; sem parâmetros o SQL passa intacto)."""
+    return string.Template(query).substitute(params) if params else query
+
+def _caminhos(diretorio, k):
+    return os.path.join(diretorio, f"{k}.parquet"), os.path.join(diretorio, f"{k}.json")
+
+def _gravar_json(obj, path):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _ler_meta(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def entradas(diretorio=DIR_CACHE):
+    """Metadados de todas as entradas (com a chave), da mais recente para a mais antiga no acesso."""
+    if not os.path.isdir(diretorio):
+        return []
+    metas = []
+    for nome in os.listdir(diretorio):
+        if nome.endswith(".json"):
+            meta = _ler_meta(os.path.join(diretorio, nome))
+            if meta is not None:
+                metas.append({"chave": nome[:-len(".json")], **meta})
+    return sorted(metas, key=lambda m: m["ultimo_acesso"], reverse=True)
+
+def _remover(diretorio, k):
+    for path in _caminhos(diretorio, k):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def invalidar(query, backend, diretorio=DIR_CACHE, **params):
+    """Remove a entrada de uma query. Retorna True se ela existia."""
+    k = chave(query, backend, **params)
+    existia = os.path.exists(_caminhos(diretorio, k)[0])
+    _remover(diretorio, k)
+    return existia
+
+def limpar(diretorio=DIR_CACHE):
+    """Remove todas as entradas. Retorna quantas eram."""
+    todas = entradas(diretorio)
+    for meta in todas:
+        _remover(diretorio, meta["chave"])
+    return len(todas)
+
+def evictar(diretorio=DIR_CACHE, max_mb=MAX_MB, manter=()):
+    """LRU: remove as entradas de acesso mais antigo até o total caber em max_mb. Retorna as removidas."""
+    todas = entradas(diretorio)
+    total = sum(m["bytes"] for m in todas)
+    removidas = []
+    for meta in reversed(todas):
+        if total <= max_mb * 1024 ** 2:
+            break
+        if meta["chave"] in manter:
+            continue
+        _remover(diretorio, meta["chave"])
+        total -= meta["bytes"]
+        removidas.append(meta["chave"])
+    return removidas
+
+def com_cache(executar, backend, diretorio=DIR_CACHE, ttl_horas=None, max_mb=MAX_MB, offline=False, renovar=False):
+    """
+    Envolve um cliente `query -> DataFrame` (clientes_sql) com o cache. `backend` entra na
+    chave (ex.: "bigquery", "duckdb:<arquivo>") para não misturar resultados de fontes
+    diferentes. Com offline=True, `executar` pode ser None. renovar=True ignora o que
+    estiver no cache (e regrava).
+    """
+    os.makedirs(diretorio, exist_ok=True)
+
+    def executar_com_cache(query, **params):
+        k = chave(query, backend, **params)
+        parquet, meta_path = _caminhos(diretorio, k)
+        meta = _ler_meta(meta_path)
+        agora = time.time()
+
+        if meta is not None and not renovar:
+            vencida = ttl_horas is not None and agora - meta["criado"] > ttl_horas * 3600
+            if not vencida or offline:
+                try:
+                    df = pd.read_parquet(parquet)
+                except FileNotFoundError:  # Evictada por outro processo entre o json e o parquet
+                    df = None
+                if df is not None:
+                    if vencida:
+                        print(f"⚠️ Cache vencido servido no modo offline ({k[:12]}).")
+                    _gravar_json({**meta, "ultimo_acesso": agora}, meta_path)
+                    print(f"♻️  Resultado em cache ({k[:12]}, {len(df):,} linhas).")
+                    return df
+
+        if offline:
+            raise CacheAusente(f"Modo offline e a query não está no cache ({k[:12]}).")
+
+        df = executar(renderizar(query, **params))
+        if df.empty:
+            return df  # Vazio costuma ser erro de filtro/permissão: não fica guardado
+        tmp = f"{parquet}.{os.getpid()}.tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, parquet)
+        _gravar_json({"criado": agora, "ultimo_acesso": agora, "bytes": os.path.getsize(parquet),
+                      "linhas": len(df), "backend": backend, "sql": normalizar_sql(query)[:200],
+                      "params": params}, meta_path)
+        evictar(diretorio, max_mb, manter={k})
+        return df
+    return executar_com_cache
+
+def adicionar_argumentos(parser):
+    """Opções de backend/cache comuns às extrações da Base dos Dados (03, 08, 14)."""
+    parser.add_argument("--duckdb", default=None,
+                        help="Roda a query num arquivo .duckdb local em vez do BigQuery (fixtures/testes).")
+    parser.add_argument("--offline", action="store_true", help="Só serve do cache local; falha se a query não estiver lá.")
+    parser.add_argument("--renovar-cache", action="store_true", help="Ignora o cache e consulta de novo.")
+    parser.add_argument("--sem-cache", action="store_true", help="Não lê nem grava o cache.")
+    parser.add_argument("--ttl-horas", type=float, default=None, help="Validade das entradas do cache (padrão: sem prazo).")
+    parser.add_argument("--cache-max-mb", type=float, default=MAX_MB, help="Tamanho máximo do cache (LRU).")
+    return parser
+
+def cliente(args, billing_id=None):
+    """Cliente `query, **params -> DataFrame` a partir das opções de adicionar_argumentos."""
+    if args.duckdb:
+        if not os.path.exists(args.duckdb):
+            raise FileNotFoundError(f"DuckDB local não encontrado: {args.duckdb}")
+        st = os.stat(args.duckdb)
+        # Regerar a fixture muda tamanho/mtime e, com isso, a chave
+        backend = f"duckdb:{os.path.abspath(args.duckdb)}:{st.st_size}:{st.st_mtime_ns}"
+    else:
+        backend = "bigquery"
+
+    executar = None
+    if not args.offline:
+        executar = clientes_sql.cliente_duckdb(args.duckdb) if args.duckdb else \
+            clientes_sql.cliente_basedosdados(billing_id)
+    if args.sem_cache:
+        if executar is None:
+            raise ValueError("--offline precisa do cache (não combine com --sem-cache).")
+        return lambda query, **params: executar(renderizar(query, **params))
+    return com_cache(executar, backend, ttl_horas=args.ttl_horas, max_mb=args.cache_max_mb,
+                     offline=args.offline, renovar=args.renovar_cache)
@@ -0,0 +1,41 @@
+"""
+Clientes SQL intercambiáveis para as extrações da Base dos Dados.
+
+Um cliente é qualquer função `query -> DataFrame`. Em produção usamos o
+BigQuery via basedosdados; em testes, um DuckDB local com as mesmas tabelas
+(nomes `projeto.dataset.tabela` viram `projeto__dataset__tabela`; geografias
+como o centroide do diretório de municípios são STRUCT(x, y)).
+"""
+import re
+
+def cliente_basedosdados(billing_id):
+    """Executa a query no BigQuery (cobrado no projeto billing_id)."""
+    import basedosdados as bd
+
+    def executar(query):
+        return bd.read_sql(query=query, billing_project_id=billing_id)
+    return executar
+
+def nome_tabela_local(tabela):
+    """`basedosdados.br_me_rais.microdados_estabelecimentos` -> basedosdados__br_me_rais__microdados_estabelecimentos"""
+    return tabela.replace(".", "__")
+
+def traduzir_para_duckdb(query):
+    """Ajusta o dialeto do BigQuery usado nas nossas queries para o DuckDB."""
+    query = re.sub(r"`([\w.\-]+)`", lambda m: nome_tabela_local(m.group(1)), query)
+    query = re.sub(r"\bINT64\b", "BIGINT", query)
+    query = re.sub(r"\bFLOAT64\b", "DOUBLE", query)
+    # Sem a extensão spatial: ST_X(ponto) / ST_Y(ponto) leem os campos do STRUCT
+    query = re.sub(r"\bST_([XY])\(\s*([\w.]+)\s*\)", lambda m: f"({m.group(2)}).{m.group(1).lower()}", query)
+    return query
+
+def cliente_duckdb(conexao_ou_caminho=":memory:"):
+    """Executa a query traduzida num DuckDB local (conexão aberta ou caminho do .duckdb)."""
+    import duckdb
+
+    conexao = duckdb.connect(conexao_ou_caminho) if isinstance(conexao_ou_caminho, str) else conexao_ou_caminho
+
+    def executar(query):
+        # Cursor próprio por chamada: a conexão é compartilhada entre threads
+        return conexao.cursor().execute(traduzir_para_duckdb(query)).df()
+    return executar
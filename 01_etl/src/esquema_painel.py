@@ -0,0 +1,71 @@
+"""
+Esquema compacto dos painéis intermediários (RAIS, MEI e cross-sections do PIX).
+
+Todas as etapas leem e gravam os painéis por aqui: município em int32, ano em
+int16, setor categórico (códigos uint8) e fluxos como inteiros sem sinal.
+"""
+import numpy as np
+import pandas as pd
+
+import setores
+
+SETORES_PAINEL = setores.SETORES[:setores.OUTROS] + ['Total']
+SETOR_DTYPE = pd.CategoricalDtype(SETORES_PAINEL)
+
+# Colunas conhecidas -> dtype. Colunas fora daqui passam intactas.
+ESQUEMA = {
+    'mun': np.int32,
+    'id_municipio': np.int32,
+    'ano': np.int16,
+    'setor': SETOR_DTYPE,
+    'entradas': np.uint32,
+    'saidas': np.uint32,
+    'estoque_mei': np.int32,
+    'quantidade_vinculos_ativos': np.uint32,
+    'log_estoque': np.float32,
+}
+
+def normalizar_id(series):
+    """Código IBGE/RFB em qualquer formato (str com zeros, float com .0) -> int32. Inválidos viram 0."""
+    return pd.to_numeric(series, errors='coerce').fillna(0).astype(np.int32)
+
+def codigo_regiao(id_municipio):
+    """Macrorregião = 1º dígito do código IBGE de 7 dígitos (1 Norte ... 5 Centro-Oeste)."""
+    return (np.asarray(id_municipio) // 1_000_000).astype(np.int8)
+
+def _converter(series, dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        if isinstance(series.dtype, pd.CategoricalDtype) and list(series.cat.categories) == list(dtype.categories):
+            return series
+        convertida = series.astype(str).where(series.notna()).astype(dtype)
+        invalidos = series.notna() & convertida.isna()
+        if invalidos.any():
+            raise ValueError(f"Setores fora do esquema: {sorted(series[invalidos].astype(str).unique())}")
+        return convertida
+    if np.issubdtype(dtype, np.integer):
+        # Sem coerção silenciosa: NaN, texto ou valor fora da faixa do tipo é dado corrompido
+        # (a normalização com perda de IDs fica em normalizar_id, para quem pedir)
+        numeros = pd.to_numeric(series, errors='coerce')
+        limites = np.iinfo(dtype)
+        invalidos = numeros.isna() | (numeros < limites.min) | (numeros > limites.max) | (numeros % 1 != 0)
+        if invalidos.any():
+            exemplos = sorted(series[invalidos].astype(str).unique())[:5]
+            raise ValueError(f"Coluna {series.name}: {int(invalidos.sum()):,} valores ausentes, não inteiros "
+                             f"ou fora de {limites.min}..{limites.max} ({np.dtype(dtype).name}); ex.: {exemplos}")
+        return numeros.astype(dtype)
+    return series.astype(dtype)
+
+def aplicar_esquema(df):
+    """Converte as colunas conhecidas do painel para os tipos compactos (in place) e devolve o df."""
+    for coluna, dtype in ESQUEMA.items():
+        if coluna in df.columns and df[coluna].dtype != dtype:
+            df[coluna] = _converter(df[coluna], dtype)
+    return df
+
+def ler_painel(path, columns=None):
+    """Lê um painel Parquet já no esquema compacto."""
+    return aplicar_esquema(pd.read_parquet(path, columns=columns))
+
+def salvar_painel(df, path):
+    """Grava o painel no esquema compacto (categorias do setor viram dicionário no Parquet)."""
+    aplicar_esquema(df).to_parquet(path, index=False, compression='snappy')
@@ -0,0 +1,156 @@
+"""
+Painel mensal de fluxos MEI (entradas, saídas e estoque por mês).
+
+O mês sai direto das datas YYYYMMDD inteiras, sem parse de datetime:
+ano = data // 10000 e mes = data // 100 % 100 (o índice MEI guarda os dois).
+Os fluxos caem num cubo denso município x setor x mês de contadores uint32,
+somados chunk a chunk (o mesmo leitor do painel anual); o estoque é a soma
+acumulada ao longo do eixo do tempo.
+
+O eixo do tempo tem uma posição extra no início ("antes") que recebe tudo o que
+aconteceu antes da janela: o estoque do primeiro mês já parte do acumulado
+histórico, sem guardar os meses anteriores. O cubo tem tamanho municípios com MEI x
+setores x meses da janela, independente do número de estabelecimentos.
+"""
+import numpy as np
+import pandas as pd
+
+import agregacao_streaming
+import esquema_painel
+import indice_mei
+import setores
+
+INICIO = 201601  # Janela padrão: a mesma do painel balanceado anual (2016-2024)
+FIM = 202412
+N_CODIGOS = 10_000  # Município da RFB (tabela TOM) tem 4 dígitos; a tabela de lookup cresce se vier código maior
+N_SETORES = setores.OUTROS  # Agro, Indústria, Serviços, Setor Público (o CNPJ não gera 'Outros')
+
+def mes_absoluto(ano, mes):
+    """(ano, mês 1-12) -> contagem de meses desde o ano 0."""
+    return np.asarray(ano, dtype=np.int32) * 12 + np.asarray(mes, dtype=np.int32) - 1
+
+def de_aaaamm(aaaamm):
+    return mes_absoluto(aaaamm // 100, aaaamm % 100)
+
+class CuboMensal:
+    """
+    Contadores de entradas/saídas em (município, setor, 1 + meses da janela).
+    As linhas do cubo são só os municípios já vistos (código -> linha por uma tabela de
+    lookup), então a memória acompanha o número de municípios com MEI, não o maior código.
+    """
+
+    def __init__(self, inicio=INICIO, fim=FIM):
+        self.inicio, self.fim = inicio, fim
+        self.m0, self.m1 = de_aaaamm(inicio), de_aaaamm(fim)
+        if self.m1 < self.m0:
+            raise ValueError(f"janela vazia: {inicio} a {fim}")
+        self.n_tempo = int(self.m1 - self.m0) + 2
+        self.linha = np.full(N_CODIGOS, -1, dtype=np.int32)
+        self.codigos = np.empty(0, dtype=np.int32)
+        self._entradas = np.zeros((0, N_SETORES, self.n_tempo), dtype=np.uint32)
+        self._saidas = np.zeros_like(self._entradas)
+
+    @property
+    def n_meses(self):
+        return self.n_tempo - 1
+
+    @property
+    def entradas(self):
+        return self._entradas[:len(self.codigos)]
+
+    @property
+    def saidas(self):
+        return self._saidas[:len(self.codigos)]
+
+    def _linhas(self, mun):
+        """Linha do cubo de cada município, abrindo linhas para os novos (capacidade dobra quando enche)."""
+        if int(mun.max()) >= len(self.linha):
+            self.linha = np.pad(self.linha, (0, int(mun.max()) + 1 - len(self.linha)), constant_values=-1)
+        novos = np.unique(mun[self.linha[mun] < 0])
+        if len(novos):
+            n = len(self.codigos)
+            self.linha[novos] = np.arange(n, n + len(novos), dtype=np.int32)
+            self.codigos = np.concatenate([self.codigos, novos.astype(np.int32)])
+            if len(self.codigos) > len(self._entradas):
+                capacidade = max(len(self.codigos), 2 * len(self._entradas), 64)
+                extra = ((0, capacidade - len(self._entradas)), (0, 0), (0, 0))
+                self._entradas = np.pad(self._entradas, extra)
+                self._saidas = np.pad(self._saidas, extra)
+        return self.linha[mun]
+
+    def _posicao(self, ano, mes):
+        """Posição no eixo do tempo: 0 = antes da janela; -1 = depois (descartado) ou data inválida."""
+        m = mes_absoluto(ano, np.clip(mes, 1, 12))
+        pos = np.where(m < self.m0, 0, m - self.m0 + 1)
+        return np.where((m > self.m1) | (np.asarray(ano) <= agregacao_streaming.ANO_BASE), -1, pos)
+
+    def _somar(self, cubo, linhas, setor, pos, pesos=None):
+        ok = pos >= 0
+        plano = (linhas[ok].astype(np.int64) * N_SETORES + setor[ok]) * self.n_tempo + pos[ok]
+        if pesos is None:
+            celulas, contagem = np.unique(plano, return_counts=True)
+        else:
+            celulas, contagem = plano, pesos[ok]
+        cubo.reshape(-1)[celulas] += contagem.astype(np.uint32)
+
+    def adicionar(self, mun, setor, ano_ini, mes_ini, ano_fim, mes_fim):
+        """Soma um lote de MEIs (uma entrada e, se houver, uma saída por estabelecimento)."""
+        mun = np.asarray(mun, dtype=np.int64)
+        if not len(mun):
+            return
+        linhas = self._linhas(mun)
+        self._somar(self._entradas, linhas, setor, self._posicao(ano_ini, mes_ini))
+        self._somar(self._saidas, linhas, setor, self._posicao(ano_fim, mes_fim))
+
+    def compactar(self):
+        """Só as células com fluxo: (município, setor, posição no tempo, entradas, saídas). Volta dos workers."""
+        ent, sai = self.entradas.reshape(-1), self.saidas.reshape(-1)
+        celulas = np.flatnonzero(ent | sai)
+        linha, resto = np.divmod(celulas, N_SETORES * self.n_tempo)
+        setor, pos = np.divmod(resto, self.n_tempo)
+        return self.codigos[linha], setor, pos, ent[celulas], sai[celulas]
+
+    def somar_compacto(self, compacto):
+        mun, setor, pos, entradas, saidas = compacto
+        if len(mun):
+            linhas = self._linhas(np.asarray(mun, dtype=np.int64))
+            self._somar(self._entradas, linhas, setor, pos, entradas)
+            self._somar(self._saidas, linhas, setor, pos, saidas)
+        return self
+
+    def estoque(self):
+        """Estoque no fim de cada mês da janela (int32), já com o acumulado de antes da janela."""
+        saldo = self.entradas.astype(np.int32)
+        saldo -= self.saidas.astype(np.int32)
+        np.cumsum(saldo, axis=2, out=saldo)
+        return saldo[:, :, 1:]
+
+    def para_painel(self):
+        """Painel longo (mun, setor, ano, mes, entradas, saidas, estoque_mei), municípios em ordem de código."""
+        ordem = np.argsort(self.codigos, kind="stable")
+        n_mun, n_meses = len(ordem), self.n_meses
+        meses = self.m0 + np.arange(n_meses)
+        return pd.DataFrame({
+            'mun': np.repeat(self.codigos[ordem], N_SETORES * n_meses),
+            'setor': pd.Categorical.from_codes(np.tile(np.repeat(np.arange(N_SETORES), n_meses), n_mun),
+                                               dtype=esquema_painel.SETOR_DTYPE),
+            'ano': np.tile(meses // 12, n_mun * N_SETORES).astype(np.int16),
+            'mes': np.tile(meses % 12 + 1, n_mun * N_SETORES).astype(np.int8),
+            'entradas': self.entradas[ordem, :, 1:].reshape(-1),
+            'saidas': self.saidas[ordem, :, 1:].reshape(-1),
+            'estoque_mei': self.estoque()[ordem].reshape(-1),
+        })
+
+def agregar_chunk(cubo, chunk, indice):
+    """Cruza um chunk (cnpj_basico, cnae, mun) com o índice MEI e soma os fluxos mensais no cubo."""
+    mun = np.nan_to_num(chunk['mun'].to_numpy(dtype=np.float64)).astype(np.int64)
+    pos, achou = indice_mei.consultar(indice, chunk['cnpj_basico'].to_numpy())
+    # Município ausente é descartado (mesmo efeito do groupby com NaN no painel anual)
+    achou &= mun > 0
+    if not achou.any():
+        return
+    pos = pos[achou]
+    setor = setores.classificar_cnae(chunk['cnae'].to_numpy()[achou])
+    cubo.adicionar(mun[achou], setor,
+                   np.asarray(indice["ano_ini"][pos]), np.asarray(indice["mes_ini"][pos]),
+                   np.asarray(indice["ano_fim"][pos]), np.asarray(indice["mes_fim"][pos]))
@@ -0,0 +1,87 @@
+"""
+Atualização incremental do painel MEI (painel_mei_rf_anual.parquet).
+
+Uma execução completa com --salvar-estado grava o estado por estabelecimento MEI
+(cnpj_basico, mun, setor, ano_ini, ano_fim); execuções completas sem ele apagam o
+estado anterior, que deixaria de corresponder ao painel. Num novo snapshot mensal da RFB,
+o estado novo é comparado ao anterior como multiconjunto: linhas que sumiram
+entram com sinal negativo, linhas novas com sinal positivo. Só esses deltas
+viram fluxos, e o estoque é recalculado apenas nas séries (mun, setor) afetadas.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import esquema_painel
+
+ARQUIVO_ESTADO = "../data/interim/estado_mei.parquet"
+COLUNAS_ESTADO = ['cnpj_basico', 'mun', 'setor', 'ano_ini', 'ano_fim']
+TIPOS_ESTADO = {'cnpj_basico': np.int32, 'mun': np.int32, 'setor': np.uint8,
+                'ano_ini': np.int16, 'ano_fim': np.int16}
+CHAVES = ['mun', 'setor', 'ano']
+
+def estado_do_chunk(chunk):
+    """Linhas de estado de um chunk já cruzado com o índice MEI e setorizado."""
+    chunk = chunk[chunk['mun'].notna()]
+    return pd.DataFrame({c: chunk[c].to_numpy().astype(t) for c, t in TIPOS_ESTADO.items()})
+
+def salvar_estado(estado, path=ARQUIVO_ESTADO):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    estado.to_parquet(path, index=False, compression='snappy')
+
+def carregar_estado(path=ARQUIVO_ESTADO):
+    return pd.read_parquet(path).astype(TIPOS_ESTADO)
+
+def diferenca(antigo, novo):
+    """Multiconjunto novo - antigo: cada combinação distinta com seu delta (≠ 0) de contagem."""
+    sinal = pd.concat([
+        antigo.assign(delta=np.int32(-1)),
+        novo.assign(delta=np.int32(1)),
+    ], ignore_index=True)
+    delta = sinal.groupby(COLUNAS_ESTADO, sort=False)['delta'].sum().reset_index()
+    return delta[delta['delta'] != 0]
+
+def fluxos_do_delta(delta):
+    """Converte os deltas de estado em deltas de entradas/saidas por (mun, setor, ano)."""
+    ent = (delta[delta['ano_ini'] > 1900]
+           .groupby(['mun', 'setor', 'ano_ini'])['delta'].sum()
+           .rename_axis(CHAVES).rename('entradas'))
+    sai = (delta[delta['ano_fim'] > 1900]
+           .groupby(['mun', 'setor', 'ano_fim'])['delta'].sum()
+           .rename_axis(CHAVES).rename('saidas'))
+    fluxos = pd.concat([ent, sai], axis=1).fillna(0).astype(np.int64).reset_index()
+    fluxos['setor'] = pd.Categorical.from_codes(fluxos['setor'].to_numpy(), dtype=esquema_painel.SETOR_DTYPE)
+    return fluxos
+
+def aplicar_fluxos(painel, fluxos):
+    """
+    Soma os deltas ao painel anual e recalcula o estoque só nas séries (mun, setor) tocadas.
+    Retorna (painel_atualizado, n_series_afetadas).
+    """
+    if fluxos.empty:
+        return painel, 0
+
+    base = painel[CHAVES + ['entradas', 'saidas', 'estoque_mei']].copy()
+    base[['entradas', 'saidas', 'estoque_mei']] = base[['entradas', 'saidas', 'estoque_mei']].astype(np.int64)
+    fluxos = fluxos.rename(columns={'entradas': 'd_ent', 'saidas': 'd_sai'})
+
+    df = base.merge(fluxos, on=CHAVES, how='outer')
+    df[['entradas', 'saidas', 'd_ent', 'd_sai']] = df[['entradas', 'saidas', 'd_ent', 'd_sai']].fillna(0).astype(np.int64)
+    df['entradas'] += df.pop('d_ent')
+    df['saidas'] += df.pop('d_sai')
+    if (df['entradas'] < 0).any() or (df['saidas'] < 0).any():
+        raise ValueError("Estado salvo não corresponde ao painel: fluxos negativos após o delta.")
+
+    # Mesmo formato da execução completa: só células com algum fluxo
+    df = df[(df['entradas'] != 0) | (df['saidas'] != 0)]
+    df = df.sort_values(CHAVES).reset_index(drop=True)
+
+    afetadas = fluxos[['mun', 'setor']].drop_duplicates()
+    mask = (df[['mun', 'setor']].merge(afetadas, on=['mun', 'setor'], how='left', indicator=True)['_merge'] == 'both').to_numpy()
+
+    parte = df.loc[mask]
+    acumulado = parte.groupby(['mun', 'setor'], observed=True)[['entradas', 'saidas']].cumsum()
+    df.loc[mask, 'estoque_mei'] = (acumulado['entradas'] - acumulado['saidas']).to_numpy()
+
+    return esquema_painel.aplicar_esquema(df), len(afetadas)
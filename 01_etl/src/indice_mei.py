@@ -0,0 +1,73 @@
+"""
+Índice ordenado dos optantes MEI (cnpj_basico -> ano/mês de início e fim).
+
+Substitui o merge com o Simples em cada chunk: o índice é construído uma vez,
+salvo em .npy e carregado via memory-map por execuções futuras e pelos workers.
+A consulta é uma busca binária (np.searchsorted) sobre o array de CNPJs.
+"""
+import json
+import os
+
+import numpy as np
+
+DIR_INDICE = "../data/interim/indice_mei"
+ARRAYS = ("cnpj_basico", "ano_ini", "ano_fim", "mes_ini", "mes_fim")
+
+def construir_indice(df_simples):
+    """Gera os arrays alinhados e ordenados por cnpj_basico a partir do Simples filtrado."""
+    cnpj = df_simples["cnpj_basico"].to_numpy(dtype=np.int32)
+    ordem = np.argsort(cnpj, kind="stable")
+    cnpj = cnpj[ordem]
+
+    # Um CNPJ básico por registro: mantém a primeira ocorrência se houver repetição
+    unicos = np.ones(len(cnpj), dtype=bool)
+    unicos[1:] = cnpj[1:] != cnpj[:-1]
+    ordem = ordem[unicos]
+
+    return {
+        "cnpj_basico": cnpj[unicos],
+        "ano_ini": df_simples["ano_ini"].to_numpy()[ordem].astype(np.int16),
+        "ano_fim": df_simples["ano_fim"].to_numpy()[ordem].astype(np.int16),
+        # Mês (1-12; 0 sem data) para o painel mensal: 1 byte por MEI
+        "mes_ini": df_simples["mes_ini"].to_numpy()[ordem].astype(np.int8),
+        "mes_fim": df_simples["mes_fim"].to_numpy()[ordem].astype(np.int8),
+    }
+
+def _assinatura_fonte(caminho_fonte):
+    st = os.stat(caminho_fonte)
+    return {"fonte": os.path.abspath(caminho_fonte), "tamanho": st.st_size, "mtime": st.st_mtime}
+
+def salvar_indice(indice, caminho_fonte, diretorio=DIR_INDICE):
+    """Grava cada array em .npy junto com a assinatura do arquivo do Simples de origem."""
+    os.makedirs(diretorio, exist_ok=True)
+    for nome in ARRAYS:
+        np.save(os.path.join(diretorio, f"{nome}.npy"), indice[nome])
+    with open(os.path.join(diretorio, "fonte.json"), "w", encoding="utf-8") as f:
+        json.dump(_assinatura_fonte(caminho_fonte), f)
+
+def indice_valido(caminho_fonte, diretorio=DIR_INDICE):
+    """True se o índice salvo corresponde ao arquivo do Simples atual."""
+    meta = os.path.join(diretorio, "fonte.json")
+    if not os.path.exists(meta) or not all(os.path.exists(os.path.join(diretorio, f"{n}.npy")) for n in ARRAYS):
+        return False
+    with open(meta, encoding="utf-8") as f:
+        return json.load(f) == _assinatura_fonte(caminho_fonte)
+
+def carregar_indice(diretorio=DIR_INDICE, mmap=True):
+    """Abre o índice salvo; com mmap=True os arrays são compartilhados via page cache entre processos."""
+    modo = "r" if mmap else None
+    return {nome: np.load(os.path.join(diretorio, f"{nome}.npy"), mmap_mode=modo) for nome in ARRAYS}
+
+def consultar(indice, cnpj_basico):
+    """
+    Localiza cada cnpj_basico no índice.
+    Retorna (posicoes, encontrados): posicoes[encontrados] indexa os arrays do índice.
+    """
+    chaves = indice["cnpj_basico"]
+    cnpj_basico = np.asarray(cnpj_basico, dtype=chaves.dtype)
+    if len(chaves) == 0:
+        return np.zeros(len(cnpj_basico), dtype=np.intp), np.zeros(len(cnpj_basico), dtype=bool)
+    pos = np.searchsorted(chaves, cnpj_basico)
+    pos_valida = np.minimum(pos, len(chaves) - 1)
+    encontrados = (pos < len(chaves)) & (chaves[pos_valida] == cnpj_basico)
+    return pos_valida, encontrados
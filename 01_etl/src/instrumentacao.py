@@ -0,0 +1,231 @@
+"""
+Instrumentação leve das etapas do ETL: cronômetros, contadores de linhas e RSS.
+
+Cada medição vira uma linha JSON (etapa, evento, segundos, linhas, RSS...) em
+../data/logs/metricas.jsonl, que o pipeline e o bench podem ler depois.
+Variáveis de ambiente:
+  ETL_METRICAS=<arquivo>        outro destino (ETL_METRICAS=0 desliga a gravação);
+  ETL_PERFIL=cprofile|tracemalloc perfila só a primeira passagem de cada bloco
+                                marcado com perfilar_uma_vez (ex.: o 1º chunk do 05);
+  ETL_AMOSTRAR_RSS=<segundos>   registra o RSS do processo periodicamente.
+
+Uso típico num script:
+    instrumentacao.iniciar("06_transform_cnpj_2")
+    with instrumentacao.cronometro("balanceamento") as m:
+        df = balancear(df)
+        m["linhas"] = len(df)
+"""
+import atexit
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+ARQUIVO_METRICAS = "../data/logs/metricas.jsonl"
+DIR_PERFIS = "../data/logs/perfis"
+TOP_PERFIL = 15
+
+_estado = {"etapa": None, "execucao": None, "inicio": None}
+_contadores = defaultdict(int)
+_perfilados = set()
+_trava = threading.Lock()
+
+def _etapa():
+    # Workers (spawn) não passam por iniciar(): usam o nome do script
+    return _estado["etapa"] or os.path.splitext(os.path.basename(sys.argv[0]))[0]
+
+def _arquivo():
+    destino = os.environ.get("ETL_METRICAS", ARQUIVO_METRICAS)
+    return None if destino in ("", "0") else destino
+
+def _status_mb(campo):
+    """VmRSS/VmHWM de /proc/self/status em MB (None fora do Linux)."""
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith(campo + ":"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def rss_mb():
+    """RSS atual do processo em MB."""
+    atual = _status_mb("VmRSS")
+    return atual if atual is not None else pico_rss_mb()
+
+def pico_rss_mb():
+    """Pico de RSS do processo em MB."""
+    pico = _status_mb("VmHWM")
+    if pico is not None:
+        return pico
+    try:
+        import resource  # Só Unix
+    except ImportError:
+        return 0.0  # Windows: sem /proc nem resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024)
+
+def registrar(evento, **campos):
+    """Grava um evento como uma linha JSON (append; linhas curtas não se misturam entre workers)."""
+    destino = _arquivo()
+    if destino is None:
+        return
+    registro = {
+        "ts": round(time.time(), 3),
+        "etapa": _etapa(),
+        "execucao": _estado["execucao"],
+        "pid": os.getpid(),
+        "evento": evento,
+        "rss_mb": round(rss_mb(), 1),
+        **campos,
+    }
+    linha = json.dumps(registro, ensure_ascii=False, default=str) + "\n"
+    with _trava:
+        os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+        with open(destino, "a", encoding="utf-8") as f:
+            f.write(linha)
+
+@contextmanager
+def cronometro(nome, **campos):
+    """
+    Mede um bloco e registra `nome` com segundos e variação de RSS.
+    O dicionário devolvido aceita campos extras (ex.: m["linhas"] = len(df)).
+    """
+    info = dict(campos)
+    rss_antes = rss_mb()
+    inicio = time.perf_counter()
+    try:
+        yield info
+    finally:
+        registrar(nome, segundos=round(time.perf_counter() - inicio, 4),
+                  rss_delta_mb=round(rss_mb() - rss_antes, 1), **info)
+
+def cronometrado(nome=None):
+    """Decorator: cada chamada da função vira um evento de cronometro."""
+    def decorar(func):
+        @functools.wraps(func)
+        def envolvida(*args, **kwargs):
+            with cronometro(nome or func.__name__):
+                return func(*args, **kwargs)
+        return envolvida
+    return decorar
+
+def contar(nome, n):
+    """Soma n ao contador `nome` (total sai no evento 'fim' da etapa)."""
+    _contadores[nome] += int(n)
+
+def retirar_contadores():
+    """
+    Devolve e zera os contadores deste processo. Workers de um ProcessPoolExecutor não
+    emitem 'fim': devolvem isto junto com o resultado e o pai soma com somar_contadores.
+    """
+    contadores = dict(_contadores)
+    _contadores.clear()
+    return contadores
+
+def somar_contadores(contadores):
+    for nome, n in contadores.items():
+        contar(nome, n)
+
+class Fases:
+    """
+    Soma o tempo de fases que se repetem num laço (leitura, merge, groupby... de cada chunk)
+    para registrar a divisão do tempo num único evento.
+    """
+
+    def __init__(self):
+        self.segundos = defaultdict(float)
+
+    @contextmanager
+    def __call__(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.segundos[nome] += time.perf_counter() - inicio
+
+    def iterar(self, nome, iteravel):
+        """Itera contando o tempo gasto em cada next() (ex.: parsing do CSV do read_csv em chunks)."""
+        iterador = iter(iteravel)
+        while True:
+            with self(nome):
+                try:
+                    item = next(iterador)
+                except StopIteration:
+                    return
+            yield item
+
+    def resumo(self):
+        return {nome: round(s, 4) for nome, s in self.segundos.items()}
+
+@contextmanager
+def perfilar_uma_vez(nome):
+    """
+    Com ETL_PERFIL=cprofile|tracemalloc, perfila só a primeira passagem por `nome`
+    neste processo: grava o .prof em data/logs/perfis e as funções/linhas mais caras nas métricas.
+    """
+    modo = os.environ.get("ETL_PERFIL", "").lower()
+    if modo not in ("cprofile", "tracemalloc") or nome in _perfilados:
+        yield
+        return
+    _perfilados.add(nome)
+
+    if modo == "cprofile":
+        perfil = cProfile.Profile()
+        perfil.enable()
+        try:
+            yield
+        finally:
+            perfil.disable()
+            os.makedirs(DIR_PERFIS, exist_ok=True)
+            arquivo = os.path.join(DIR_PERFIS, f"{_etapa()}_{nome}_{os.getpid()}.prof")
+            perfil.dump_stats(arquivo)
+            texto = io.StringIO()
+            pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(TOP_PERFIL)
+            registrar("perfil", bloco=nome, modo=modo, arquivo=arquivo, top=texto.getvalue().strip().splitlines())
+        return
+
+    ja_rastreando = tracemalloc.is_tracing()
+    if not ja_rastreando:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        foto = tracemalloc.take_snapshot()
+        _, pico = tracemalloc.get_traced_memory()
+        if not ja_rastreando:
+            tracemalloc.stop()
+        top = [str(s) for s in foto.statistics("lineno")[:TOP_PERFIL]]
+        registrar("perfil", bloco=nome, modo=modo, pico_alocado_mb=round(pico / 1024 ** 2, 1), top=top)
+
+def _amostrar_rss(intervalo):
+    while True:
+        time.sleep(intervalo)
+        registrar("rss")
+
+def finalizar():
+    """Registra o evento 'fim' da etapa: tempo total, pico de RSS e contadores."""
+    if _estado["inicio"] is None:
+        return
+    registrar("fim", segundos=round(time.perf_counter() - _estado["inicio"], 3),
+              pico_rss_mb=round(pico_rss_mb(), 1), contadores=dict(_contadores))
+    _estado["inicio"] = None
+
+def iniciar(etapa):
+    """Marca o início da etapa (o evento 'fim' sai sozinho quando o processo termina)."""
+    _estado.update(etapa=etapa, execucao=f"{etapa}-{os.getpid()}-{int(time.time())}", inicio=time.perf_counter())
+    _contadores.clear()
+    registrar("inicio", argv=sys.argv[1:])
+    intervalo = float(os.environ.get("ETL_AMOSTRAR_RSS", 0) or 0)
+    if intervalo > 0:
+        threading.Thread(target=_amostrar_rss, args=(intervalo,), daemon=True).start()
+    atexit.register(finalizar)
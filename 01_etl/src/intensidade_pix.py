@@ -0,0 +1,73 @@
+"""
+Intensidade de uso do Pix por município com reduções por segmento em arrays.
+
+As linhas são ordenadas uma vez por (município, AnoMes) com np.lexsort; cada
+município vira um segmento contíguo e a posição dentro dele (o cumcount) sai de
+aritmética com os inícios dos segmentos. A janela é uma máscara booleana sobre
+essas posições e as médias de todas as métricas saem de np.bincount, sem
+groupby.transform com lambda nem broadcast de volta para as linhas.
+
+Janelas:
+  primeiros  - os N primeiros meses observados do município (definição original);
+  movel      - os N últimos meses observados até `fim` (inclusive);
+  calendario - todos os meses entre `inicio` e `fim` (AnoMes, inclusive).
+"""
+import numpy as np
+import pandas as pd
+
+JANELAS = ("primeiros", "movel", "calendario")
+METRICA_PADRAO = "QT_PagadorPF"
+
+def segmentos(mun, mes):
+    """
+    Ordena por (município, mês) e devolve (ordem, inicios, seg, pos):
+    índices das linhas ordenadas, início de cada segmento, segmento e posição de cada linha.
+    """
+    ordem = np.lexsort((mes, mun))
+    mun_ord = mun[ordem]
+    novo = np.ones(len(mun_ord), dtype=bool)
+    novo[1:] = mun_ord[1:] != mun_ord[:-1]
+    inicios = np.flatnonzero(novo)
+    seg = np.cumsum(novo) - 1
+    pos = np.arange(len(mun_ord)) - inicios[seg]
+    return ordem, inicios, seg, pos
+
+def mascara_janela(mes_ord, seg, pos, n_seg, janela="primeiros", n=6, inicio=None, fim=None):
+    """Máscara (nas linhas ordenadas) dos meses que entram na média de cada município."""
+    if janela == "primeiros":
+        return pos < n
+    if janela == "calendario":
+        if inicio is None or fim is None:
+            raise ValueError("janela 'calendario' precisa de inicio e fim (AnoMes)")
+        return (mes_ord >= inicio) & (mes_ord <= fim)
+    if janela == "movel":
+        if fim is None:
+            raise ValueError("janela 'movel' precisa de fim (AnoMes)")
+        # Meses até `fim` formam o começo de cada segmento (ordem por mês): os N últimos deles
+        elegivel = mes_ord <= fim
+        n_elegiveis = np.bincount(seg, weights=elegivel, minlength=n_seg).astype(np.int64)
+        return elegivel & (pos >= n_elegiveis[seg] - n)
+    raise ValueError(f"janela desconhecida: {janela!r} (opções: {', '.join(JANELAS)})")
+
+def calcular_intensidades(df, metricas=(METRICA_PADRAO,), janela="primeiros", n=6, inicio=None, fim=None,
+                          col_mun="Municipio_Ibge", col_mes="AnoMes"):
+    """
+    Cross-section com uma linha por município: média de cada métrica na janela.
+    Meses com a métrica ausente não contam; município sem mês válido fica com NaN.
+    Retorna DataFrame (col_mun, *metricas), ordenado por município.
+    """
+    mun = df[col_mun].to_numpy()
+    mes = df[col_mes].to_numpy()
+    ordem, inicios, seg, pos = segmentos(mun, mes)
+    n_seg = len(inicios)
+    mascara = mascara_janela(mes[ordem], seg, pos, n_seg, janela, n, inicio, fim)
+
+    saida = {col_mun: mun[ordem][inicios]}
+    for metrica in metricas:
+        valores = pd.to_numeric(df[metrica], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)[ordem]
+        ok = mascara & ~np.isnan(valores)
+        soma = np.bincount(seg, weights=np.where(ok, valores, 0.0), minlength=n_seg)
+        contagem = np.bincount(seg, weights=ok, minlength=n_seg)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            saida[metrica] = np.where(contagem > 0, soma / contagem, np.nan)
+    return pd.DataFrame(saida)
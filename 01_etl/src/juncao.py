@@ -0,0 +1,59 @@
+"""
+Junções dos painéis por chaves inteiras ordenadas (merge join em NumPy).
+
+Cada fonte tem o município normalizado para int32 uma única vez (nada de zfill
+em string) e a chave (município, setor, ano) vira um int64 empacotado, na mesma
+ordem lexicográfica dos painéis balanceados, que já saem ordenados. A junção é
+um searchsorted de chaves ordenadas contra chaves ordenadas: devolve os índices
+das linhas que casam, e todas as colunas são levadas com um único take cada,
+sem refazer um hash join por coluna.
+"""
+import numpy as np
+
+from agregacao_streaming import empacotar
+from esquema_painel import normalizar_id
+
+def chave_municipio(series):
+    """Código do município em qualquer formato (int, str com zeros, float) -> array int32."""
+    return normalizar_id(series).to_numpy()
+
+def traduzir_codigos(codigos, origem, destino):
+    """
+    Troca códigos via tabela de correspondência (ex.: município RFB -> IBGE).
+    Códigos sem correspondência viram 0 (ficam fora de qualquer junção).
+    """
+    origem = np.asarray(origem, dtype=np.int64)
+    ordem = np.argsort(origem, kind="stable")
+    origem, destino = origem[ordem], np.asarray(destino, dtype=np.int32)[ordem]
+    codigos = np.asarray(codigos, dtype=np.int64)
+    if len(origem) == 0:
+        return np.zeros(len(codigos), dtype=np.int32)
+    pos = np.minimum(np.searchsorted(origem, codigos), len(origem) - 1)
+    return np.where(origem[pos] == codigos, destino[pos], 0).astype(np.int32)
+
+def chave_painel(mun, setor, ano):
+    """(município, código do setor, ano) -> chave int64 com a ordem de (mun, setor, ano)."""
+    return empacotar(np.asarray(mun), np.asarray(setor), np.asarray(ano))
+
+def ordem_das_chaves(chaves):
+    """Permutação que ordena as chaves, ou None se já estiverem em ordem (caso comum dos painéis)."""
+    chaves = np.asarray(chaves)
+    if len(chaves) < 2 or (chaves[1:] >= chaves[:-1]).all():
+        return None
+    return np.argsort(chaves, kind="stable")
+
+def juntar_ordenado(chaves_esq, chaves_dir):
+    """
+    Inner join de chaves ordenadas; à direita as chaves precisam ser únicas.
+    Retorna (idx_esq, idx_dir): pares de linhas que casam, na ordem da esquerda.
+    """
+    chaves_esq = np.asarray(chaves_esq)
+    chaves_dir = np.asarray(chaves_dir)
+    if len(chaves_dir) > 1 and (chaves_dir[1:] == chaves_dir[:-1]).any():
+        raise ValueError("chaves duplicadas no lado direito da junção")
+    if len(chaves_dir) == 0:
+        vazio = np.empty(0, dtype=np.intp)
+        return vazio, vazio
+    pos = np.minimum(np.searchsorted(chaves_dir, chaves_esq), len(chaves_dir) - 1)
+    casou = chaves_dir[pos] == chaves_esq
+    return np.flatnonzero(casou), pos[casou]
@@ -0,0 +1,211 @@
+"""
+Pareamento 1:1 por distância de Mahalanobis com blocos exatos (ex.: cod_regiao).
+
+Equivale ao MatchIt::matchit(method = "nearest", distance = "mahalanobis",
+exact = ~ bloco, replace = FALSE, caliper = c) do 10_marching_mdm.R:
+  - as covariáveis são branqueadas uma vez com o fator de Cholesky da covariância
+    agrupada dentro dos grupos (L L' = S; z = L^-1 x), e a distância de Mahalanobis
+    vira distância euclidiana em z;
+  - dentro de cada bloco, a matriz tratados x controles sai de uma conta vetorizada
+    (|a|² + |b|² - 2 a·b);
+  - o caliper segue Rosenbaum & Rubin (1985): pares só dentro de `caliper` desvios-padrão
+    do logit do escore de propensão (logit por IRLS nas mesmas covariáveis); entre os
+    candidatos dentro do caliper, vale a menor distância de Mahalanobis;
+  - pareamento guloso sem reposição na ordem dos dados (padrão do MatchIt),
+    pelos pares mais próximos primeiro, ou ótimo (linear_sum_assignment) por bloco.
+"""
+import numpy as np
+import pandas as pd
+from scipy.linalg import solve_triangular
+from scipy.optimize import linear_sum_assignment
+
+COVARIAVEIS = ['idhm_e', 'densidade_tel', 'log_populacao', 'log_pib_per_capita', 'taxa_homicidio']
+METODOS = ("guloso", "mais_proximo", "otimo")
+SEM_PAR = -1
+
+def adicionar_logs(df):
+    """Cria log_populacao e log_pib_per_capita (usadas no modelo do R) se ainda não existirem."""
+    for coluna in ('populacao', 'pib_per_capita'):
+        nome = f'log_{coluna}'
+        if nome not in df.columns and coluna in df.columns:
+            valores = pd.to_numeric(df[coluna], errors='coerce')
+            # Zero vem do fillna(0) do 09: sem log definido, o município sai do pareamento
+            df[nome] = np.log(valores.where(valores > 0))
+    return df
+
+def _covariavel_degenerada(S, nomes):
+    """Por que S é singular (covariável constante nos grupos ou combinação linear das anteriores), ou None."""
+    var = np.diag(S)
+    for k in range(len(var)):
+        if var[k] <= 1e-12 * var.max():
+            return f"{nomes[k]} é constante dentro dos grupos"
+        # Posto da correlação (escala não importa) das k+1 primeiras
+        dp = np.sqrt(var[:k + 1])
+        if np.linalg.matrix_rank(S[:k + 1, :k + 1] / np.outer(dp, dp)) <= k:
+            return f"{nomes[k]} é combinação linear de {', '.join(nomes[:k])}"
+    return None
+
+def branquear(X, tratado, nomes=None):
+    """
+    Covariáveis -> coordenadas em que a distância euclidiana é a de Mahalanobis.
+    Usa a covariância agrupada de tratados e controles (a mesma do MatchIt).
+    Covariância singular (ex.: covariável constante na amostra) -> ValueError com o nome dela.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    centrado = np.empty_like(X)
+    for grupo in (True, False):
+        sel = tratado == grupo
+        centrado[sel] = X[sel] - X[sel].mean(axis=0)
+    S = centrado.T @ centrado / max(len(X) - 2, 1)
+    # Checado antes do Cholesky: com colinearidade exata o arredondamento pode deixá-lo passar
+    nomes = list(nomes) if nomes is not None else [f"coluna {i}" for i in range(X.shape[1])]
+    problema = _covariavel_degenerada(S, nomes)
+    if problema:
+        raise ValueError(f"Covariância singular na amostra de pareamento ({len(X)} unidades): "
+                         f"{problema}; retire-a das covariáveis.")
+    L = np.linalg.cholesky(S)
+    return solve_triangular(L, (X - X.mean(axis=0)).T, lower=True).T
+
+def logit_escore(X, tratado, iteracoes=25, tol=1e-10):
+    """Preditor linear de uma regressão logística (IRLS) de tratado nas covariáveis."""
+    A = np.column_stack([np.ones(len(X)), X])
+    y = np.asarray(tratado, dtype=np.float64)
+    beta = np.zeros(A.shape[1])
+    for _ in range(iteracoes):
+        eta = A @ beta
+        p = 1 / (1 + np.exp(-eta))
+        w = np.maximum(p * (1 - p), 1e-10)
+        passo = np.linalg.lstsq(A * np.sqrt(w)[:, None], (y - p) / np.sqrt(w), rcond=None)[0]
+        beta += passo
+        if np.abs(passo).max() < tol:
+            break
+    return A @ beta
+
+def distancias(Za, Zb):
+    """Matriz de distâncias euclidianas entre as linhas de Za e de Zb."""
+    quadrado = (Za ** 2).sum(axis=1)[:, None] + (Zb ** 2).sum(axis=1)[None, :] - 2 * Za @ Zb.T
+    return np.sqrt(np.maximum(quadrado, 0))
+
+def _blocos(tratado, bloco):
+    for b in np.unique(bloco):
+        t = np.flatnonzero(tratado & (bloco == b))
+        c = np.flatnonzero(~tratado & (bloco == b))
+        if len(t) and len(c):
+            yield t, c
+
+# Nos algoritmos, D já vem com inf nos pares fora do caliper
+
+def _guloso(D):
+    """Cada tratado (na ordem dos dados) leva o controle livre mais próximo dentro do caliper."""
+    D = D.copy()
+    pares = np.full(D.shape[0], SEM_PAR)
+    for i in range(D.shape[0]):
+        j = int(np.argmin(D[i]))
+        if np.isfinite(D[i, j]):
+            pares[i] = j
+            D[:, j] = np.inf
+    return pares
+
+def _mais_proximo(D):
+    """Pares aceitos em ordem crescente de distância, sem repetir tratado nem controle."""
+    pares = np.full(D.shape[0], SEM_PAR)
+    i_ord, j_ord = np.unravel_index(np.argsort(D, axis=None, kind="stable"), D.shape)
+    ok = np.isfinite(D[i_ord, j_ord])
+    usado_c = np.zeros(D.shape[1], dtype=bool)
+    faltam = min(D.shape)
+    for i, j in zip(i_ord[ok], j_ord[ok]):
+        if pares[i] == SEM_PAR and not usado_c[j]:
+            pares[i] = j
+            usado_c[j] = True
+            faltam -= 1
+            if not faltam:
+                break
+    return pares
+
+def _otimo(D):
+    """Soma mínima das distâncias; pares fora do caliper custam caro e são descartados no fim."""
+    finitos = np.isfinite(D)
+    custo = np.where(finitos, D, D[finitos].max(initial=0) * D.size + 1)
+    linhas, colunas = linear_sum_assignment(custo)
+    pares = np.full(D.shape[0], SEM_PAR)
+    dentro = finitos[linhas, colunas]
+    pares[linhas[dentro]] = colunas[dentro]
+    return pares
+
+def parear(Z, tratado, bloco, caliper=None, metodo="guloso", escore=None):
+    """
+    Pareamento 1:1 sem reposição dentro de cada bloco; com caliper, só pares cujo `escore`
+    (logit do escore de propensão) difere em até caliper x DP(escore).
+    Retorna array (len(Z)) com o índice do par de cada unidade pareada (-1 se ficou sem par).
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"metodo desconhecido: {metodo!r} (opções: {', '.join(METODOS)})")
+    tratado = np.asarray(tratado, dtype=bool)
+    bloco = np.asarray(bloco)
+    if caliper is not None and escore is None:
+        raise ValueError("caliper precisa do escore (logit_escore)")
+    limite = caliper * np.std(escore, ddof=1) if caliper is not None else None
+
+    algoritmo = {"guloso": _guloso, "mais_proximo": _mais_proximo, "otimo": _otimo}[metodo]
+    par = np.full(len(Z), SEM_PAR)
+    for t, c in _blocos(tratado, bloco):
+        D = distancias(Z[t], Z[c])
+        if limite is not None:
+            D[np.abs(escore[t][:, None] - escore[c][None, :]) > limite] = np.inf
+        escolhidos = algoritmo(D)
+        ok = escolhidos != SEM_PAR
+        par[t[ok]] = c[escolhidos[ok]]
+        par[c[escolhidos[ok]]] = t[ok]
+    return par
+
+def amostra_pareamento(df, col_tratamento, covariaveis=COVARIAVEIS, excluir=None):
+    """Máscara das unidades elegíveis: grupo 0/1 definido, covariáveis finitas e fora de `excluir`."""
+    grupo = df[col_tratamento].to_numpy(dtype=np.float64, na_value=np.nan)
+    X = df[list(covariaveis)].to_numpy(dtype=np.float64, na_value=np.nan)
+    elegivel = np.isin(grupo, (0, 1)) & np.isfinite(X).all(axis=1)
+    if excluir is not None:
+        elegivel &= ~np.asarray(excluir, dtype=bool)
+    return elegivel
+
+def parear_df(df, col_tratamento, covariaveis=COVARIAVEIS, col_bloco='cod_regiao', caliper=0.25,
+              metodo="guloso", excluir=None):
+    """
+    Pareia o DataFrame (uma linha por município) e devolve a flag keep (int8: 1 = amostra pareada).
+    `excluir` marca unidades fora do pareamento (ex.: controles no buffer espacial).
+    """
+    elegivel = amostra_pareamento(df, col_tratamento, covariaveis, excluir)
+    keep = np.zeros(len(df), dtype=np.int8)
+    if not elegivel.any():
+        return keep
+    idx = np.flatnonzero(elegivel)
+    tratado = df[col_tratamento].to_numpy(dtype=np.float64, na_value=np.nan)[idx] == 1
+    if tratado.all() or not tratado.any():
+        return keep
+    X = df[list(covariaveis)].to_numpy(dtype=np.float64)[idx]
+    Z = branquear(X, tratado, covariaveis)
+    escore = logit_escore(X, tratado) if caliper is not None else None
+    bloco = df[col_bloco].to_numpy()[idx] if col_bloco else np.zeros(len(idx))
+    par = parear(Z, tratado, bloco, caliper, metodo, escore)
+    keep[idx[par != SEM_PAR]] = 1
+    return keep
+
+def balanco(df, col_tratamento, covariaveis=COVARIAVEIS, keep=None):
+    """
+    Diferença de médias padronizada (DP dos tratados, como o summary do MatchIt para ATT)
+    por covariável; com `keep`, calculada só na amostra pareada.
+    """
+    grupo = df[col_tratamento].to_numpy(dtype=np.float64, na_value=np.nan)
+    sel = np.isin(grupo, (0, 1)) if keep is None else np.asarray(keep, dtype=bool)
+    linhas = []
+    for cov in covariaveis:
+        x = df[cov].to_numpy(dtype=np.float64, na_value=np.nan)
+        xt = x[sel & (grupo == 1)]
+        xc = x[sel & (grupo == 0)]
+        dp = np.nanstd(xt, ddof=1) if len(xt) > 1 else np.nan
+        linhas.append({
+            'covariavel': cov,
+            'media_tratados': np.nanmean(xt) if len(xt) else np.nan,
+            'media_controles': np.nanmean(xc) if len(xc) else np.nan,
+            'dif_padronizada': (np.nanmean(xt) - np.nanmean(xc)) / dp if len(xc) and dp > 0 else np.nan,
+        })
+    return pd.DataFrame(linhas)
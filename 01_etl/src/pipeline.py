@@ -0,0 +1,313 @@
+"""
+Orquestrador do ETL: roda as etapas numeradas só quando algo mudou.
+
+Cada etapa declara entradas e saídas. A assinatura de uma etapa é o hash do
+script + módulos locais que ele importa (direta ou indiretamente) + argumentos +
+conteúdo das entradas. Se a assinatura bater com a da
+última execução bem-sucedida e as saídas existirem, a etapa fica em cache.
+Etapas independentes (RAIS, CNPJ, PIX, covariáveis) rodam em processos
+paralelos assim que suas dependências terminam.
+
+Uso (a partir de 01_etl/src): python pipeline.py [etapas...] [--workers 4] [--forcar] [--sem-rede]
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DIR_SRC = os.path.dirname(os.path.abspath(__file__))
+DIR_DATA = "../data"
+ARQUIVO_ESTADO = os.path.join(DIR_DATA, ".pipeline_estado.json")
+ARQUIVO_RELATORIO = os.path.join(DIR_DATA, "logs", "pipeline_relatorio.json")
+DIR_LOGS = os.path.join(DIR_DATA, "logs")
+
+# Etapa -> entradas, saídas (caminhos relativos a src/, como nos scripts), args e se depende de rede.
+# args_offline: como rodar a extração com --sem-rede (servindo do cache_sql) quando a saída falta.
+ETAPAS = {
+    "01_extract_rais": {
+        "entradas": [],
+        "saidas": ["../data/raw/rais_agregada_municipio_setor"],
+        "rede": True,
+    },
+    "02_extract_pix": {
+        "entradas": [],
+        "saidas": ["../data/raw/dados_pix"],
+        "rede": True,
+    },
+    "03_extract_populacao": {
+        "entradas": ["../queries/populacao.sql"],
+        "saidas": ["../data/processed/populacao_agregada.parquet"],
+        "rede": True,
+        "args_offline": ["--offline"],
+    },
+    "04_transform_rais": {
+        "entradas": ["../data/raw/rais_agregada_municipio_setor"],
+        "saidas": ["../data/processed/rais_painel_balanceado.parquet"],
+    },
+    "05_transform_cnpj": {
+        "entradas": ["../data/raw/CNPJ"],
+        "saidas": ["../data/processed/painel_mei_rf_anual.parquet"],
+    },
+    "06_transform_cnpj_2": {
+        "entradas": ["../data/processed/painel_mei_rf_anual.parquet"],
+        "saidas": ["../data/processed/painel_mei_balanceado_2016_2024.parquet"],
+    },
+    "07_transform_pix": {
+        "entradas": ["../data/raw/dados_pix", "../data/processed/populacao_agregada.parquet"],
+        "saidas": ["../data/processed/intensidade_pix_municipios.parquet"],
+    },
+    "08_covariaveis": {
+        "entradas": [],
+        "saidas": ["../data/processed/dataset_municipios_2019.parquet"],
+        "rede": True,
+        "args_offline": ["--offline"],
+    },
+    "09_create_masterfile_mdm": {
+        "entradas": [
+            "../data/processed/intensidade_pix_municipios.parquet",
+            "../data/processed/dataset_municipios_2019.parquet",
+            "../data/processed/homicidios_ipeadata.csv",
+        ],
+        "saidas": ["../data/processed/dataset_final_matching.parquet"],
+    },
+    "11_buffer_espacial": {
+        "entradas": ["../data/processed/dataset_final_matching.parquet"],
+        "saidas": ["../data/processed/buffer_espacial.parquet"],
+    },
+    "12_pareamento_mdm": {
+        "entradas": [
+            "../data/processed/dataset_final_matching.parquet",
+            "../data/processed/buffer_espacial.parquet",
+        ],
+        "saidas": ["../data/processed/dataset_final_com_flags.parquet"],
+    },
+    "13_grade_robustez": {
+        "entradas": ["../data/processed/dataset_final_matching.parquet"],
+        "saidas": ["../data/processed/grade_robustez.parquet"],
+    },
+    "14_extract_municipios_rfb": {
+        "entradas": [],
+        "saidas": ["../data/raw/municipios_rfb_ibge.parquet"],
+        "rede": True,
+        "args_offline": ["--offline"],
+    },
+    "15_build_masterfile_did": {
+        "entradas": [
+            "../data/processed/painel_mei_balanceado_2016_2024.parquet",
+            "../data/raw/municipios_rfb_ibge.parquet",
+            "../data/processed/rais_painel_balanceado.parquet",
+            "../data/processed/dataset_final_com_flags.parquet",
+        ],
+        "saidas": ["../data/processed/painel_did"],
+    },
+    "16_export_arrow": {
+        "entradas": [
+            "../data/processed/dataset_final_matching.parquet",
+            "../data/processed/dataset_final_com_flags.parquet",
+            "../data/processed/painel_did",
+            "../data/processed/painel_mei_balanceado_2016_2024.parquet",
+            "../data/processed/rais_painel_balanceado.parquet",
+        ],
+        "saidas": ["../data/processed/arrow"],
+    },
+}
+
+def dependencias(etapas=ETAPAS):
+    """Etapa -> etapas que produzem alguma de suas entradas."""
+    produtor = {saida: nome for nome, e in etapas.items() for saida in e["saidas"]}
+    return {
+        nome: sorted({produtor[ent] for ent in e["entradas"] if ent in produtor and produtor[ent] != nome})
+        for nome, e in etapas.items()
+    }
+
+def _arquivos(caminho):
+    """Arquivos de um caminho (recursivo para diretórios), ignorando ocultos e temporários."""
+    if os.path.isfile(caminho):
+        return [caminho]
+    encontrados = []
+    for raiz, dirs, arquivos in os.walk(caminho):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        encontrados += [os.path.join(raiz, a) for a in sorted(arquivos) if not a.startswith((".", "_"))]
+    return encontrados
+
+def hash_arquivo(caminho, cache_hashes):
+    """Hash do conteúdo, reaproveitado enquanto tamanho e mtime não mudarem (arquivos de GBs da RFB)."""
+    st = os.stat(caminho)
+    chave = os.path.abspath(caminho)
+    anterior = cache_hashes.get(chave)
+    if anterior and anterior["tamanho"] == st.st_size and anterior["mtime"] == st.st_mtime:
+        return anterior["hash"]
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(8 * 1024 ** 2), b""):
+            h.update(bloco)
+    cache_hashes[chave] = {"tamanho": st.st_size, "mtime": st.st_mtime, "hash": h.hexdigest()}
+    return h.hexdigest()
+
+def modulos_locais(script):
+    """Arquivos .py de src/ que o script importa, inclusive os importados por eles (em ordem de nome)."""
+    vistos, pendentes = set(), [script]
+    while pendentes:
+        with open(pendentes.pop(), encoding="utf-8") as f:
+            arvore = ast.parse(f.read())
+        for no in ast.walk(arvore):
+            if isinstance(no, ast.Import):
+                nomes = [a.name for a in no.names]
+            elif isinstance(no, ast.ImportFrom) and no.module and not no.level:
+                nomes = [no.module]
+            else:
+                continue
+            for nome in nomes:
+                caminho = os.path.join(DIR_SRC, nome.split(".")[0] + ".py")
+                if caminho not in vistos and caminho != script and os.path.exists(caminho):
+                    vistos.add(caminho)
+                    pendentes.append(caminho)
+    return sorted(vistos)
+
+def assinatura(nome, etapa, cache_hashes):
+    """Hash de script + módulos locais + args + conteúdo das entradas. None se faltar alguma entrada."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps(etapa.get("args", [])).encode())
+    script = os.path.join(DIR_SRC, f"{nome}.py")
+    for caminho in [script] + (modulos_locais(script) if os.path.exists(script) else []) + etapa["entradas"]:
+        if not os.path.exists(caminho):
+            return None
+        for arquivo in _arquivos(caminho):
+            h.update(os.path.relpath(arquivo, caminho).encode())
+            h.update(hash_arquivo(arquivo, cache_hashes).encode())
+    return h.hexdigest()
+
+def _ler_estado():
+    if not os.path.exists(ARQUIVO_ESTADO):
+        return {"etapas": {}, "hashes": {}}
+    with open(ARQUIVO_ESTADO, encoding="utf-8") as f:
+        return json.load(f)
+
+def _gravar_json(obj, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def executar_etapa(nome, etapa):
+    """Roda o script num processo próprio (cwd = src/) com log em data/logs. Retorna (código, segundos)."""
+    os.makedirs(DIR_LOGS, exist_ok=True)
+    inicio = time.perf_counter()
+    with open(os.path.join(DIR_LOGS, f"{nome}.log"), "w", encoding="utf-8") as log:
+        proc = subprocess.run([sys.executable, os.path.join(DIR_SRC, f"{nome}.py"), *etapa.get("args", [])],
+                              stdout=log, stderr=subprocess.STDOUT)
+    return proc.returncode, time.perf_counter() - inicio
+
+def executar_pipeline(selecionadas=None, workers=4, forcar=False, sem_rede=False, etapas=ETAPAS):
+    """
+    Executa as etapas selecionadas (e o que elas precisam) respeitando as dependências.
+    Retorna o relatório {etapa: {status, segundos}}.
+    """
+    deps = dependencias(etapas)
+    alvo = set(selecionadas or etapas)
+    pendentes = list(alvo)
+    while pendentes:
+        for d in deps[pendentes.pop()]:
+            if d not in alvo:
+                alvo.add(d)
+                pendentes.append(d)
+
+    estado = _ler_estado()
+    relatorio = {}
+    concluidas, falhas = set(), set()
+    a_fazer = [n for n in etapas if n in alvo]
+
+    def pronta(nome):
+        return all(d in concluidas for d in deps[nome])
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        rodando = {}
+        while a_fazer or rodando:
+            for nome in [n for n in a_fazer if pronta(n) or any(d in falhas for d in deps[n])]:
+                a_fazer.remove(nome)
+                etapa = etapas[nome]
+                if any(d in falhas for d in deps[nome]):
+                    falhas.add(nome)
+                    relatorio[nome] = {"status": "pulada (dependência falhou)", "segundos": 0.0}
+                    continue
+
+                sig = assinatura(nome, etapa, estado["hashes"])
+                saidas_ok = all(os.path.exists(s) for s in etapa["saidas"])
+                anterior = estado["etapas"].get(nome, {}).get("assinatura")
+                if sem_rede and etapa.get("rede") and (saidas_ok or "args_offline" not in etapa):
+                    # Extrações não rodam offline: valem as saídas que já estão em disco
+                    (concluidas if saidas_ok else falhas).add(nome)
+                    status = "em cache" if saidas_ok else "sem saída e --sem-rede"
+                    relatorio[nome] = {"status": status, "segundos": 0.0}
+                elif sem_rede and etapa.get("rede"):
+                    print(f"▶️  {nome} (offline)")
+                    offline = {**etapa, "args": etapa.get("args", []) + etapa["args_offline"]}
+                    rodando[pool.submit(executar_etapa, nome, offline)] = (nome, sig)
+                elif saidas_ok and not forcar and sig is not None and sig == anterior:
+                    concluidas.add(nome)
+                    relatorio[nome] = {"status": "em cache", "segundos": 0.0}
+                elif sig is None:
+                    falhas.add(nome)
+                    relatorio[nome] = {"status": "entrada ausente", "segundos": 0.0}
+                else:
+                    print(f"▶️  {nome}")
+                    rodando[pool.submit(executar_etapa, nome, etapa)] = (nome, sig)
+
+            if not rodando:
+                continue
+            feitos, _ = wait(rodando, return_when=FIRST_COMPLETED)
+            for futuro in feitos:
+                nome, sig = rodando.pop(futuro)
+                codigo, segundos = futuro.result()
+                if codigo == 0:
+                    concluidas.add(nome)
+                    estado["etapas"][nome] = {"assinatura": sig, "segundos": segundos}
+                    relatorio[nome] = {"status": "executada", "segundos": segundos}
+                    print(f"✅ {nome} ({segundos:.1f} s)")
+                else:
+                    falhas.add(nome)
+                    relatorio[nome] = {"status": f"falhou (código {codigo})", "segundos": segundos}
+                    print(f"❌ {nome} falhou; veja {DIR_LOGS}/{nome}.log")
+                _gravar_json(estado, ARQUIVO_ESTADO)
+
+    _gravar_json(estado, ARQUIVO_ESTADO)
+    return {n: relatorio[n] for n in etapas if n in relatorio}
+
+def imprimir_relatorio(relatorio):
+    print("\n⏱️  Relatório por etapa")
+    for nome, r in relatorio.items():
+        print(f"  {nome:<26} {r['status']:<28} {r['segundos']:8.1f} s")
+    print(f"  {'total (soma)':<26} {'':<28} {sum(r['segundos'] for r in relatorio.values()):8.1f} s")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Executa o ETL com cache por etapa e paralelismo entre ramos.")
+    parser.add_argument("etapas", nargs="*",
+                        help="Etapas alvo (as dependências entram junto). Padrão: todas.")
+    parser.add_argument("--workers", type=int, default=4, help="Etapas simultâneas.")
+    parser.add_argument("--forcar", action="store_true", help="Ignora o cache e roda as etapas alvo.")
+    parser.add_argument("--sem-rede", action="store_true",
+                        help="Não roda extrações (BigQuery/BCB); usa as saídas que já existem.")
+    args = parser.parse_args()
+    desconhecidas = [e for e in args.etapas if e not in ETAPAS]
+    if desconhecidas:
+        parser.error(f"etapas desconhecidas: {', '.join(desconhecidas)} (opções: {', '.join(ETAPAS)})")
+    return args
+
+def main():
+    args = parse_args()
+    inicio = time.perf_counter()
+    relatorio = executar_pipeline(args.etapas or None, args.workers, args.forcar, args.sem_rede)
+    imprimir_relatorio(relatorio)
+    print(f"  {'tempo de parede':<26} {'':<28} {time.perf_counter() - inicio:8.1f} s")
+    _gravar_json(relatorio, ARQUIVO_RELATORIO)
+    if any(r["status"] not in ("executada", "em cache") for r in relatorio.values()):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
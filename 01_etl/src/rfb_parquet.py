@@ -0,0 +1,170 @@
+"""
+Conversão única dos CSVs brutos da RFB (Simples e Estabelecimentos) para Parquet tipado.
+
+Cada arquivo de origem vira um dataset particionado por arquivo e por prefixo do
+código de município (mun // 100). A chave do cache é (tamanho, mtime, hash) do
+arquivo de origem: a conversão só roda de novo quando a RFB publica outro snapshot.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
+
+DIR_CACHE = "../data/interim/rfb_parquet"
+MANIFESTO = os.path.join(DIR_CACHE, "_manifesto.json")
+# Incrementar quando o esquema gravado mudar (invalida todo o cache)
+VERSAO_ESQUEMA = 2
+
+BLOCO_CSV = 64 * 1024 ** 2
+
+# Posição no layout da RFB -> (nome, tipo)
+COLUNAS_SIMPLES = {
+    0: ("cnpj_basico", pa.int32()),
+    4: ("opcao_mei", pa.string()),
+    5: ("data_ini", pa.string()),  # Lidas como texto: viram int32 em _datas_inteiras
+    6: ("data_fim", pa.string()),
+}
+DATAS = ("data_ini", "data_fim")
+COLUNAS_ESTAB = {
+    0: ("cnpj_basico", pa.int32()),
+    11: ("cnae", pa.int32()),
+    20: ("mun", pa.int32()),
+}
+N_COLUNAS = {"simples": 7, "estabelecimentos": 30}
+
+def _hash_arquivo(caminho, bloco=8 * 1024 ** 2):
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, "rb") as f:
+        while True:
+            dados = f.read(bloco)
+            if not dados:
+                break
+            h.update(dados)
+    return h.hexdigest()
+
+def _ler_manifesto():
+    if not os.path.exists(MANIFESTO):
+        return {}
+    with open(MANIFESTO, encoding="utf-8") as f:
+        return json.load(f)
+
+def _gravar_manifesto(manifesto):
+    os.makedirs(DIR_CACHE, exist_ok=True)
+    with open(MANIFESTO, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=2)
+
+def _destino(tipo, caminho):
+    return os.path.join(DIR_CACHE, tipo, f"arquivo={os.path.basename(caminho)}")
+
+def cache_valido(tipo, caminho, manifesto=None):
+    """
+    Confere a chave do cache. Tamanho e mtime iguais bastam; se só o mtime mudou
+    (arquivo reextraído), o hash decide e a entrada é atualizada sem reconverter.
+    """
+    manifesto = _ler_manifesto() if manifesto is None else manifesto
+    entrada = manifesto.get(os.path.abspath(caminho))
+    if not entrada or entrada.get("versao") != VERSAO_ESQUEMA or not os.path.isdir(_destino(tipo, caminho)):
+        return False
+
+    st = os.stat(caminho)
+    if entrada["tamanho"] != st.st_size:
+        return False
+    if entrada["mtime"] == st.st_mtime:
+        return True
+    if entrada["hash"] == _hash_arquivo(caminho):
+        entrada["mtime"] = st.st_mtime
+        _gravar_manifesto(manifesto)
+        return True
+    return False
+
+def leitor_csv(tipo, caminho):
+    """Leitor Arrow em streaming (record batches) das colunas de interesse de um CSV da RFB."""
+    colunas = COLUNAS_SIMPLES if tipo == "simples" else COLUNAS_ESTAB
+    nomes = [f"c{i}" for i in range(N_COLUNAS[tipo])]
+    for i, (nome, _) in colunas.items():
+        nomes[i] = nome
+    return pv.open_csv(
+        caminho,
+        read_options=pv.ReadOptions(column_names=nomes, encoding="latin1", block_size=BLOCO_CSV),
+        parse_options=pv.ParseOptions(delimiter=";"),
+        convert_options=pv.ConvertOptions(
+            include_columns=[nome for nome, _ in colunas.values()],
+            column_types={nome: tipo_pa for nome, tipo_pa in colunas.values()},
+        ),
+    )
+
+def _data_inteira(coluna):
+    """YYYYMMDD em texto -> int32; vazio ou inválido vira 0 (como pd.to_numeric(errors='coerce').fillna(0))."""
+    texto = pc.utf8_trim_whitespace(coluna)
+    valida = pc.match_substring_regex(texto, r"^[0-9]{1,9}$")
+    return pc.fill_null(pc.if_else(valida, texto, "0"), "0").cast(pa.int32())
+
+def _datas_inteiras(lotes, esquema):
+    """Um token de data malformado não derruba a conversão: só aquela data vira 0."""
+    for lote in lotes:
+        colunas = [_data_inteira(c) if nome in DATAS else c for nome, c in zip(lote.schema.names, lote.columns)]
+        yield pa.RecordBatch.from_arrays(colunas, schema=esquema)
+
+def _com_prefixo(lotes, esquema):
+    for lote in lotes:
+        # Divisão inteira no Arrow: mun 4 dígitos -> prefixo de 2 dígitos
+        prefixo = pc.divide(lote.column("mun"), pa.scalar(100, pa.int32())).cast(pa.int16())
+        yield pa.RecordBatch.from_arrays(lote.columns + [prefixo], schema=esquema)
+
+def converter_arquivo(tipo, caminho, forcar=False):
+    """Converte um arquivo da RFB para Parquet, se o cache estiver desatualizado. Retorna o diretório."""
+    destino = _destino(tipo, caminho)
+    manifesto = _ler_manifesto()
+    if not forcar and cache_valido(tipo, caminho, manifesto):
+        return destino
+
+    print(f"🗜️  Convertendo {os.path.basename(caminho)} para Parquet...")
+    shutil.rmtree(destino, ignore_errors=True)
+    leitor = leitor_csv(tipo, caminho)
+
+    if tipo == "simples":
+        esquema = pa.schema([pa.field(c.name, pa.int32()) if c.name in DATAS else c for c in leitor.schema])
+        lotes, particao = _datas_inteiras(leitor, esquema), None
+    else:
+        esquema = leitor.schema.append(pa.field("prefixo_mun", pa.int16()))
+        lotes = _com_prefixo(leitor, esquema)
+        particao = ds.partitioning(pa.schema([("prefixo_mun", pa.int16())]), flavor="hive")
+
+    ds.write_dataset(
+        lotes, destino, schema=esquema, format="parquet",
+        partitioning=particao, existing_data_behavior="delete_matching",
+    )
+
+    st = os.stat(caminho)
+    manifesto[os.path.abspath(caminho)] = {
+        "versao": VERSAO_ESQUEMA,
+        "tamanho": st.st_size,
+        "mtime": st.st_mtime,
+        "hash": _hash_arquivo(caminho),
+    }
+    _gravar_manifesto(manifesto)
+    return destino
+
+def abrir_dataset(tipo, caminho):
+    """Abre o dataset convertido de um arquivo de origem (partições hive reconhecidas)."""
+    return ds.dataset(_destino(tipo, caminho), format="parquet", partitioning="hive")
+
+def ler_lotes(tipo, caminho, colunas, filtro=None, tamanho_lote=2_000_000):
+    """Itera DataFrames lendo só as colunas pedidas, com o filtro empurrado para o scan do Parquet."""
+    scanner = abrir_dataset(tipo, caminho).scanner(columns=colunas, filter=filtro, batch_size=tamanho_lote)
+    for lote in scanner.to_batches():
+        if lote.num_rows:
+            yield lote.to_pandas()
+
+def converter_tudo(caminho_simples, arquivos_estab, forcar=False):
+    """Etapa de conversão: Simples + todos os Estabelecimentos existentes."""
+    if os.path.exists(caminho_simples):
+        converter_arquivo("simples", caminho_simples, forcar)
+    for caminho in arquivos_estab:
+        if os.path.exists(caminho):
+            converter_arquivo("estabelecimentos", caminho, forcar)
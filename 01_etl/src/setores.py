@@ -0,0 +1,70 @@
+"""
+Classificação setorial a partir da divisão CNAE (2 primeiros dígitos).
+
+Fonte única do mapeamento usado pela RAIS (CASE gerado para o SQL) e pelo CNPJ
+(lookup vetorizado). A divisão indexa uma tabela de 100 posições que devolve o
+código do setor, sem nenhuma operação de string.
+"""
+import numpy as np
+import pandas as pd
+
+SETORES = ['Agro', 'Industria', 'Servicos', 'Setor Publico', 'Outros']
+AGRO, INDUSTRIA, SERVICOS, SETOR_PUBLICO, OUTROS = range(len(SETORES))
+
+# Faixas de divisão CNAE 2.0 -> setor (o que não estiver aqui é 'Outros')
+FAIXAS = [
+    (1, 3, AGRO),
+    (5, 33, INDUSTRIA),
+    (35, 83, SERVICOS),
+    (84, 84, SETOR_PUBLICO),
+    (85, 99, SERVICOS),
+]
+
+def _montar_tabela(padrao):
+    tabela = np.full(100, padrao, dtype=np.uint8)
+    for ini, fim, setor in FAIXAS:
+        tabela[ini:fim + 1] = setor
+    tabela.setflags(write=False)
+    return tabela
+
+# RAIS: divisões inexistentes/ausentes viram 'Outros' (descartado depois)
+TABELA_RAIS = _montar_tabela(OUTROS)
+# CNPJ: tudo que não é Agro/Indústria/Setor Público é tratado como Serviços
+TABELA_CNPJ = _montar_tabela(SERVICOS)
+
+def classificar_divisao(div, tabela=TABELA_CNPJ):
+    """Divisão CNAE (inteiro 0-99) -> código do setor (uint8). Fora da faixa conta como divisão 0."""
+    div = np.asarray(div)
+    if div.dtype.kind == 'f':
+        div = np.nan_to_num(div, nan=0.0)
+    div = div.astype(np.intp, copy=False)
+    div = np.where((div < 0) | (div > 99), 0, div)
+    return tabela[div]
+
+def classificar_cnae(cnae, tabela=TABELA_CNPJ):
+    """Subclasse CNAE de 7 dígitos numérica (ex.: 4781400) -> código do setor (uint8)."""
+    cnae = np.asarray(cnae)
+    if cnae.dtype.kind == 'f':
+        cnae = np.nan_to_num(cnae, nan=0.0)
+    return classificar_divisao(cnae.astype(np.int64, copy=False) // 100_000, tabela)
+
+def rotulos(codigos):
+    """Códigos uint8 -> Categorical com os nomes dos setores."""
+    return pd.Categorical.from_codes(np.asarray(codigos, dtype=np.int8), categories=SETORES)
+
+def sql_case(coluna='div', tabela=TABELA_RAIS):
+    """Gera o CASE SQL equivalente à tabela, agrupando divisões consecutivas do mesmo setor."""
+    linhas = []
+    ini = 0
+    for i in range(1, 101):
+        if i == 100 or tabela[i] != tabela[ini]:
+            setor = int(tabela[ini])
+            if setor != OUTROS:
+                cond = f"{coluna} = {ini}" if ini == i - 1 else f"{coluna} BETWEEN {ini} AND {i - 1}"
+                linhas.append(f"WHEN {cond} THEN '{SETORES[setor]}'")
+            ini = i
+    corpo = "\n                ".join(linhas)
+    return f"""CASE
+                {corpo}
+                ELSE 'Outros'
+            END"""
@@ -0,0 +1,82 @@
+"""
+Grupos de tratamento por quantis, vários esquemas de corte de uma vez.
+
+Cada coluna de intensidade é ordenada uma única vez (argsort estável, o mesmo
+desempate do rank(method='first')); a posição no ranking de cada município
+vale para todos os esquemas daquela coluna, e o quantil sai de um searchsorted
+nas bordas (as mesmas do pd.qcut sobre os ranks, bit a bit) ou, nos esquemas
+ponderados, da divisão inteira do peso acumulado.
+
+O resultado é uma matriz int8 (municípios x esquemas): 0 = controle (1º quantil),
+1 = tratado (último quantil), -1 = grupos do meio ou intensidade ausente.
+"""
+import numpy as np
+
+FORA = -1
+CONTROLE = 0
+TRATADO = 1
+
+def _bordas_qcut(n_validos, grupos):
+    """Bordas que o pd.qcut usaria sobre os ranks 1..n (percentis com interpolação linear)."""
+    bordas = np.percentile(np.arange(1, n_validos + 1, dtype=np.float64), np.linspace(0, 1, grupos + 1) * 100)
+    if len(np.unique(bordas)) < len(bordas):
+        raise ValueError(f"{n_validos} valores não formam {grupos} quantis distintos")
+    return bordas
+
+def ordenar(valores):
+    """Ordem estável dos valores válidos (NaN fora) e número de válidos."""
+    valores = np.asarray(valores, dtype=np.float64)
+    ordem = np.argsort(valores, kind="stable")
+    return ordem, int(np.count_nonzero(~np.isnan(valores)))
+
+def quantis(ordem, n_validos, n_total, grupos, pesos=None):
+    """
+    Quantil (0..grupos-1, int8; -1 para ausentes) a partir de uma ordem já calculada.
+    Sem pesos: mesmos cortes de pd.qcut(rank(method='first'), grupos).
+    Com pesos inteiros (ex.: população; ausente = 0): cada quantil reúne ~1/grupos do peso
+    total e o município cai no quantil onde começa o seu peso acumulado.
+    """
+    if grupos < 2:
+        raise ValueError("são precisos ao menos 2 grupos (controle e tratado)")
+    validos = ordem[:n_validos]
+    saida = np.full(n_total, FORA, dtype=np.int8)
+    if n_validos == 0:
+        return saida
+    if pesos is None:
+        posicao = np.arange(1, n_validos + 1, dtype=np.float64)
+        ids = np.searchsorted(_bordas_qcut(n_validos, grupos), posicao, side="left")
+        ids[0] = 1  # include_lowest do qcut
+        saida[validos] = ids - 1
+        return saida
+
+    peso = np.rint(np.nan_to_num(np.asarray(pesos, dtype=np.float64)[validos])).astype(np.int64)
+    if (peso < 0).any():
+        raise ValueError("pesos negativos")
+    acumulado = np.cumsum(peso) - peso  # peso antes do município
+    total = max(int(peso.sum()), 1)
+    saida[validos] = np.minimum(acumulado * grupos // total, grupos - 1)
+    return saida
+
+def atribuir_tratamentos(df, esquemas):
+    """
+    Calcula todos os esquemas de tratamento pedidos.
+    `esquemas`: {nome: (coluna, grupos)} ou {nome: (coluna, grupos, coluna_peso)}.
+    Retorna (matriz int8 len(df) x len(esquemas), nomes na mesma ordem das colunas).
+    """
+    nomes = list(esquemas)
+    matriz = np.full((len(df), len(nomes)), FORA, dtype=np.int8)
+    ordens = {}
+    for j, nome in enumerate(nomes):
+        coluna, grupos, *peso = esquemas[nome]
+        if coluna not in ordens:
+            ordens[coluna] = ordenar(df[coluna].to_numpy(dtype=np.float64, na_value=np.nan))
+        ordem, n_validos = ordens[coluna]
+        pesos = df[peso[0]].to_numpy(dtype=np.float64, na_value=np.nan) if peso else None
+        q = quantis(ordem, n_validos, len(df), grupos, pesos)
+        matriz[q == 0, j] = CONTROLE
+        matriz[q == grupos - 1, j] = TRATADO
+    return matriz, nomes
+
+def como_float(matriz):
+    """Matriz int8 -> float com NaN no lugar de -1 (formato das colunas treat_* no Parquet)."""
+    return np.where(matriz == FORA, np.nan, matriz.astype(np.float64))
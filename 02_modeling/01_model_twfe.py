@@ -0,0 +1,70 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+import time
+
+import efeitos_fixos
+import painel_did
+
+# --- CONFIGURAÇÃO ---
+OUTPUT_DIR = 'outputs'
+TRATAMENTO = 'treat_quintil'
+ANO_TRATAMENTO = 2020  # PIX lançado em nov/2020: primeiro ano com exposição
+ANO_REFERENCIA = 2019
+
+def estimar_tudo(linhas, Y, nomes_y, col_tratamento, col_amostra=None,
+                 ano_tratamento=ANO_TRATAMENTO, referencia=ANO_REFERENCIA):
+    """
+    TWFE e event study para todas as colunas de Y (setores x desfechos) com uma única
+    fatoração dos efeitos fixos de município e ano.
+    """
+    sel = painel_did.amostra(linhas, Y, col_tratamento, col_amostra)
+    ids, anos, tratado = linhas['id_municipio'][sel], linhas['ano'][sel], linhas[col_tratamento][sel]
+    efeitos = efeitos_fixos.EfeitosFixos(ids, anos)
+
+    X, nomes = efeitos_fixos.regressores_twfe(tratado, anos, ano_tratamento)
+    twfe = efeitos_fixos.estimar(efeitos, Y[sel], X, nomes_y, nomes)
+    X, nomes = efeitos_fixos.regressores_evento(tratado, anos, referencia)
+    evento = efeitos_fixos.estimar(efeitos, Y[sel], X, nomes_y, nomes)
+    return twfe, evento
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="TWFE e event study (MEI e RAIS, todos os setores) em Python.")
+    parser.add_argument("--painel", default=painel_did.PAINEL_DIR, help="Saída do 15_build_masterfile_did.py.")
+    parser.add_argument("--tratamento", default=TRATAMENTO)
+    parser.add_argument("--amostra", default=None, help="Flag do matching (ex.: keep_match_quintil); padrão: todos.")
+    parser.add_argument("--ano-tratamento", type=int, default=ANO_TRATAMENTO)
+    parser.add_argument("--referencia", type=int, default=ANO_REFERENCIA, help="Ano omitido no event study.")
+    parser.add_argument("--setores", nargs="+", default=painel_did.SETORES)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.painel):
+        print(f"❌ Erro: Painel {args.painel} não encontrado (rode o 15_build_masterfile_did.py).")
+        return
+
+    colunas = [args.tratamento] + ([args.amostra] if args.amostra else [])
+    inicio = time.perf_counter()
+    df = painel_did.carregar(args.painel, colunas, args.setores)
+    linhas, Y, nomes_y = painel_did.matriz_larga(df, args.setores, colunas=colunas)
+    print(f"🔄 Painel: {len(Y):,} município-anos x {len(nomes_y)} séries ({time.perf_counter() - inicio:.1f}s)")
+
+    inicio = time.perf_counter()
+    twfe, evento = estimar_tudo(linhas, Y, nomes_y, args.tratamento, args.amostra,
+                                args.ano_tratamento, args.referencia)
+    print(f"📈 {2 * len(nomes_y)} regressões em {time.perf_counter() - inicio:.2f}s")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    sufixo = args.tratamento.removeprefix('treat_') + (f"_{args.amostra}" if args.amostra else "")
+    for nome, tabela in (('twfe', twfe), ('event_study', evento)):
+        tabela.insert(0, 'tratamento', args.tratamento)
+        tabela.insert(1, 'amostra', args.amostra or 'todos')
+        tabela.to_csv(os.path.join(OUTPUT_DIR, f"{nome}_{sufixo}.csv"), index=False)
+
+    print(twfe[['desfecho', 'coef', 'ep', 'p']].to_string(index=False, float_format=lambda v: f"{v:9.4f}"))
+    print(f"📂 Salvo em: {OUTPUT_DIR}/")
+
+if __name__ == "__main__":
+    main()
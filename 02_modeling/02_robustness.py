@@ -0,0 +1,101 @@
+import pandas as pd
+import numpy as np
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bootstrap
+import efeitos_fixos
+import painel_did
+
+# --- CONFIGURAÇÃO ---
+OUTPUT_FILE = 'outputs/bootstrap.csv'
+TRATAMENTOS = ['treat_tercil', 'treat_quartil', 'treat_quintil']
+MODELOS = ('twfe', 'evento')
+ANO_TRATAMENTO = 2020  # Mesmos do 01_model_twfe.py
+ANO_REFERENCIA = 2019
+
+# Painel compartilhado com os workers (enviado uma vez por processo no initializer)
+_LINHAS = None
+_Y = None
+_NOMES_Y = None
+
+def _inicializar_worker(linhas, Y, nomes_y):
+    global _LINHAS, _Y, _NOMES_Y
+    _LINHAS, _Y, _NOMES_Y = linhas, Y, nomes_y
+
+def rodar_especificacao(tratamento, amostra, modelo, B, tipo, semente, bloco):
+    """Uma especificação (tratamento x amostra x modelo): todos os setores e desfechos de uma vez."""
+    sel = painel_did.amostra(_LINHAS, _Y, tratamento, amostra)
+    anos, tratado = _LINHAS['ano'][sel], _LINHAS[tratamento][sel]
+    efeitos = efeitos_fixos.EfeitosFixos(_LINHAS['id_municipio'][sel], anos)
+    if modelo == 'twfe':
+        X, nomes_x = efeitos_fixos.regressores_twfe(tratado, anos, ANO_TRATAMENTO)
+    else:
+        X, nomes_x = efeitos_fixos.regressores_evento(tratado, anos, ANO_REFERENCIA)
+    tabela = bootstrap.bootstrap_especificacao(efeitos, _Y[sel], X, _NOMES_Y, nomes_x, B, tipo, semente, bloco)
+    tabela.insert(0, 'tratamento', tratamento)
+    tabela.insert(1, 'amostra', amostra or 'todos')
+    tabela.insert(2, 'modelo', modelo)
+    return tabela
+
+def rodar_grade(linhas, Y, nomes_y, especificacoes, B=9999, tipo="rademacher", semente=0, bloco=1000, workers=1):
+    """Todas as especificações; cada uma com semente própria (semente + posição na grade)."""
+    tarefas = [(*esp, B, tipo, semente + i, bloco) for i, esp in enumerate(especificacoes)]
+    if workers <= 1:
+        _inicializar_worker(linhas, Y, nomes_y)
+        tabelas = [rodar_especificacao(*t) for t in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker,
+                                 initargs=(linhas, Y, nomes_y)) as pool:
+            tabelas = list(pool.map(rodar_especificacao, *zip(*tarefas)))
+    return pd.concat(tabelas, ignore_index=True)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bootstrap multiplicador agrupado para a grade de especificações.")
+    parser.add_argument("--painel", default=painel_did.PAINEL_DIR, help="Saída do 15_build_masterfile_did.py.")
+    parser.add_argument("--tratamentos", nargs="+", default=TRATAMENTOS)
+    parser.add_argument("--amostras", nargs="+", default=None,
+                        help="'todos' e/ou flags keep_match_*; padrão: todos + flags presentes no painel.")
+    parser.add_argument("--modelos", nargs="+", choices=MODELOS, default=list(MODELOS))
+    parser.add_argument("--setores", nargs="+", default=painel_did.SETORES)
+    parser.add_argument("-B", "--replicas", type=int, default=9999)
+    parser.add_argument("--pesos", choices=bootstrap.PESOS, default="rademacher")
+    parser.add_argument("--bloco", type=int, default=1000, help="Réplicas por bloco da matriz de pesos (memória).")
+    parser.add_argument("--semente", type=int, default=20201116)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos paralelos.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.painel):
+        print(f"❌ Erro: Painel {args.painel} não encontrado (rode o 15_build_masterfile_did.py).")
+        return
+
+    disponiveis = painel_did.colunas_disponiveis(args.painel)
+    amostras = args.amostras or ['todos'] + [c for c in disponiveis if c.startswith('keep_match_')]
+    amostras = [None if a == 'todos' else a for a in amostras]
+    colunas = args.tratamentos + [a for a in amostras if a]
+    df = painel_did.carregar(args.painel, colunas, args.setores)
+    linhas, Y, nomes_y = painel_did.matriz_larga(df, args.setores, colunas=colunas)
+
+    especificacoes = list(itertools.product(args.tratamentos, amostras, args.modelos))
+    print(f"🎲 {len(especificacoes)} especificações x {len(nomes_y)} séries, B = {args.replicas:,} "
+          f"({args.pesos}), {args.workers} worker(s)...")
+    inicio = time.perf_counter()
+    resultados = rodar_grade(linhas, Y, nomes_y, especificacoes, args.replicas, args.pesos,
+                             args.semente, args.bloco, args.workers)
+    print(f"⏱️ {time.perf_counter() - inicio:.1f}s")
+
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    resultados.to_csv(OUTPUT_FILE, index=False)
+    twfe = resultados[resultados['modelo'] == 'twfe']
+    if len(twfe):
+        print(twfe[['tratamento', 'amostra', 'desfecho', 'coef', 'ep_boot', 'p_boot']]
+              .to_string(index=False, float_format=lambda v: f"{v:9.4f}"))
+    print(f"📂 Salvo em: {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+import time
+
+import painel_did
+import permutacao
+
+# --- CONFIGURAÇÃO ---
+OUTPUT_FILE = 'outputs/placebo.csv'
+DISTRIBUICAO_FILE = 'outputs/placebo_distribuicao.parquet'
+TRATAMENTOS = ['treat_quintil', 'treat_tercil']
+ANO_TRATAMENTO = 2020  # Mesmo do 01_model_twfe.py
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inferência por randomização (placebo) do TWFE.")
+    parser.add_argument("--painel", default=painel_did.PAINEL_DIR, help="Saída do 15_build_masterfile_did.py.")
+    parser.add_argument("--tratamentos", nargs="+", default=TRATAMENTOS)
+    parser.add_argument("--amostra", default=None, help="Flag do matching (ex.: keep_match_quintil); padrão: todos.")
+    parser.add_argument("--estratos", default=None, help="Sorteia dentro de cada valor desta coluna (ex.: cod_regiao).")
+    parser.add_argument("--setores", nargs="+", default=painel_did.SETORES)
+    parser.add_argument("--ano-tratamento", type=int, default=ANO_TRATAMENTO)
+    parser.add_argument("-R", "--permutacoes", type=int, default=5000)
+    parser.add_argument("--lote", type=int, default=500, help="Sorteios por produto matricial.")
+    parser.add_argument("--semente", type=int, default=20201116)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos paralelos.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.painel):
+        print(f"❌ Erro: Painel {args.painel} não encontrado (rode o 15_build_masterfile_did.py).")
+        return
+
+    colunas = args.tratamentos + [c for c in (args.amostra, args.estratos) if c]
+    df = painel_did.carregar(args.painel, colunas, args.setores)
+    linhas, Y, nomes_y = painel_did.matriz_larga(df, args.setores, colunas=colunas)
+
+    resumo, distribuicoes = [], []
+    for tratamento in args.tratamentos:
+        sel = painel_did.amostra(linhas, Y, tratamento, args.amostra)
+        estratos = linhas[args.estratos][sel] if args.estratos else None
+        inicio = time.perf_counter()
+        placebo = permutacao.Placebo(linhas['id_municipio'][sel], linhas['ano'][sel], linhas[tratamento][sel],
+                                     Y[sel], args.ano_tratamento, estratos)
+        observado = placebo.observado()
+        coefs, exato = permutacao.distribuicao(placebo, args.permutacoes, args.lote, args.semente, args.workers)
+        p = permutacao.p_valores(observado, coefs, exato)
+        print(f"🎲 {tratamento}: {len(coefs):,} {'atribuições (todas)' if exato else 'sorteios'} "
+              f"em {time.perf_counter() - inicio:.1f}s")
+
+        for j, y in enumerate(nomes_y):
+            resumo.append({'tratamento': tratamento, 'amostra': args.amostra or 'todos',
+                           'estratos': args.estratos or '', 'desfecho': y, 'coef': observado[j],
+                           'p_permutacao': p[j], 'permutacoes': len(coefs), 'enumeracao_completa': exato,
+                           'dp_placebo': coefs[:, j].std(ddof=1)})
+        distribuicoes.append(pd.DataFrame({
+            'tratamento': tratamento,
+            'desfecho': np.repeat(nomes_y, len(coefs)),
+            'coef': coefs.T.reshape(-1),
+        }))
+
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    resumo = pd.DataFrame(resumo)
+    resumo.to_csv(OUTPUT_FILE, index=False)
+    pd.concat(distribuicoes, ignore_index=True).to_parquet(DISTRIBUICAO_FILE, index=False)
+    print(resumo[['tratamento', 'desfecho', 'coef', 'p_permutacao']].to_string(index=False, float_format=lambda v: f"{v:9.4f}"))
+    print(f"📂 Salvo em: {OUTPUT_FILE} e {DISTRIBUICAO_FILE}")
+
+if __name__ == "__main__":
+    main()
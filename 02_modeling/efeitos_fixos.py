@@ -0,0 +1,148 @@
+"""
+Regressões com efeitos fixos (TWFE e event study) por demeaning, sem matrizes de dummies.
+
+Os efeitos fixos (município e ano) são absorvidos por projeções alternadas: a cada
+passada, subtrai-se a média de cada grupo, fator por fator, até as médias zerarem
+(no painel balanceado, uma passada basta). As médias saem de np.add.reduceat sobre as
+linhas já ordenadas pelo fator, então a "fatoração" (ordem, início e tamanho de cada
+grupo) é calculada uma vez e reaproveitada para todas as colunas: todos os setores e
+desfechos são centrados juntos, como colunas de uma mesma matriz.
+
+Erros-padrão agrupados por município (CR1) com a correção de pequena amostra do
+fixest: G/(G-1) x (n-1)/(n-K), em que K não conta os efeitos fixos aninhados no
+cluster. Os p-valores usam a t com G-1 graus de liberdade.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+@dataclass(frozen=True)
+class Fator:
+    """Um efeito fixo fatorado: linhas ordenadas por grupo, início e tamanho de cada grupo."""
+    codigos: np.ndarray
+    ordem: np.ndarray
+    inicios: np.ndarray
+    tamanhos: np.ndarray
+
+    @property
+    def n_grupos(self):
+        return len(self.tamanhos)
+
+    def somas(self, M):
+        """Soma de M (n x k) por grupo -> (grupos x k)."""
+        return np.add.reduceat(M[self.ordem], self.inicios, axis=0)
+
+    def medias(self, M):
+        return self.somas(M) / self.tamanhos[:, None]
+
+def fatorar(valores):
+    """Valores de um efeito fixo (qualquer tipo ordenável) -> Fator."""
+    _, codigos = np.unique(np.asarray(valores), return_inverse=True)
+    codigos = codigos.ravel()
+    ordem = np.argsort(codigos, kind="stable")
+    tamanhos = np.bincount(codigos)
+    inicios = np.r_[0, np.cumsum(tamanhos)[:-1]]
+    return Fator(codigos, ordem, inicios, tamanhos)
+
+class EfeitosFixos:
+    """
+    Estrutura de efeitos fixos de uma amostra, fatorada uma vez.
+    O primeiro fator é o cluster dos erros-padrão (município).
+    """
+    def __init__(self, *valores, tol=1e-10, max_iter=1000):
+        if not valores:
+            raise ValueError("é preciso ao menos um efeito fixo")
+        self.fatores = [fatorar(v) for v in valores]
+        self.n = len(self.fatores[0].codigos)
+        self.tol = tol
+        self.max_iter = max_iter
+
+    @property
+    def cluster(self):
+        return self.fatores[0]
+
+    def centrar(self, M):
+        """Remove os efeitos fixos de todas as colunas de M (n x k) por projeções alternadas."""
+        M = np.array(M, dtype=np.float64, copy=True)
+        vetor = M.ndim == 1
+        if vetor:
+            M = M[:, None]
+        escala = np.maximum(np.abs(M).max(axis=0), 1.0)
+        for _ in range(self.max_iter):
+            maior = 0.0
+            for fator in self.fatores:
+                medias = fator.medias(M)
+                M -= medias[fator.codigos]
+                maior = max(maior, (np.abs(medias).max(axis=0) / escala).max())
+            if maior < self.tol or len(self.fatores) == 1:
+                break
+        else:
+            raise RuntimeError(f"demeaning não convergiu em {self.max_iter} iterações")
+        return M[:, 0] if vetor else M
+
+    def k_absorvido(self):
+        """Graus de liberdade dos efeitos fixos fora do cluster (os aninhados nele não contam)."""
+        return sum(f.n_grupos - 1 for f in self.fatores[1:])
+
+def escores_cluster(fator, X, residuos):
+    """Contribuições de cada cluster para o escore: soma de x_i * e_i no grupo -> (G x k) ou (G x k x m)."""
+    if residuos.ndim == 1:
+        return fator.somas(X * residuos[:, None])
+    return fator.somas((X[:, :, None] * residuos[:, None, :]).reshape(len(X), -1)).reshape(
+        fator.n_grupos, X.shape[1], residuos.shape[1])
+
+def ajustar(efeitos, Y, X):
+    """
+    OLS de cada coluna de Y em X depois de absorver os efeitos fixos (Y e X centrados juntos).
+    Retorna (coeficientes k x m, X centrado, resíduos n x m, bread = (X'X)^-1).
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    Y = Y[:, None] if Y.ndim == 1 else Y
+    X = np.asarray(X, dtype=np.float64)
+    X = X[:, None] if X.ndim == 1 else X
+    centrado = efeitos.centrar(np.column_stack([Y, X]))
+    Yc, Xc = centrado[:, :Y.shape[1]], centrado[:, Y.shape[1]:]
+    bread = np.linalg.inv(Xc.T @ Xc)
+    beta = bread @ (Xc.T @ Yc)
+    return beta, Xc, Yc - Xc @ beta, bread
+
+def ajuste_pequena_amostra(efeitos, k):
+    """G/(G-1) x (n-1)/(n-K) do CR1, com K = k regressores + efeitos fixos fora do cluster."""
+    G = efeitos.cluster.n_grupos
+    return G / (G - 1) * (efeitos.n - 1) / (efeitos.n - k - efeitos.k_absorvido())
+
+def vcov_cluster(efeitos, Xc, residuos, bread):
+    """Matrizes de variância CR1 (k x k x m), uma por desfecho."""
+    S = escores_cluster(efeitos.cluster, Xc, residuos)
+    meat = np.einsum("gim,gjm->ijm", S, S)
+    return ajuste_pequena_amostra(efeitos, Xc.shape[1]) * np.einsum("ia,abm,bj->ijm", bread, meat, bread)
+
+def estimar(efeitos, Y, X, nomes_y, nomes_x):
+    """Tabela tidy (desfecho, termo, coef, ep, t, p) de todas as regressões com a mesma amostra e X."""
+    beta, Xc, residuos, bread = ajustar(efeitos, Y, X)
+    V = vcov_cluster(efeitos, Xc, residuos, bread)
+    ep = np.sqrt(np.einsum("iim->im", V))
+    t = beta / ep
+    gl = efeitos.cluster.n_grupos - 1
+    linhas = []
+    for m, y in enumerate(nomes_y):
+        for i, termo in enumerate(nomes_x):
+            linhas.append({
+                'desfecho': y, 'termo': termo, 'coef': beta[i, m], 'ep': ep[i, m], 't': t[i, m],
+                'p': 2 * stats.t.sf(abs(t[i, m]), gl), 'n': efeitos.n, 'clusters': gl + 1,
+            })
+    return pd.DataFrame(linhas)
+
+def regressores_twfe(tratado, ano, ano_tratamento):
+    """D = tratado x pós (ano >= ano_tratamento)."""
+    return (np.asarray(tratado) == 1) & (np.asarray(ano) >= ano_tratamento), ['tratado_pos']
+
+def regressores_evento(tratado, ano, referencia):
+    """Uma dummy tratado x 1[ano == a] por ano, exceto o de referência."""
+    ano = np.asarray(ano)
+    anos = [a for a in np.unique(ano) if a != referencia]
+    tratado = np.asarray(tratado) == 1
+    X = np.column_stack([tratado & (ano == a) for a in anos])
+    return X, [f'evento_{a}' for a in anos]
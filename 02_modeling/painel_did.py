@@ -0,0 +1,60 @@
+"""
+Leitura do painel DiD (saída do 15_build_masterfile_did.py) no formato das estimações.
+
+O painel vem particionado por setor; aqui ele vira uma matriz larga com uma linha por
+(município, ano) e uma coluna por setor x desfecho, para que todas as regressões de
+uma amostra compartilhem a mesma estrutura de efeitos fixos. As variáveis do
+cross-section (tratamento, flags do matching, região) são constantes no município e
+entram como colunas de linha.
+"""
+import numpy as np
+import pyarrow.parquet as pq
+
+PAINEL_DIR = '../01_etl/data/processed/painel_did'
+SETORES = ['Agro', 'Industria', 'Servicos', 'Setor Publico', 'Total']
+DESFECHOS = {'log_estoque_mei': 'mei', 'log_vinculos': 'rais'}
+
+def colunas_disponiveis(path=PAINEL_DIR):
+    """Nomes das colunas do painel (sem ler os dados)."""
+    return pq.ParquetDataset(path).schema.names
+
+def carregar(path=PAINEL_DIR, colunas=(), setores=SETORES, desfechos=DESFECHOS):
+    """Lê só os setores e colunas pedidos (poda de partição no diretório setor=...)."""
+    pedidas = ['id_municipio', 'ano', 'setor', *desfechos, *colunas]
+    tabela = pq.read_table(path, columns=list(dict.fromkeys(pedidas)), filters=[('setor', 'in', list(setores))])
+    df = tabela.to_pandas()
+    df['setor'] = df['setor'].astype(str)
+    return df
+
+def matriz_larga(df, setores=SETORES, desfechos=DESFECHOS, colunas=()):
+    """
+    Painel longo -> (linhas, Y, nomes_y).
+    `linhas`: dict com id_municipio, ano e as `colunas` do cross-section (um valor por linha);
+    Y: (linhas x setores*desfechos), NaN onde o setor não tem a célula; nomes_y = 'mei_Agro', ...
+    """
+    ids = df['id_municipio'].to_numpy(np.int64)
+    anos = df['ano'].to_numpy(np.int64)
+    chaves, primeira, linha = np.unique((ids << 16) | anos, return_index=True, return_inverse=True)
+    linha = linha.ravel()
+    nomes_y = [f'{sufixo}_{s}' for sufixo in desfechos.values() for s in setores]
+    Y = np.full((len(chaves), len(nomes_y)), np.nan)
+    setor = df['setor'].to_numpy()
+    j = 0
+    for desfecho in desfechos:
+        valores = df[desfecho].to_numpy(np.float64)
+        for s in setores:
+            sel = setor == s
+            Y[linha[sel], j] = valores[sel]
+            j += 1
+    linhas = {'id_municipio': chaves >> 16, 'ano': chaves & 0xFFFF}
+    for c in colunas:
+        linhas[c] = df[c].to_numpy()[primeira]
+    return linhas, Y, nomes_y
+
+def amostra(linhas, Y, col_tratamento, col_amostra=None):
+    """Municípios de controle/tratado (e pareados, se pedido) com todas as células observadas."""
+    grupo = np.asarray(linhas[col_tratamento], dtype=np.float64)
+    sel = np.isin(grupo, (0, 1)) & np.isfinite(Y).all(axis=1)
+    if col_amostra:
+        sel &= np.asarray(linhas[col_amostra]) == 1
+    return sel
@@ -0,0 +1,134 @@
+"""
+Inferência por randomização (placebo): redistribui o tratamento entre municípios e
+reestima o TWFE para cada sorteio.
+
+Com D_it = T_i x pós_t e o desfecho já centrado nos efeitos fixos (Y~, calculado uma
+vez), o numerador do coeficiente é D'Y~ = sum_i T_i sum_t pós_t Y~_it = T'A, em que A
+(municípios x desfechos) não depende do sorteio. Empilhando os vetores de tratamento
+sorteados numa matriz (sorteios x municípios), os numeradores de um lote inteiro saem
+de um único produto Tperm @ A. O denominador D'MD só depende do número de tratados no
+painel balanceado (é o mesmo em todo sorteio); no desbalanceado, o lote de D é centrado
+de uma vez, como colunas de uma matriz.
+
+Os sorteios preservam o número de tratados (e, com estratos, o número de tratados em
+cada estrato, ex.: cod_regiao). Os lotes usam sementes filhas de uma SeedSequence, então
+o resultado não depende do número de processos. O p-valor (1 + #{|b*| >= |b|}) / (R + 1)
+é exato em tamanho para qualquer R; se todas as atribuições possíveis couberem em R,
+elas são enumeradas e o p-valor é o da distribuição completa.
+"""
+import itertools
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import efeitos_fixos
+
+class Placebo:
+    """Estrutura comum a todos os sorteios de uma amostra (efeitos fixos, Y centrado, A)."""
+
+    def __init__(self, ids, anos, tratado, Y, ano_tratamento, estratos=None):
+        self.efeitos = efeitos_fixos.EfeitosFixos(ids, anos)
+        self.pos = (np.asarray(anos) >= ano_tratamento).astype(np.float64)
+        self.mun = self.efeitos.cluster.codigos  # linha -> município (0..N-1)
+        Y = np.asarray(Y, dtype=np.float64)
+        Yc = self.efeitos.centrar(Y[:, None] if Y.ndim == 1 else Y)
+        self.A = self.efeitos.cluster.somas(self.pos[:, None] * Yc)
+
+        # Tratamento e estrato por município (constantes no município)
+        primeira = self.efeitos.cluster.ordem[self.efeitos.cluster.inicios]
+        self.T = (np.asarray(tratado)[primeira] == 1).astype(np.float64)
+        self.estratos = np.zeros(len(self.T), dtype=np.int64) if estratos is None else \
+            np.unique(np.asarray(estratos)[primeira], return_inverse=True)[1].ravel()
+        self._ordem_estrato = np.argsort(self.estratos, kind="stable")
+
+        # Balanceado: D'MD = (sum_i (T_i - T_barra)^2) x (sum_t (pós_t - pós_barra)^2), igual em todo sorteio
+        self._denominador = None
+        if (self.efeitos.cluster.tamanhos == self.efeitos.fatores[1].n_grupos).all():
+            self._denominador = self.denominadores(self.T[None, :])[0]
+
+    def denominadores(self, Tperm):
+        """D'MD de cada sorteio (linhas de Tperm)."""
+        if self._denominador is not None:
+            return np.full(len(Tperm), self._denominador)
+        D = Tperm.T[self.mun] * self.pos[:, None]  # n x sorteios
+        return (D * self.efeitos.centrar(D)).sum(axis=0)
+
+    def coeficientes(self, Tperm):
+        """Coeficiente TWFE de cada sorteio para cada desfecho -> (sorteios x desfechos)."""
+        Tperm = np.atleast_2d(Tperm)
+        return (Tperm @ self.A) / self.denominadores(Tperm)[:, None]
+
+    def observado(self):
+        return self.coeficientes(self.T[None, :])[0]
+
+    def sortear(self, rng, quantidade):
+        """Vetores de tratamento permutados (quantidade x municípios), dentro de cada estrato."""
+        o = self._ordem_estrato
+        chaves = self.estratos[o][None, :] + rng.random((quantidade, len(o)))
+        p = np.argsort(chaves, axis=1)  # permuta só dentro do bloco do estrato
+        Tperm = np.empty((quantidade, len(o)))
+        Tperm[:, o] = self.T[o][p]
+        return Tperm
+
+    def n_atribuicoes(self):
+        """Número de atribuições possíveis (produto dos binomiais por estrato)."""
+        total = 1
+        for e in np.unique(self.estratos):
+            sel = self.estratos == e
+            total *= math.comb(int(sel.sum()), int(self.T[sel].sum()))
+        return total
+
+    def enumerar(self):
+        """Todas as atribuições possíveis (só para amostras pequenas)."""
+        blocos = []
+        for e in np.unique(self.estratos):
+            membros = np.flatnonzero(self.estratos == e)
+            blocos.append([membros[list(c)] for c in itertools.combinations(range(len(membros)),
+                                                                            int(self.T[membros].sum()))])
+        Tperm = []
+        for escolha in itertools.product(*blocos):
+            t = np.zeros(len(self.T))
+            for tratados in escolha:
+                t[tratados] = 1
+            Tperm.append(t)
+        return np.array(Tperm)
+
+# Estrutura compartilhada com os workers (enviada uma vez por processo no initializer)
+_PLACEBO = None
+
+def _inicializar_worker(placebo):
+    global _PLACEBO
+    _PLACEBO = placebo
+
+def _lote(semente, quantidade):
+    return _PLACEBO.coeficientes(_PLACEBO.sortear(np.random.default_rng(semente), quantidade))
+
+def distribuicao(placebo, R=5000, lote=500, semente=0, workers=1):
+    """
+    Coeficientes placebo (R x desfechos). Se R >= número de atribuições possíveis,
+    devolve a distribuição completa (enumerada) em vez de sortear. Retorna (coeficientes, exato).
+    """
+    if placebo.n_atribuicoes() <= R:
+        return placebo.coeficientes(placebo.enumerar()), True
+    tamanhos = [min(lote, R - ini) for ini in range(0, R, lote)]
+    sementes = np.random.SeedSequence(semente).spawn(len(tamanhos))
+    if workers <= 1:
+        _inicializar_worker(placebo)
+        partes = [_lote(s, q) for s, q in zip(sementes, tamanhos)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker,
+                                 initargs=(placebo,)) as pool:
+            partes = list(pool.map(_lote, sementes, tamanhos))
+    return np.vstack(partes), False
+
+def p_valores(observado, placebos, exato=False):
+    """
+    Bicaudal: fração de |b*| >= |b|. Sorteio: (1 + contagem) / (R + 1), com o observado como
+    uma das atribuições; enumeração completa: contagem / total (o observado já está entre elas).
+    """
+    limite = np.abs(observado) * (1 - 1e-12)  # Empates numéricos contam como extremos
+    extremos = (np.abs(placebos) >= limite).sum(axis=0)
+    if exato:
+        return extremos / len(placebos)
+    return (1 + extremos) / (len(placebos) + 1)